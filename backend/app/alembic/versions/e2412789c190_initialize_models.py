@@ -127,13 +127,19 @@ def upgrade():
         sa.Column('company_id', postgresql.UUID(as_uuid=True), nullable=False),
         sa.Column('area_id', postgresql.UUID(as_uuid=True), nullable=True),
         sa.Column('created_by_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('recurrence_source_id', postgresql.UUID(as_uuid=True), nullable=True),
         sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
         sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), onupdate=sa.text('now()'), nullable=False),
         sa.ForeignKeyConstraint(['area_id'], ['area.id'], ),
         sa.ForeignKeyConstraint(['audit_template_id'], ['audit_template.id'], ),
         sa.ForeignKeyConstraint(['company_id'], ['company.id'], ),
-        sa.ForeignKeyConstraint(['created_by_id'], ['user.id'], )
+        sa.ForeignKeyConstraint(['created_by_id'], ['user.id'], ),
+        sa.ForeignKeyConstraint(['recurrence_source_id'], ['audit_assignment.id'], ),
+        sa.UniqueConstraint('recurrence_source_id', 'due_date', name='uq_audit_assignment_recurrence_occurrence')
     )
+    op.create_index(op.f('ix_audit_assignment_recurrence_source_id'), 'audit_assignment', ['recurrence_source_id'], unique=False)
+    op.create_index('ix_audit_assignment_next_due_date', 'audit_assignment', ['next_due_date'], unique=False)
+    op.create_index('ix_audit_assignment_company_id_updated_at', 'audit_assignment', ['company_id', 'updated_at'], unique=False)
 
     # Assigned Question Table
     op.create_table('assigned_question',
@@ -143,6 +149,7 @@ def upgrade():
         sa.Column('order', sa.Integer(), nullable=False),
         sa.Column('is_mandatory', sa.Boolean(), nullable=False),
         sa.Column('section_id', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True),
+        sa.Column('scoring_weight', sa.Float(), nullable=True),
         sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text("uuid_generate_v4()")),
         sa.Column('audit_assignment_id', postgresql.UUID(as_uuid=True), nullable=False),
         sa.Column('original_question_template_id', postgresql.UUID(as_uuid=True), nullable=True),
@@ -151,6 +158,7 @@ def upgrade():
         sa.ForeignKeyConstraint(['audit_assignment_id'], ['audit_assignment.id'], ),
         sa.ForeignKeyConstraint(['original_question_template_id'], ['question_template.id'], )
     )
+    op.create_index('ix_assigned_question_updated_at', 'assigned_question', ['updated_at'], unique=False)
 
     # Audit Response Table
     op.create_table('audit_response',
@@ -162,9 +170,11 @@ def upgrade():
         sa.Column('audit_assignment_id', postgresql.UUID(as_uuid=True), nullable=False),
         sa.Column('auditor_id', postgresql.UUID(as_uuid=True), nullable=False),
         sa.Column('submission_date', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), onupdate=sa.text('now()'), nullable=False),
         sa.ForeignKeyConstraint(['audit_assignment_id'], ['audit_assignment.id'], ),
         sa.ForeignKeyConstraint(['auditor_id'], ['user.id'], )
     )
+    op.create_index('ix_audit_response_updated_at', 'audit_response', ['updated_at'], unique=False)
 
     # Answer Table
     op.create_table('answer',
@@ -179,12 +189,102 @@ def upgrade():
         sa.ForeignKeyConstraint(['assigned_question_id'], ['assigned_question.id'], ),
         sa.ForeignKeyConstraint(['audit_response_id'], ['audit_response.id'], )
     )
+    op.create_index('ix_answer_updated_at', 'answer', ['updated_at'], unique=False)
+
+    # Sync Tombstone Table
+    op.create_table('sync_tombstone',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text("uuid_generate_v4()")),
+        sa.Column('entity_type', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+        sa.Column('entity_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('company_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('area_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False)
+    )
+    op.create_index('ix_sync_tombstone_company_id_deleted_at', 'sync_tombstone', ['company_id', 'deleted_at'], unique=False)
+
+    # Idempotency Key Table
+    op.create_table('idempotency_key',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('key', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column('request_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('response_body', sa.LargeBinary(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'key')
+    )
+    op.create_index(op.f('ix_idempotency_key_expires_at'), 'idempotency_key', ['expires_at'], unique=False)
+
+    # Photo Tables
+    op.create_table('photo',
+        sa.Column('sha256', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('content_type', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_index('ix_photo_ref_count_updated_at', 'photo', ['ref_count', 'updated_at'], unique=False)
+    op.create_table('photo_reference',
+        sa.Column('sha256', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column('audit_assignment_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('sha256', 'audit_assignment_id')
+    )
+    op.create_table('photo_upload',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text("uuid_generate_v4()")),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('length', sa.Integer(), nullable=False),
+        sa.Column('offset', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('content_type', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column('sha256', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True),
+        sa.Column('completed', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False)
+    )
+    op.create_index(op.f('ix_photo_upload_expires_at'), 'photo_upload', ['expires_at'], unique=False)
+
+    # Email Outbox Table
+    op.create_table('email_outbox',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text("uuid_generate_v4()")),
+        sa.Column('email_to', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column('subject', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('html_content', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('status', sa.Enum('PENDING', 'SENT', 'FAILED', name='emailstatus'), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.Column('dedupe_key', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True)
+    )
+    op.create_index('ix_email_outbox_status_next_attempt_at', 'email_outbox', ['status', 'next_attempt_at'], unique=False)
+    op.create_index(op.f('ix_email_outbox_dedupe_key'), 'email_outbox', ['dedupe_key'], unique=True)
 
 
 def downgrade():
+    op.drop_index(op.f('ix_email_outbox_dedupe_key'), table_name='email_outbox')
+    op.drop_index('ix_email_outbox_status_next_attempt_at', table_name='email_outbox')
+    op.drop_table('email_outbox')
+    op.drop_index(op.f('ix_photo_upload_expires_at'), table_name='photo_upload')
+    op.drop_table('photo_upload')
+    op.drop_table('photo_reference')
+    op.drop_index('ix_photo_ref_count_updated_at', table_name='photo')
+    op.drop_table('photo')
+    op.drop_index(op.f('ix_idempotency_key_expires_at'), table_name='idempotency_key')
+    op.drop_table('idempotency_key')
+    op.drop_index('ix_sync_tombstone_company_id_deleted_at', table_name='sync_tombstone')
+    op.drop_table('sync_tombstone')
+    op.drop_index('ix_answer_updated_at', table_name='answer')
     op.drop_table('answer')
+    op.drop_index('ix_audit_response_updated_at', table_name='audit_response')
     op.drop_table('audit_response')
+    op.drop_index('ix_assigned_question_updated_at', table_name='assigned_question')
     op.drop_table('assigned_question')
+    op.drop_index('ix_audit_assignment_company_id_updated_at', table_name='audit_assignment')
+    op.drop_index('ix_audit_assignment_next_due_date', table_name='audit_assignment')
+    op.drop_index(op.f('ix_audit_assignment_recurrence_source_id'), table_name='audit_assignment')
     op.drop_table('audit_assignment')
     op.drop_table('question_template')
     op.drop_table('audit_template')
@@ -196,6 +296,7 @@ def downgrade():
     op.drop_index(op.f('ix_user_email'), table_name='user')
     op.drop_table('user')
     
+    op.execute('DROP TYPE IF EXISTS emailstatus;')
     op.execute('DROP TYPE IF EXISTS auditresponsestatus;')
     op.execute('DROP TYPE IF EXISTS auditperiodicity;')
     op.execute('DROP TYPE IF EXISTS auditassignmentstatus;')
@@ -0,0 +1,79 @@
+import hashlib
+from collections.abc import Sequence
+from typing import Any, Optional
+
+from fastapi import HTTPException, Request, Response
+
+
+def make_weak_etag(*parts: Any) -> str:
+    """Build a weak ETag from version parts such as max(updated_at) and row counts."""
+    digest = hashlib.blake2b(
+        "|".join(str(part) for part in parts).encode(), digest_size=12
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _opaque_tag(etag: str) -> str:
+    # Weak comparison (RFC 9110 8.8.3.2): the W/ prefix is ignored
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = _opaque_tag(etag)
+    return any(_opaque_tag(candidate.strip()) == wanted for candidate in header.split(","))
+
+
+def check_etag(
+    request: Request, response: Response, version: Optional[Sequence[Any]], *scope: Any
+) -> Optional[Response]:
+    """
+    Compare the client's `If-None-Match` against the ETag for `version` (plus anything
+    else that changes the representation, like paging or the caller's scope).
+
+    Returns a bodyless 304 response when the client copy is current. Otherwise the ETag
+    is set on `response` and None is returned so the route builds the body as usual.
+    A None `version` means the entity does not exist and is left to the route to report.
+    """
+    if version is None:
+        return None
+    etag = make_weak_etag(*version, *scope)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
+
+
+def requested_range(request: Request, size: int, etag: str) -> Optional[tuple[int, int]]:
+    """
+    The byte range asked for in `Range`, as (start, end) with `end` exclusive, or None
+    to send the whole body: no Range, a malformed or multi-part one, or an If-Range that
+    no longer matches `etag`. A range starting past the end raises 416.
+    """
+    header = request.headers.get("range", "")
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            start, end = max(size - int(last), 0), size
+        else:
+            start, end = int(first), min(int(last) + 1, size) if last else size
+    except ValueError:
+        return None
+    if start >= end:
+        if first and last and int(last) < start:
+            return None
+        raise HTTPException(
+            status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
@@ -0,0 +1,139 @@
+import json
+from contextvars import ContextVar
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional format
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_TYPES = frozenset({MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack"})
+
+# Set per request by MessagePackMiddleware; responses rendered outside a request stay JSON
+_wants_msgpack: ContextVar[bool] = ContextVar("wants_msgpack", default=False)
+
+
+def wants_msgpack() -> bool:
+    return _wants_msgpack.get()
+
+
+def packb(content: Any) -> bytes:
+    """MessagePack the JSON-compatible `content` (what jsonable_encoder or dump_python(mode="json") give)."""
+    return msgpack.packb(content, use_bin_type=True)
+
+
+def json_to_msgpack(body: bytes) -> bytes:
+    return packb(json.loads(body))
+
+
+def _media_type(value: str) -> str:
+    return value.split(";")[0].strip().lower()
+
+
+def prefers_msgpack(accept: str) -> bool:
+    """True when `accept` ranks MessagePack strictly above JSON."""
+    msgpack_q = json_q = 0.0
+    for part in accept.split(","):
+        media_type, _, params = part.partition(";")
+        media_type = _media_type(media_type)
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in _MSGPACK_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type in ("application/json", "application/*", "*/*"):
+            json_q = max(json_q, q)
+    return msgpack_q > json_q
+
+
+class NegotiatedResponseMixin:
+    """
+    Render the route's JSON-compatible content as MessagePack when the client asked for
+    it. Mixed into the app's default response class, so every route with a
+    response_model gets both formats from the same serialization pass.
+    """
+
+    def __init__(self, content: Any = None, *args: Any, **kwargs: Any) -> None:
+        if kwargs.get("media_type") is None and wants_msgpack():
+            kwargs["media_type"] = MSGPACK_MEDIA_TYPE
+        super().__init__(content, *args, **kwargs)  # type: ignore[call-arg]
+        if msgpack is not None:
+            self.headers.add_vary_header("Accept")  # type: ignore[attr-defined]
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type == MSGPACK_MEDIA_TYPE:  # type: ignore[attr-defined]
+            return packb(content)
+        return super().render(content)  # type: ignore[misc, no-any-return]
+
+
+def negotiated(response_class: type[JSONResponse]) -> type[JSONResponse]:
+    return type(f"Negotiated{response_class.__name__}", (NegotiatedResponseMixin, response_class), {})
+
+
+class MessagePackMiddleware:
+    """
+    Accept MessagePack request bodies by handing the route the equivalent JSON, so the
+    usual pydantic validation applies, and record whether the client wants MessagePack
+    back. Without the msgpack package responses stay JSON and MessagePack bodies are
+    refused with 415.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        token = _wants_msgpack.set(msgpack is not None and prefers_msgpack(headers.get("accept", "")))
+        try:
+            if _media_type(headers.get("content-type", "")) in _MSGPACK_TYPES:
+                await self._decode_body(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            _wants_msgpack.reset(token)
+
+    async def _decode_body(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if msgpack is None:
+            await JSONResponse({"detail": "MessagePack is not supported"}, status_code=415)(scope, receive, send)
+            return
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        try:
+            body = json.dumps(msgpack.unpackb(b"".join(chunks), raw=False)).encode()
+        except (ValueError, TypeError, msgpack.UnpackException):
+            await JSONResponse({"detail": "Malformed MessagePack body"}, status_code=400)(scope, receive, send)
+            return
+
+        scope = dict(scope)
+        headers = MutableHeaders(scope=scope)
+        headers["content-type"] = "application/json"
+        headers["content-length"] = str(len(body))
+        sent = False
+
+        async def receive_json() -> Message:
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(scope, receive_json, send)
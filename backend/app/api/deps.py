@@ -1,5 +1,6 @@
 from collections.abc import Generator
-from typing import Annotated, Any
+from contextvars import ContextVar
+from typing import Annotated, Any, Optional
 import uuid
 
 import jwt
@@ -12,23 +13,43 @@ from sqlmodel import Session, select
 from app.core import security
 from app.core.config import settings
 from app.core.db import engine
-from app.models import TokenPayload, User, UserRole, Company, Area, UserAreaAssignmentLink, AuditResponse
+from app.core.images import ThumbnailCache, get_thumbnails
+from app.core.storage import StorageBackend, get_storage
+from app.core.tracing import traced
+from app.demo_companies import demo_company_ids
+from app.models import TokenPayload, User, UserRole, Company, Area, UserAreaAssignmentLink
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
 
 
+# Set by POST /batch while it dispatches sub-requests, see routes/batch.py
+batch_session: ContextVar[Optional[Session]] = ContextVar("batch_session", default=None)
+batch_principal: ContextVar[Optional[User]] = ContextVar("batch_principal", default=None)
+
+
 def get_db() -> Generator[Session, None, None]:
     with Session(engine) as session:
         yield session
 
 
-SessionDep = Annotated[Session, Depends(get_db)]
+def get_session(db: Annotated[Session, Depends(get_db)]) -> Session:
+    # Sessions only connect on first use, so the unused one costs nothing
+    return batch_session.get() or db
+
+
+SessionDep = Annotated[Session, Depends(get_session)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
+StorageDep = Annotated[StorageBackend, Depends(get_storage)]
+ThumbnailsDep = Annotated[ThumbnailCache, Depends(get_thumbnails)]
 
 
+@traced
 def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    if (principal := batch_principal.get()) is not None:
+        # Authenticated once for the whole batch
+        return principal if principal in session else session.merge(principal, load=False)
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -57,6 +78,7 @@ def get_current_active_user(current_user: CurrentUser) -> User:
 CurrentActiveUser = Annotated[User, Depends(get_current_active_user)]
 
 
+@traced
 def get_current_active_admin_or_superuser(current_user: CurrentActiveUser) -> User:
     if not (current_user.is_superuser or current_user.role == UserRole.ADMIN):
         raise HTTPException(
@@ -68,6 +90,19 @@ def get_current_active_admin_or_superuser(current_user: CurrentActiveUser) -> Us
 CurrentActiveAdminOrSuperuser = Annotated[User, Depends(get_current_active_admin_or_superuser)]
 
 
+@traced
+def get_current_active_superuser(current_user: CurrentActiveUser) -> User:
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=403, detail="The user doesn't have enough privileges"
+        )
+    return current_user
+
+
+CurrentActiveSuperuser = Annotated[User, Depends(get_current_active_superuser)]
+
+
+@traced
 def get_current_active_auditor(current_user: CurrentActiveUser) -> User:
     if current_user.role != UserRole.AUDITOR:
         raise HTTPException(
@@ -79,6 +114,7 @@ def get_current_active_auditor(current_user: CurrentActiveUser) -> User:
 CurrentActiveAuditor = Annotated[User, Depends(get_current_active_auditor)]
 
 
+@traced
 def get_current_active_user_with_company_access(
     company_id: uuid.UUID,
     session: SessionDep,
@@ -100,6 +136,7 @@ def get_current_active_user_with_company_access(
 CurrentActiveUserWithCompanyAccess = Annotated[User, Depends(get_current_active_user_with_company_access)]
 
 
+@traced
 def get_current_active_user_with_area_access(
     area_id: uuid.UUID,
     session: SessionDep,
@@ -131,34 +168,12 @@ def get_current_active_user_with_area_access(
 
 CurrentActiveUserWithAreaAccess = Annotated[User, Depends(get_current_active_user_with_area_access)]
 
-def obfuscate_data_for_demo_company(data: Any, current_user: User) -> Any:
-    is_viewer_privileged = current_user.is_superuser or current_user.role == UserRole.ADMIN
-    if is_viewer_privileged:
-        return data
-
-    was_list = isinstance(data, list)
-    items = data if was_list else [data]
-    
-    # We create copies to avoid mutating session-managed objects
-    copied_items = [item.model_copy(deep=True) for item in items]
-
-    for item in copied_items:
-        company = None
-        # This can trigger lazy-loading if relationships are not pre-loaded.
-        # Ensure your CRUD functions load necessary relationships for performance.
-        if hasattr(item, 'company') and item.company:
-            company = item.company
-        elif hasattr(item, 'audit_assignment') and item.audit_assignment and hasattr(item.audit_assignment, 'company'):
-            company = item.audit_assignment.company
-
-        if company and company.is_demo:
-            if hasattr(item, 'email'):
-                item.email = "hidden"
-            if hasattr(item, 'full_name'):
-                item.full_name = "Demo User"
-            # Special handling for AuditResponse auditor details
-            if isinstance(item, AuditResponse) and hasattr(item, 'auditor') and item.auditor:
-                item.auditor.email = "hidden"
-                item.auditor.full_name = "Demo User"
-                
-    return copied_items if was_list else copied_items[0]
+def get_demo_context(session: Session, viewer: User) -> Optional[dict[str, Any]]:
+    """
+    Serialization context that makes UserPublic hide the identity of users in demo
+    companies (see models.UserPublic). None when the viewer may see everything.
+    """
+    if viewer.is_superuser or viewer.role == UserRole.ADMIN:
+        return None
+    ids = demo_company_ids.get(session)
+    return {"demo_company_ids": ids} if ids else None
@@ -11,6 +11,9 @@ from app.api.routes.audit_templates import router as audit_templates_router
 from app.api.routes.audit_assignments import router as audit_assignments_router
 from app.api.routes.audit_responses import router as audit_responses_router
 from app.api.routes.assigned_questions import router as assigned_questions_router
+from app.api.routes.sync import router as sync_router
+from app.api.routes.batch import router as batch_router
+from app.api.routes.photos import router as photos_router
 
 from app.core.config import settings
 
@@ -24,6 +27,9 @@ api_router.include_router(audit_templates_router)
 api_router.include_router(audit_assignments_router)
 api_router.include_router(audit_responses_router)
 api_router.include_router(assigned_questions_router)
+api_router.include_router(sync_router)
+api_router.include_router(batch_router)
+api_router.include_router(photos_router)
 
 
 if settings.ENVIRONMENT == "local":
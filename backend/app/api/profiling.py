@@ -0,0 +1,246 @@
+import contextvars
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from types import FrameType
+from typing import Any, Optional
+
+import anyio.to_thread
+import jwt
+from jwt.exceptions import InvalidTokenError
+from pydantic import ValidationError
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.deps import get_db
+from app.core import security
+from app.core.config import settings
+from app.core.query_stats import QueryStats, track_queries
+from app.models import TokenPayload, User
+
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY_PARAM = "profile"
+
+_FrameKey = tuple[str, str, int]
+
+# anyio's threadpool worker loop, WorkerThread.run, runs each job with
+# `context.run(func, *args)`. Matched by name and class since code objects only know
+# their qualified name from Python 3.11 on.
+_WORKER_LOOP = ("run", "WorkerThread")
+
+
+def _is_worker_loop(frame: FrameType) -> bool:
+    if frame.f_code.co_name != _WORKER_LOOP[0]:
+        return False
+    return type(frame.f_locals.get("self")).__name__ == _WORKER_LOOP[1]
+
+
+# The profile a piece of work belongs to; threadpool workers run it in a copy of the
+# request's context, which is how the sampler tells them apart from other requests
+_current: contextvars.ContextVar[Optional["_Sampler"]] = contextvars.ContextVar("profile", default=None)
+# One profile per worker at a time, sampling is not free
+_busy = threading.Lock()
+
+
+def _worker_context(frame: Optional[FrameType]) -> Optional[contextvars.Context]:
+    """Context of the job an anyio worker thread is running, None for other threads."""
+    while frame is not None:
+        if _is_worker_loop(frame):
+            context = frame.f_locals.get("context")
+            return context if isinstance(context, contextvars.Context) else None
+        frame = frame.f_back
+    return None
+
+
+def _stack(frame: Optional[FrameType]) -> tuple[_FrameKey, ...]:
+    """Root-first call stack, starting below the anyio worker loop for threadpool work."""
+    keys: list[_FrameKey] = []
+    while frame is not None:
+        if _is_worker_loop(frame):
+            break
+        code = frame.f_code
+        keys.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    return tuple(reversed(keys))
+
+
+def _idle(frame: FrameType) -> bool:
+    # The event loop waiting on its selector while the threadpool does the work
+    return frame.f_code.co_filename.endswith("selectors.py")
+
+
+class _Sampler(threading.Thread):
+    """
+    Samples the stacks of the event loop thread and of the threadpool workers running
+    work for this request, weighting each sample by the time since the previous one.
+    """
+
+    def __init__(self, loop_thread: int, interval: float) -> None:
+        super().__init__(name="profiler", daemon=True)
+        self.loop_thread = loop_thread
+        self.interval = interval
+        # Seconds spent in each stack, per thread
+        self.samples: defaultdict[tuple[int, tuple[_FrameKey, ...]], float] = defaultdict(float)
+        self.thread_names: dict[int, str] = {}
+        self._finished = threading.Event()
+
+    def run(self) -> None:
+        last = time.perf_counter()
+        while not self._finished.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == self.ident:
+                    continue
+                if ident == self.loop_thread:
+                    if _idle(frame):
+                        continue
+                else:
+                    context = _worker_context(frame)
+                    if context is None or context.get(_current) is not self:
+                        continue
+                self.samples[(ident, _stack(frame))] += weight
+            # Frames keep their locals alive
+            del frames
+
+    def stop(self) -> None:
+        self._finished.set()
+        self.join()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, _ in self.samples:
+            self.thread_names[ident] = "event loop" if ident == self.loop_thread else names.get(ident, str(ident))
+
+
+def speedscope(name: str, sampler: _Sampler, stats: QueryStats) -> dict[str, Any]:
+    """
+    The samples as a speedscope document (https://www.speedscope.app), one profile
+    per thread, plus an "SQL" profile weighting each statement shape by its DB time.
+    """
+    frames: list[dict[str, Any]] = []
+    index: dict[_FrameKey, int] = {}
+
+    def frame_id(key: _FrameKey) -> int:
+        if key not in index:
+            index[key] = len(frames)
+            frames.append({"name": key[0], "file": key[1], "line": key[2]})
+        return index[key]
+
+    def profile(profile_name: str, weighted: list[tuple[tuple[_FrameKey, ...], float]]) -> dict[str, Any]:
+        total = sum(ms for _, ms in weighted)
+        return {
+            "type": "sampled",
+            "name": profile_name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": round(total, 3),
+            "samples": [[frame_id(key) for key in stack] for stack, _ in weighted],
+            "weights": [round(ms, 3) for _, ms in weighted],
+        }
+
+    by_thread: dict[int, list[tuple[tuple[_FrameKey, ...], float]]] = {}
+    for (ident, stack), seconds in sampler.samples.items():
+        by_thread.setdefault(ident, []).append((stack, seconds * 1000))
+    profiles = [profile(sampler.thread_names[ident], weighted) for ident, weighted in by_thread.items()]
+    sql: list[tuple[tuple[_FrameKey, ...], float]] = [
+        ((("SQL", "", 0), (shape[:300], "", 0)), seconds * 1000)
+        for shape, seconds in sorted(stats.shape_seconds.items(), key=lambda item: item[1], reverse=True)
+    ]
+    profiles.append(profile(f"SQL: {stats.count} queries", sql))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": settings.PROJECT_NAME,
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+def _requested(scope: Scope) -> bool:
+    if Headers(scope=scope).get(PROFILE_HEADER):
+        return True
+    return QueryParams(scope.get("query_string", b"")).get(PROFILE_QUERY_PARAM) not in (None, "", "0")
+
+
+def _is_superuser(scope: Scope) -> bool:
+    scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+        token_data = TokenPayload(**payload)
+    except (InvalidTokenError, ValidationError):
+        return False
+    if token_data.sub is None:
+        return False
+    # Through the app's session dependency, so overrides (the test database) apply
+    sessions = contextmanager(scope["app"].dependency_overrides.get(get_db, get_db))
+    with sessions() as session:
+        user = session.get(User, token_data.sub)
+        return user is not None and user.is_active and user.is_superuser
+
+
+class ProfilingMiddleware:
+    """
+    Profile a request when it carries an X-Profile header or a profile=1 query
+    parameter and a superuser's token, and answer with the speedscope profile in
+    place of the response. For anyone else the flag is ignored and the request runs
+    as usual, so the check costs a header lookup on every other request.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not _requested(scope)
+            or not await anyio.to_thread.run_sync(_is_superuser, scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+        if not _busy.acquire(blocking=False):
+            response: Response = JSONResponse({"detail": "Another request is being profiled"}, status_code=409)
+            await response(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            _busy.release()
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send) -> None:
+        status = 500
+
+        async def discard(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        sampler = _Sampler(threading.get_ident(), settings.PROFILING_INTERVAL_MS / 1000)
+        token = _current.set(sampler)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            with track_queries() as stats:
+                await self.app(scope, receive, discard)
+        finally:
+            sampler.stop()
+            _current.reset(token)
+        duration_ms = (time.perf_counter() - started) * 1000
+        name = f"{scope['method']} {scope['path']} -> {status} in {duration_ms:.0f} ms"
+        document = speedscope(name, sampler, stats)
+        filename = f"profile-{time.strftime('%Y%m%dT%H%M%S')}.speedscope.json"
+        response = Response(
+            json.dumps(document),
+            media_type="application/json",
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "X-Profiled-Status": str(status),
+            },
+        )
+        await response(scope, receive, send)
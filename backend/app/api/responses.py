@@ -0,0 +1,26 @@
+from fastapi import Response
+
+from app.api.content_negotiation import MSGPACK_MEDIA_TYPE, json_to_msgpack, msgpack, wants_msgpack
+
+
+def json_bytes_response(content: bytes, response: Response) -> Response:
+    """
+    Wrap an already serialized JSON body, keeping headers that dependencies or the
+    route set on the injected `response` (ETag, cache status). Cached JSON is converted
+    for clients that negotiated MessagePack.
+    """
+    if wants_msgpack():
+        return msgpack_bytes_response(json_to_msgpack(content), response)
+    return _bytes_response(content, "application/json", response)
+
+
+def msgpack_bytes_response(content: bytes, response: Response) -> Response:
+    return _bytes_response(content, MSGPACK_MEDIA_TYPE, response)
+
+
+def _bytes_response(content: bytes, media_type: str, response: Response) -> Response:
+    headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    result = Response(content=content, media_type=media_type, headers=headers)
+    if msgpack is not None:
+        result.headers.add_vary_header("Accept")
+    return result
@@ -1,9 +1,11 @@
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlmodel import select
 
+from app.api.responses import json_bytes_response
+from app.api.serialization import dump_public
 from app.crud.area import area as crud_area
 from app.api.deps import (
     CurrentActiveAdminOrSuperuser,
@@ -11,7 +13,8 @@ from app.api.deps import (
     get_current_active_user_with_area_access,
     get_current_active_user_with_company_access,
 )
-from app.models import AreaCreate, AreaPublic, AreaUpdate, AreasPublic, Message, User
+from app.models import AreaCreate, AreaPublic, AreaUpdate, AreasPublic, Message, User, UserRole
+from app.response_cache import response_cache, tag
 
 router = APIRouter(prefix="/companies/{company_id}/areas", tags=["areas"])
 
@@ -22,6 +25,8 @@ router = APIRouter(prefix="/companies/{company_id}/areas", tags=["areas"])
 )
 def read_areas(
     company_id: uuid.UUID,
+    request: Request,
+    response: Response,
     session: SessionDep,
     current_user: User = Depends(get_current_active_user_with_company_access),  # noqa: ARG001
     skip: int = 0,
@@ -30,9 +35,23 @@ def read_areas(
     """
     Retrieve areas for a specific company.
     """
+    if current_user.is_superuser or current_user.role == UserRole.ADMIN:
+        scope: tuple[Any, ...] = ("all",)
+    else:
+        scope = tuple(sorted(str(area.id) for area in current_user.assigned_areas))
+    # Invalidation only reaches this worker, and a write can land while a body is being
+    # built, so the key also carries the version the body was read at
+    version = crud_area.get_collection_version(session=session, company_id=company_id)
+    cache_key = response_cache.key("areas", request, version, company_id, *scope)
+    if (cached := response_cache.get("areas", cache_key)) is not None:
+        return json_bytes_response(cached, response)
+
     areas = crud_area.get_multi_by_company(session=session, company_id=company_id, current_user=current_user, skip=skip, limit=limit)
     count = crud_area.count_by_company(session=session, company_id=company_id, current_user=current_user)
-    return AreasPublic(data=areas, count=count)
+    body = dump_public(AreasPublic, {"data": areas, "count": count})
+    tags = [tag("areas"), tag("company", company_id), *(tag("area", area.id) for area in areas)]
+    response_cache.set("areas", cache_key, body, tags=tags)
+    return json_bytes_response(body, response)
 
 
 @router.post(
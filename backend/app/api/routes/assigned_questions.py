@@ -1,9 +1,11 @@
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from sqlmodel import func, select
 
+from app.api.conditional import check_etag
+from app.api.serialization import public_response
 from app.crud.assigned_question import assigned_question as crud_assigned_question
 from app.crud.audit_assignment import audit_assignment as crud_audit_assignment
 from app.api.deps import SessionDep, get_current_active_user
@@ -24,6 +26,8 @@ router = APIRouter(prefix="/audit-assignments/{assignment_id}/assigned-questions
 )
 def read_assigned_questions_for_assignment(
     assignment_id: uuid.UUID,
+    request: Request,
+    response: Response,
     session: SessionDep,
     current_user: User = Depends(get_current_active_user), # Permissions handled by crud.can_user_access_assignment
     skip: int = 0,
@@ -39,9 +43,13 @@ def read_assigned_questions_for_assignment(
     if not crud_audit_assignment.can_user_access_assignment(user=current_user, assignment=assignment, session=session):
         raise HTTPException(status_code=403, detail="Not enough permissions to access this audit assignment")
 
+    version = crud_assigned_question.get_collection_version(session=session, audit_assignment_id=assignment_id)
+    if not_modified := check_etag(request, response, version, skip, limit):
+        return not_modified
+
     questions = crud_assigned_question.get_multi_for_assignment(session=session, audit_assignment_id=assignment_id, skip=skip, limit=limit)
     count = crud_assigned_question.count_for_assignment(session=session, audit_assignment_id=assignment_id)
-    return AssignedQuestionsPublic(data=questions, count=count)
+    return public_response(AssignedQuestionsPublic, {"data": questions, "count": count}, response)
 
 
 @router.get(
@@ -1,9 +1,17 @@
 import uuid
+from collections.abc import Iterator
+from datetime import date
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, func, select
 
+from app import template_cache
+from app.response_cache import response_cache, tag
+from app.api.conditional import check_etag
+from app.api.responses import json_bytes_response
+from app.api.serialization import dump_public, public_response
 from app.crud.audit_assignment import audit_assignment as crud_audit_assignment
 from app.api.deps import (
     CurrentActiveAdminOrSuperuser,
@@ -13,6 +21,7 @@ from app.api.deps import (
     get_current_active_user_with_company_access,
 )
 from app.models import (
+    AuditAssignment,
     AuditAssignmentCreate,
     AuditAssignmentPublic,
     AuditAssignmentsPublic,
@@ -29,6 +38,8 @@ router = APIRouter(prefix="/audit-assignments", tags=["audit-assignments"])
     response_model=AuditAssignmentsPublic,
 )
 def read_all_audit_assignments(
+    request: Request,
+    response: Response,
     session: SessionDep,
     current_user: CurrentActiveAdminOrSuperuser,  # noqa: ARG001  # noqa: ARG001
     skip: int = 0,
@@ -37,9 +48,12 @@ def read_all_audit_assignments(
     """
     Retrieve all audit assignments (Superuser/Admin only).
     """
+    version = crud_audit_assignment.get_collection_version(session=session, conditions=[])
+    if not_modified := check_etag(request, response, version, skip, limit):
+        return not_modified
     assignments = crud_audit_assignment.get_all(session=session, skip=skip, limit=limit)
     count = crud_audit_assignment.count_all(session=session)
-    return AuditAssignmentsPublic(data=assignments, count=count)
+    return public_response(AuditAssignmentsPublic, {"data": assignments, "count": count}, response)
 
 
 @router.get(
@@ -47,6 +61,8 @@ def read_all_audit_assignments(
     response_model=AuditAssignmentsPublic,
 )
 def read_my_audit_assignments(
+    request: Request,
+    response: Response,
     session: SessionDep,
     current_user: CurrentActiveAuditor,
     skip: int = 0,
@@ -55,9 +71,78 @@ def read_my_audit_assignments(
     """
     Retrieve audit assignments that the current auditor can respond to.
     """
+    # The visible set depends on the caller's company and areas, not just on the rows
+    area_ids = sorted(str(link.area_id) for link in current_user.area_links)
+    version = None
+    if current_user.company_id:
+        conditions = crud_audit_assignment.get_auditor_conditions(current_user=current_user)
+        version = crud_audit_assignment.get_collection_version(session=session, conditions=conditions)
+        scope = (current_user.id, current_user.company_id, *area_ids, skip, limit)
+        if not_modified := check_etag(request, response, version, *scope):
+            return not_modified
+
+    # Auditors sharing a company and set of areas get the same list, so share the body.
+    # The version is part of the key: invalidation only reaches the worker that made
+    # the write, and a body built while a write commits must not outlive it.
+    cache_key = response_cache.key(
+        "my-assignments",
+        request,
+        version,
+        current_user.role,
+        current_user.is_superuser,
+        current_user.company_id,
+        *area_ids,
+    )
+    if (cached := response_cache.get("my-assignments", cache_key)) is not None:
+        return json_bytes_response(cached, response)
+
     assignments = crud_audit_assignment.get_multi_for_auditor(session=session, current_user=current_user, skip=skip, limit=limit)
     count = crud_audit_assignment.count_for_auditor(session=session, current_user=current_user)
-    return AuditAssignmentsPublic(data=assignments, count=count)
+    body = dump_public(AuditAssignmentsPublic, {"data": assignments, "count": count})
+    tags = {tag("assignments"), tag("company", current_user.company_id)}
+    for assignment in assignments:
+        tags.update((tag("assignment", assignment.id), tag("template", assignment.audit_template_id)))
+    response_cache.set("my-assignments", cache_key, body, tags=tags)
+    return json_bytes_response(body, response)
+
+
+CALENDAR_MAX_DAYS = 366
+
+
+@router.get(
+    "/calendar",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}, "description": "One AuditCalendarEntry per line"}},
+)
+def read_audit_calendar(
+    session: SessionDep,
+    current_user: CurrentActiveUser,
+    window_from: date = Query(alias="from"),
+    window_to: date = Query(alias="to"),
+) -> Any:
+    """
+    Stream every audit occurrence between `from` and `to` (inclusive), ordered by date.
+    Recurring assignments are expanded on the fly; nothing is created in the database.
+    """
+    if window_to < window_from:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (window_to - window_from).days > CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Calendar window cannot exceed {CALENDAR_MAX_DAYS} days")
+
+    conditions = crud_audit_assignment.get_calendar_conditions(current_user=current_user)
+    bind = session.get_bind()
+
+    def stream() -> Iterator[bytes]:
+        if conditions is None:
+            return
+        # Request-scoped dependencies are closed before the body is streamed
+        with Session(bind) as stream_session:
+            for entry in crud_audit_assignment.iter_calendar(
+                stream_session, conditions=conditions, window_from=window_from, window_to=window_to
+            ):
+                yield entry.model_dump_json().encode() + b"\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 
 @router.get(
@@ -66,6 +151,8 @@ def read_my_audit_assignments(
 )
 def read_audit_assignments_for_company(
     company_id: uuid.UUID,
+    request: Request,
+    response: Response,
     session: SessionDep,
     current_user: User = Depends(get_current_active_user_with_company_access),
     skip: int = 0,
@@ -74,9 +161,14 @@ def read_audit_assignments_for_company(
     """
     Retrieve audit assignments for a specific company.
     """
+    version = crud_audit_assignment.get_collection_version(
+        session=session, conditions=[AuditAssignment.company_id == company_id]
+    )
+    if not_modified := check_etag(request, response, version, company_id, skip, limit):
+        return not_modified
     assignments = crud_audit_assignment.get_multi_for_company(session=session, company_id=company_id, current_user=current_user, skip=skip, limit=limit)
     count = crud_audit_assignment.count_for_company(session=session, company_id=company_id, current_user=current_user)
-    return AuditAssignmentsPublic(data=assignments, count=count)
+    return public_response(AuditAssignmentsPublic, {"data": assignments, "count": count}, response)
 
 
 @router.post(
@@ -102,6 +194,8 @@ def create_audit_assignment(
 )
 def read_audit_assignment_by_id(
     assignment_id: uuid.UUID,
+    request: Request,
+    response: Response,
     session: SessionDep,
     current_user: CurrentActiveUser, # Permissions handled by crud.can_user_access_assignment
 ) -> Any:
@@ -116,7 +210,18 @@ def read_audit_assignment_by_id(
     if not crud_audit_assignment.can_user_access_assignment(user=current_user, assignment=assignment, session=session):
         raise HTTPException(status_code=403, detail="Not enough permissions to access this audit assignment")
 
-    return assignment
+    version = crud_audit_assignment.get_version(session=session, assignment_id=assignment_id)
+    if not_modified := check_etag(request, response, version):
+        return not_modified
+    # Reuse the cached template instead of lazy loading it and its questions; the last
+    # three parts of the assignment's version are the template's
+    template = template_cache.get(session, assignment.audit_template_id, version[3:] if version else None)
+    content = {
+        **assignment.model_dump(),
+        "audit_template": template.template if template else None,
+        "assigned_questions": assignment.assigned_questions,
+    }
+    return public_response(AuditAssignmentPublic, content, response)
 
 
 @router.patch(
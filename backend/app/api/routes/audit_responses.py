@@ -1,28 +1,31 @@
 import uuid
-from typing import Any
+from datetime import timedelta
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
-import uuid
-from typing import Any
-
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import func, select
 
+from app.api.responses import json_bytes_response
+from app.api.serialization import dump_public
+from app.core.config import settings
 from app.crud.audit_response import audit_response as crud_audit_response
+from app.crud.idempotency_key import idempotency_key as crud_idempotency_key
 from app.crud.audit_assignment import audit_assignment as crud_audit_assignment
 from app.api.deps import (
     CurrentActiveAdminOrSuperuser,
     CurrentActiveAuditor,
     CurrentActiveUser,
     SessionDep,
-    obfuscate_data_for_demo_company,
 )
 from app.models import (
     AuditResponse,
     AuditResponseCreate,
     AuditResponsePublic,
     AuditResponsesPublic,
+    AuditResponseSubmit,
     AuditResponseUpdate,
+    IdempotencyKey,
     Message,
 )
 
@@ -47,6 +50,66 @@ def create_audit_response(
     return response
 
 
+def _replay(record: IdempotencyKey, request_hash: str, response: Response) -> Response:
+    if record.request_hash != request_hash:
+        raise HTTPException(status_code=409, detail="Idempotency-Key was already used for a different request")
+    if record.response_body is None:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+    response.headers["Idempotent-Replayed"] = "true"
+    return json_bytes_response(record.response_body, response)
+
+
+@router.post(
+    "/submit",
+    response_model=AuditResponsePublic,
+    responses={409: {"description": "Idempotency-Key reused for a different request, or still in progress"}},
+)
+def submit_audit_response(
+    assignment_id: uuid.UUID,
+    *,
+    session: SessionDep,
+    response: Response,
+    submission_in: AuditResponseSubmit,
+    current_user: CurrentActiveAuditor,
+    idempotency_key: Annotated[str, Header(min_length=1, max_length=255)],
+) -> Any:
+    """
+    Submit a complete audit response with all of its answers in one transaction.
+    Retries with the same Idempotency-Key get the stored result back.
+    """
+    request_hash = crud_idempotency_key.fingerprint(str(assignment_id), submission_in.model_dump_json())
+    record = crud_idempotency_key.get(session=session, user_id=current_user.id, key=idempotency_key)
+    if record is not None:
+        return _replay(record, request_hash, response)
+
+    try:
+        record = crud_idempotency_key.claim(
+            session=session,
+            user_id=current_user.id,
+            key=idempotency_key,
+            request_hash=request_hash,
+            ttl=timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+        )
+    except IntegrityError:
+        # A concurrent retry committed first
+        session.rollback()
+        record = crud_idempotency_key.get(session=session, user_id=current_user.id, key=idempotency_key)
+        if record is None:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        return _replay(record, request_hash, response)
+
+    assignment = crud_audit_assignment.get(session=session, assignment_id=assignment_id)
+    if not assignment:
+        raise HTTPException(status_code=404, detail="Audit Assignment not found")
+    db_response = crud_audit_response.submit(
+        session=session, assignment=assignment, submission_in=submission_in, auditor=current_user
+    )
+    body = dump_public(AuditResponsePublic, db_response)
+    crud_idempotency_key.complete(session=session, record=record, status_code=200, body=body)
+    session.commit()
+    return json_bytes_response(body, response)
+
+
 @router.get(
     "/",
     response_model=AuditResponsesPublic,
@@ -71,8 +134,6 @@ def read_audit_responses_for_assignment(
     responses = crud_audit_response.get_multi_for_assignment(session=session, assignment_id=assignment_id, skip=skip, limit=limit)
     count = crud_audit_response.count_for_assignment(session=session, assignment_id=assignment_id)
 
-    responses = obfuscate_data_for_demo_company(responses, current_user)
-
     return AuditResponsesPublic(data=responses, count=count)
 
 
@@ -100,7 +161,6 @@ def read_audit_response_by_id(
     if not crud_audit_assignment.can_user_access_assignment(user=current_user, assignment=assignment, session=session):
         raise HTTPException(status_code=403, detail="Not enough permissions to access this audit assignment")
 
-    response = obfuscate_data_for_demo_company(response, current_user)
     return response
 
 
@@ -126,5 +186,4 @@ def update_audit_response(
     # Permissions are handled within crud.update_audit_response_db
     updated_response = crud_audit_response.update(session=session, db_response=response, response_in=response_in, current_user=current_user)
 
-    updated_response = obfuscate_data_for_demo_company(updated_response, current_user)
     return updated_response
@@ -1,9 +1,11 @@
 import uuid
 from typing import Any, List, Dict
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlmodel import func, select
 
+from app.api.conditional import check_etag
+from app.api.responses import json_bytes_response
 from app.crud.audit_template import audit_template as crud_audit_template
 from app.crud.question_template import question_template as crud_question_template
 from app.api.deps import (
@@ -25,6 +27,7 @@ from app.models import (
     Message,
 )
 from app.audit_types import get_audit_type_definition, AUDIT_TYPE_DEFINITIONS
+from app import template_cache
 
 router = APIRouter(prefix="/audit-templates", tags=["audit-templates"])
 
@@ -34,6 +37,8 @@ router = APIRouter(prefix="/audit-templates", tags=["audit-templates"])
     response_model=AuditTemplatesPublic,
 )
 def read_audit_templates(
+    request: Request,
+    response: Response,
     session: SessionDep,
     current_user: CurrentActiveUser,
     skip: int = 0,
@@ -42,9 +47,14 @@ def read_audit_templates(
     """
     Retrieve audit templates.
     """
+    version = crud_audit_template.get_collection_version(session=session)
+    if not_modified := check_etag(request, response, version, skip, limit):
+        return not_modified
     templates = crud_audit_template.get_multi(session=session, skip=skip, limit=limit)
     count = crud_audit_template.count(session=session)
-    return AuditTemplatesPublic(data=templates, count=count)
+    cached = template_cache.get_many(session, [template.id for template in templates])
+    body = b",".join(cached[template.id].json for template in templates if template.id in cached)
+    return json_bytes_response(b'{"data":[%s],"count":%d}' % (body, count), response)
 
 
 @router.get(
@@ -84,15 +94,21 @@ def create_audit_template(
 )
 def read_audit_template(
     template_id: uuid.UUID,
+    request: Request,
+    response: Response,
     session: SessionDep,
 ) -> Any:
     """
     Get a specific audit template by id.
     """
-    template = crud_audit_template.get(session=session, template_id=template_id)
+    version = crud_audit_template.get_version(session=session, template_id=template_id)
+    if not_modified := check_etag(request, response, version):
+        return not_modified
+    # Checked against `version`, so a template another worker changed is not served stale
+    template = template_cache.get(session, template_id, version)
     if not template:
         raise HTTPException(status_code=404, detail="Audit Template not found")
-    return template
+    return json_bytes_response(template.json, response)
 
 
 @router.patch(
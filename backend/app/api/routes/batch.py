@@ -0,0 +1,127 @@
+import json
+from typing import Any, Optional
+
+import anyio
+import httpx
+from fastapi import APIRouter, HTTPException, Request
+from sqlalchemy.orm import SessionTransaction
+from sqlmodel import Session
+
+from app.api.deps import CurrentActiveUser, SessionDep, batch_principal, batch_session
+from app.core.config import settings
+from app.models import BatchRequest, BatchRequestItem, BatchResponse, BatchResponseItem, User
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+# Response headers worth handing back to the client per sub-request
+_FORWARDED_RESPONSE_HEADERS = ("etag", "idempotent-replayed", "location", "cache-control")
+
+
+def _begin_savepoint(session: Session) -> SessionTransaction:
+    savepoint = session.begin_nested()
+    # SAVEPOINT is otherwise only sent with the sub-request's first statement
+    session.connection()
+    return savepoint
+
+
+async def _dispatch(
+    client: httpx.AsyncClient,
+    item: BatchRequestItem,
+    headers: dict[str, str],
+    principal: User,
+    session: Optional[Session],
+) -> BatchResponseItem:
+    # A sub-request on the shared session runs inside a savepoint, so whatever it
+    # flushed before failing is not committed by a later one, and a failed flush does
+    # not leave the session unusable for the rest of the batch
+    savepoint = None if session is None else await anyio.to_thread.run_sync(_begin_savepoint, session)
+    principal_token = batch_principal.set(principal)
+    session_token = batch_session.set(session)
+    try:
+        sub_response = await client.request(
+            item.method,
+            f"{settings.API_V1_STR}{item.path}",
+            headers={**item.headers, **headers},
+            content=None if item.body is None else json.dumps(item.body).encode(),
+        )
+    except BaseException:
+        if savepoint is not None and savepoint.is_active:
+            await anyio.to_thread.run_sync(savepoint.rollback)
+        raise
+    finally:
+        batch_session.reset(session_token)
+        batch_principal.reset(principal_token)
+    # Inactive when the route committed or rolled back the whole transaction itself
+    if savepoint is not None and savepoint.is_active:
+        if sub_response.is_success or sub_response.status_code == 304:
+            await anyio.to_thread.run_sync(savepoint.commit)
+        else:
+            await anyio.to_thread.run_sync(savepoint.rollback)
+
+    body: Any = None
+    if sub_response.content:
+        if sub_response.headers.get("content-type", "").startswith("application/json"):
+            body = sub_response.json()
+        else:
+            body = sub_response.text
+    return BatchResponseItem(
+        status=sub_response.status_code,
+        headers={name: sub_response.headers[name] for name in _FORWARDED_RESPONSE_HEADERS if name in sub_response.headers},
+        body=body,
+    )
+
+
+@router.post(
+    "/",
+    response_model=BatchResponse,
+)
+async def run_batch(
+    request: Request,
+    batch_in: BatchRequest,
+    session: SessionDep,
+    current_user: CurrentActiveUser,
+) -> Any:
+    """
+    Run several API requests in one round trip, as the current user.
+
+    Sub-requests go through the regular routes and come back in order, each with its
+    own status. Reads before the first write run concurrently, each on its own
+    session; from the first write on, sub-requests run one after another on this
+    request's session so they see each other's changes.
+    """
+    items = batch_in.requests
+    if len(items) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"A batch may hold at most {settings.BATCH_MAX_REQUESTS} requests")
+    if any(item.path.split("?")[0].rstrip("/") == router.prefix for item in items):
+        raise HTTPException(status_code=400, detail="Batches cannot be nested")
+
+    headers = {
+        "authorization": request.headers.get("authorization", ""),
+        "content-type": "application/json",
+        # The batch response as a whole is compressed and negotiated instead
+        "accept": "application/json",
+        "accept-encoding": "identity",
+    }
+    results: list[Optional[BatchResponseItem]] = [None] * len(items)
+    transport = httpx.ASGITransport(app=request.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url=str(request.base_url)) as client:
+
+        async def run_isolated(index: int) -> None:
+            results[index] = await _dispatch(client, items[index], headers, current_user, None)
+
+        index = 0
+        wrote = False
+        while index < len(items):
+            if wrote or items[index].method != "GET":
+                results[index] = await _dispatch(client, items[index], headers, current_user, session)
+                wrote = wrote or items[index].method != "GET"
+                index += 1
+                continue
+            end = index
+            while end < len(items) and items[end].method == "GET":
+                end += 1
+            async with anyio.create_task_group() as task_group:
+                for concurrent in range(index, end):
+                    task_group.start_soon(run_isolated, concurrent)
+            index = end
+    return BatchResponse(responses=results)
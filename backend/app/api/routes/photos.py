@@ -0,0 +1,276 @@
+import fcntl
+import hashlib
+import os
+import uuid
+from collections.abc import Callable, Iterator
+from datetime import timedelta
+from pathlib import Path as FilePath
+from typing import Annotated, Any, BinaryIO
+
+import anyio
+from fastapi import APIRouter, Header, HTTPException, Path, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+from starlette.requests import ClientDisconnect
+
+from app import crud
+from app.api.conditional import is_not_modified, requested_range
+from app.api.deps import CurrentActiveUser, SessionDep, StorageDep, ThumbnailsDep
+from app.core.config import settings
+from app.core.images import THUMBNAIL_MEDIA_TYPE
+from app.core.storage import CHUNK_SIZE, StorageBackend, read_chunks
+from app.models import PhotoUpload, PhotoUploadCreate, PhotoUploadPublic
+
+router = APIRouter(prefix="/photos", tags=["photos"])
+
+# As in tus: PATCH bodies are raw bytes to append at Upload-Offset
+UPLOAD_CONTENT_TYPE = "application/offset+octet-stream"
+SHA256_PATTERN = r"^[0-9a-f]{64}$"
+
+
+def _public(upload: PhotoUpload, response: Response) -> PhotoUploadPublic:
+    response.headers["Upload-Offset"] = str(upload.offset)
+    response.headers["Upload-Length"] = str(upload.length)
+    photo_url = crud.photo.photo_url(upload.sha256) if upload.completed and upload.sha256 else None
+    return PhotoUploadPublic.model_validate(upload, update={"photo_url": photo_url})
+
+
+def _get_upload(session: SessionDep, upload_id: uuid.UUID, current_user: CurrentActiveUser) -> PhotoUpload:
+    upload = crud.photo.get_upload(session=session, upload_id=upload_id, user_id=current_user.id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+def _lock_staged(path: FilePath) -> BinaryIO:
+    """Open the staged file, locked against concurrent PATCHes until it is closed."""
+    staged = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o600), "r+b")
+    try:
+        fcntl.flock(staged, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        staged.close()
+        raise
+    return staged
+
+
+def _resume(session: Session, upload: PhotoUpload, staged: BinaryIO, upload_offset: int) -> None:
+    """Position the locked staged file at the offset the last PATCH committed."""
+    # Read under the lock, so it is the offset of the PATCH that held the lock last
+    session.refresh(upload)
+    if upload.completed or upload_offset != upload.offset:
+        raise HTTPException(status_code=409, detail=f"Upload is at offset {upload.offset}")
+    # Drop bytes past it, left by a request that failed before committing them
+    staged.truncate(upload.offset)
+    staged.seek(upload.offset)
+
+
+def _save(session: Session, upload: PhotoUpload) -> None:
+    session.add(upload)
+    session.commit()
+    session.refresh(upload)
+
+
+def _complete(session: Session, storage: StorageBackend, upload: PhotoUpload, path: FilePath) -> None:
+    """Check the finished file against the declared sha256 and move it into photo storage."""
+    digest = _sha256_file(path)
+    if upload.sha256 is not None and digest != upload.sha256:
+        path.unlink(missing_ok=True)
+        upload.offset = 0
+        _save(session, upload)
+        raise HTTPException(status_code=422, detail="Photo does not match the declared sha256, upload it again")
+    storage.put(digest, path)
+    crud.photo.complete_upload(session=session, upload=upload, sha256=digest)
+    session.commit()
+    session.refresh(upload)
+
+
+def _sha256_file(path: FilePath) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as staged:
+        while chunk := staged.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@router.post(
+    "/uploads",
+    response_model=PhotoUploadPublic,
+    status_code=201,
+)
+def create_upload(
+    upload_in: PhotoUploadCreate, session: SessionDep, current_user: CurrentActiveUser, response: Response
+) -> Any:
+    """
+    Start a resumable photo upload, then send the bytes with PATCH. When `sha256` names
+    a stored photo the caller may already read, the upload comes back complete and
+    nothing needs sending.
+    """
+    if upload_in.content_type not in settings.PHOTO_CONTENT_TYPES:
+        raise HTTPException(status_code=415, detail=f"Unsupported photo type {upload_in.content_type}")
+    if upload_in.length > settings.PHOTO_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Photos may be at most {settings.PHOTO_MAX_BYTES} bytes")
+    upload = crud.photo.create_upload(
+        session=session,
+        upload_in=upload_in,
+        user=current_user,
+        ttl=timedelta(hours=settings.PHOTO_UPLOAD_TTL_HOURS),
+    )
+    session.commit()
+    response.headers["Location"] = f"{settings.API_V1_STR}{router.prefix}/uploads/{upload.id}"
+    return _public(upload, response)
+
+
+@router.get(
+    "/uploads/{upload_id}",
+    response_model=PhotoUploadPublic,
+)
+def read_upload(upload_id: uuid.UUID, session: SessionDep, current_user: CurrentActiveUser, response: Response) -> Any:
+    """
+    State of an upload. After a dropped connection, resume with a PATCH at `offset`.
+    """
+    return _public(_get_upload(session, upload_id, current_user), response)
+
+
+@router.patch(
+    "/uploads/{upload_id}",
+    response_model=PhotoUploadPublic,
+    responses={409: {"description": "Upload-Offset does not match the upload, or another PATCH is running"}},
+)
+async def append_upload(
+    upload_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    session: SessionDep,
+    current_user: CurrentActiveUser,
+    storage: StorageDep,
+    upload_offset: Annotated[int, Header()],
+) -> Any:
+    """
+    Append the request body to an upload at `Upload-Offset`, which must be the upload's
+    current offset. The body is streamed to disk as it arrives; if the connection drops,
+    what arrived is kept. The last byte completes the upload: the file is checked
+    against the declared `sha256` and moved into photo storage.
+    """
+    if request.headers.get("content-type", "").split(";")[0].strip() != UPLOAD_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Upload chunks must be sent as {UPLOAD_CONTENT_TYPE}")
+    # The session is used from worker threads only, one call at a time, as in sync routes
+    upload = await anyio.to_thread.run_sync(_get_upload, session, upload_id, current_user)
+    path = storage.staging_dir / str(upload.id)
+    try:
+        staged = await anyio.to_thread.run_sync(_lock_staged, path)
+    except BlockingIOError:
+        raise HTTPException(status_code=409, detail="Another request is writing to this upload")
+
+    # Everything up to the commit of the new offset, and completion, happens under the
+    # lock: a retry must not truncate bytes this request wrote but has not recorded yet
+    try:
+        await anyio.to_thread.run_sync(_resume, session, upload, staged, upload_offset)
+        offset = upload.offset
+        too_long = False
+        try:
+            async for chunk in request.stream():
+                if offset + len(chunk) > upload.length:
+                    too_long = True
+                    break
+                await anyio.to_thread.run_sync(staged.write, chunk)
+                offset += len(chunk)
+        except ClientDisconnect:
+            pass
+        await anyio.to_thread.run_sync(staged.flush)
+        upload.offset = offset
+        await anyio.to_thread.run_sync(_save, session, upload)
+        if too_long:
+            raise HTTPException(status_code=413, detail=f"Upload is {upload.length} bytes long")
+        if offset == upload.length:
+            await anyio.to_thread.run_sync(_complete, session, storage, upload, path)
+    finally:
+        staged.close()
+    return _public(upload, response)
+
+
+def _immutable_file_response(
+    request: Request, etag: str, size: int, media_type: str, chunks: Callable[[int, int], Iterator[bytes]]
+) -> Response:
+    """Serve content that never changes under `etag`, honouring If-None-Match and Range."""
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable", "Accept-Ranges": "bytes"}
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    byte_range = requested_range(request, size, etag)
+    start, end = byte_range or (0, size)
+    headers["Content-Length"] = str(end - start)
+    if byte_range is None:
+        return StreamingResponse(chunks(start, end), media_type=media_type, headers=headers)
+    headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    return StreamingResponse(chunks(start, end), status_code=206, media_type=media_type, headers=headers)
+
+
+def _read_file(path: FilePath, start: int, end: int) -> Iterator[bytes]:
+    with path.open("rb") as file:
+        yield from read_chunks(file, start, end)
+
+
+@router.get(
+    "/{sha256}",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"image/*": {}}}, 206: {"description": "Partial content for a Range request"}},
+)
+def read_photo(
+    sha256: Annotated[str, Path(pattern=SHA256_PATTERN)],
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentActiveUser,
+    storage: StorageDep,
+) -> Any:
+    """
+    Download a stored photo, whole or a byte Range of it. Photos never change, so
+    clients may cache them for good. Only the uploader and users who can access an
+    assignment whose response or answers refer to the photo may read it.
+    """
+    photo = crud.photo.get(session=session, sha256=sha256)
+    # Not found either way, so a digest does not tell whether the photo is stored
+    if photo is None or not crud.photo.can_read(session=session, sha256=sha256, user=current_user):
+        raise HTTPException(status_code=404, detail="Photo not found")
+    return _immutable_file_response(
+        request,
+        f'"{sha256}"',
+        photo.size,
+        photo.content_type,
+        lambda start, end: storage.iter_chunks(sha256, start, end),
+    )
+
+
+@router.get(
+    "/{sha256}/thumbnails/{size}",
+    response_class=StreamingResponse,
+    responses={200: {"content": {THUMBNAIL_MEDIA_TYPE: {}}}, 501: {"description": "Pillow is not installed"}},
+)
+def read_thumbnail(
+    sha256: Annotated[str, Path(pattern=SHA256_PATTERN)],
+    size: str,
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentActiveUser,
+    storage: StorageDep,
+    thumbnails: ThumbnailsDep,
+) -> Any:
+    """
+    A downscaled JPEG of a photo, without its EXIF data, in one of the sizes in
+    PHOTO_THUMBNAIL_SIZES. Rendered on first request and cached from then on. Readable
+    by whoever may read the photo.
+    """
+    max_side = settings.PHOTO_THUMBNAIL_SIZES.get(size)
+    if max_side is None:
+        raise HTTPException(status_code=404, detail=f"Unknown thumbnail size {size}")
+    if crud.photo.get(session=session, sha256=sha256) is None or not crud.photo.can_read(
+        session=session, sha256=sha256, user=current_user
+    ):
+        raise HTTPException(status_code=404, detail="Photo not found")
+    etag = f'"{sha256}-{max_side}"'
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    if not thumbnails.available():
+        raise HTTPException(status_code=501, detail="Thumbnails are not available on this server")
+    path = thumbnails.get(storage, sha256, max_side)
+    return _immutable_file_response(
+        request, etag, path.stat().st_size, THUMBNAIL_MEDIA_TYPE, lambda start, end: _read_file(path, start, end)
+    )
@@ -0,0 +1,34 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, HTTPException
+
+from app.api.deps import CurrentActiveUser, SessionDep
+from app.crud.sync import decode_token
+from app.crud.sync import sync as crud_sync
+from app.models import SyncPublic, UserRole
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get(
+    "/",
+    response_model=SyncPublic,
+)
+def read_sync_changes(
+    session: SessionDep,
+    current_user: CurrentActiveUser,
+    since: Optional[str] = None,
+) -> Any:
+    """
+    Changes to the assignments, questions and responses the caller can see since the
+    token returned by their previous sync. Omit `since` for a full snapshot.
+    """
+    if not (current_user.is_superuser or current_user.role in (UserRole.ADMIN, UserRole.AUDITOR)):
+        raise HTTPException(status_code=403, detail="The user doesn't have enough privileges")
+    if not current_user.company_id:
+        raise HTTPException(status_code=400, detail="User is not assigned to a company")
+    try:
+        mark = decode_token(since) if since else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    return crud_sync.get_changes(session=session, current_user=current_user, since=mark)
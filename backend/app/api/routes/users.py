@@ -1,16 +1,18 @@
 import uuid
 from typing import Any, List
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlmodel import func, select
 
+from app.crud.email_outbox import email_outbox as crud_email_outbox
 from app.crud.user import user as crud_user
 from app.api.deps import (
     CurrentActiveAdminOrSuperuser,
     CurrentActiveUser,
     SessionDep,
-    obfuscate_data_for_demo_company,
+    get_demo_context,
 )
+from app.api.serialization import public_response
 from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
 from app.models import (
@@ -27,7 +29,7 @@ from app.models import (
     UserUpdateMe,
     UserRole,
 )
-from app.utils import generate_new_account_email, send_email
+from app.utils import generate_new_account_email
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -36,7 +38,9 @@ router = APIRouter(prefix="/users", tags=["users"])
     "/",
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, current_user: CurrentActiveAdminOrSuperuser, skip: int = 0, limit: int = 100) -> Any:
+def read_users(
+    session: SessionDep, response: Response, current_user: CurrentActiveAdminOrSuperuser, skip: int = 0, limit: int = 100
+) -> Any:
     """
     Retrieve users.
     """
@@ -47,15 +51,16 @@ def read_users(session: SessionDep, current_user: CurrentActiveAdminOrSuperuser,
     statement = select(User).offset(skip).limit(limit)
     users_db = session.exec(statement).all()
 
-    users_db = obfuscate_data_for_demo_company(users_db, current_user)
-
-    return UsersPublic(data=users_db, count=count)
+    context = get_demo_context(session, current_user)
+    return public_response(UsersPublic, {"data": users_db, "count": count}, response, context=context)
 
 
 @router.post(
     "/", response_model=UserPublic
 )
-def create_user(*, session: SessionDep, user_in: UserCreate, current_user: CurrentActiveAdminOrSuperuser) -> Any:
+def create_user(
+    *, session: SessionDep, response: Response, user_in: UserCreate, current_user: CurrentActiveAdminOrSuperuser
+) -> Any:
     """
     Create new user.
     """
@@ -71,19 +76,20 @@ def create_user(*, session: SessionDep, user_in: UserCreate, current_user: Curre
         email_data = generate_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
         )
-        send_email(
+        crud_email_outbox.enqueue(
+            session=session,
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
         )
-    
-    user = obfuscate_data_for_demo_company(user, current_user)
-    return user
+    session.commit()
+
+    return public_response(UserPublic, user, response, context=get_demo_context(session, current_user))
 
 
 @router.patch("/me", response_model=UserPublic)
 def update_user_me(
-    *, session: SessionDep, user_in: UserUpdateMe, current_user: CurrentActiveUser
+    *, session: SessionDep, response: Response, user_in: UserUpdateMe, current_user: CurrentActiveUser
 ) -> Any:
     """
     Update own user.
@@ -101,8 +107,7 @@ def update_user_me(
     session.commit()
     session.refresh(current_user)
 
-    current_user = obfuscate_data_for_demo_company(current_user, current_user)
-    return current_user
+    return public_response(UserPublic, current_user, response, context=get_demo_context(session, current_user))
 
 
 @router.patch("/me/password", response_model=Message)
@@ -126,12 +131,11 @@ def update_password_me(
 
 
 @router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentActiveUser) -> Any:
+def read_user_me(session: SessionDep, response: Response, current_user: CurrentActiveUser) -> Any:
     """
     Get current user.
     """
-    current_user = obfuscate_data_for_demo_company(current_user, current_user)
-    return current_user
+    return public_response(UserPublic, current_user, response, context=get_demo_context(session, current_user))
 
 
 @router.delete("/me", response_model=Message)
@@ -152,6 +156,7 @@ def delete_user_me(session: SessionDep, current_user: CurrentActiveUser) -> Any:
 def register_new_user(
     *,
     session: SessionDep,
+    response: Response,
     user_in: UserRegister,
 ) -> Any:
     """
@@ -166,13 +171,13 @@ def register_new_user(
     user_create = UserCreate.model_validate(user_in)
     user = crud_user.create(session=session, user_create=user_create)
 
-    user = obfuscate_data_for_demo_company(user, user) # Obfuscate for the user themselves
-    return user
+    # Obfuscate for the user themselves
+    return public_response(UserPublic, user, response, context=get_demo_context(session, user))
 
 
 @router.get("/{user_id}", response_model=UserPublic)
 def read_user_by_id(
-    user_id: uuid.UUID, session: SessionDep, current_user: CurrentActiveUser
+    user_id: uuid.UUID, session: SessionDep, response: Response, current_user: CurrentActiveUser
 ) -> Any:
     """
     Get a specific user by id.
@@ -187,8 +192,7 @@ def read_user_by_id(
             detail="The user doesn't have enough privileges",
         )
     
-    user = obfuscate_data_for_demo_company(user, current_user)
-    return user
+    return public_response(UserPublic, user, response, context=get_demo_context(session, current_user))
 
 
 @router.patch(
@@ -198,6 +202,7 @@ def read_user_by_id(
 def update_user(
     *,
     session: SessionDep,
+    response: Response,
     user_id: uuid.UUID,
     user_in: UserUpdate,
     current_user: CurrentActiveAdminOrSuperuser,
@@ -221,8 +226,7 @@ def update_user(
 
     db_user = crud_user.update(session=session, db_user=db_user, user_in=user_in)
     
-    db_user = obfuscate_data_for_demo_company(db_user, current_user)
-    return db_user
+    return public_response(UserPublic, db_user, response, context=get_demo_context(session, current_user))
 
 
 @router.delete("/{user_id}")
@@ -252,6 +256,7 @@ def assign_user_to_areas(
     user_id: uuid.UUID,
     area_ids: List[uuid.UUID],
     session: SessionDep,
+    response: Response,
     current_user: CurrentActiveAdminOrSuperuser,
 ) -> Any:
     """
@@ -265,8 +270,10 @@ def assign_user_to_areas(
     if not user.company_id:
         raise HTTPException(status_code=400, detail="User must have a primary company assigned before assigning areas.")
 
-    # Clear existing assignments for this user
-    session.execute(delete(UserAreaAssignmentLink).where(col(UserAreaAssignmentLink.user_id) == user_id))
+    # Clear existing assignments for this user, through the ORM so removed links are
+    # recorded for delta sync
+    for link in list(user.area_links):
+        session.delete(link)
     session.commit()
 
     new_assignments = []
@@ -286,11 +293,7 @@ def assign_user_to_areas(
     # Refresh relationships to ensure assigned_areas is updated
     session.refresh(user, attribute_names=["assigned_areas"])
 
-    is_in_demo_company = user.company.is_demo if user.company else False
-    return UserPublic.model_validate(
-        user,
-        context={"viewer_role": current_user.role, "is_user_in_demo_company": is_in_demo_company}
-    )
+    return public_response(UserPublic, user, response, context=get_demo_context(session, current_user))
 
 
 @router.delete(
@@ -1,9 +1,24 @@
-from fastapi import APIRouter, Depends
+import time
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic.networks import EmailStr
 
-from app.api.deps import get_current_active_admin_or_superuser
+from app.api.deps import SessionDep, get_current_active_admin_or_superuser, get_current_active_superuser
+from app.core.compression import compression_stats
+from app.core.config import settings
+from app.core.memory import (
+    GroupBy,
+    SnapshotNotFound,
+    SnapshotOnAnotherWorker,
+    memory_control,
+    memory_profiler,
+)
+from app.core.slow_queries import slow_query_log
+from app.crud.email_outbox import email_outbox as crud_email_outbox
 from app.models import Message
-from app.utils import generate_test_email, send_email
+from app.response_cache import response_cache
+from app.utils import generate_test_email
 
 router = APIRouter(prefix="/utils", tags=["utils"])
 
@@ -13,19 +28,161 @@ router = APIRouter(prefix="/utils", tags=["utils"])
     dependencies=[Depends(get_current_active_admin_or_superuser)],
     status_code=201,
 )
-def test_email(email_to: EmailStr) -> Message:
+def test_email(email_to: EmailStr, session: SessionDep) -> Message:
     """
     Test emails.
     """
     email_data = generate_test_email(email_to=email_to)
-    send_email(
+    crud_email_outbox.enqueue(
+        session=session,
         email_to=email_to,
         subject=email_data.subject,
         html_content=email_data.html_content,
     )
+    session.commit()
     return Message(message="Test email sent")
 
 
+@router.get(
+    "/cache-stats/",
+    dependencies=[Depends(get_current_active_admin_or_superuser)],
+)
+def cache_stats() -> dict[str, dict[str, float]]:
+    """
+    Hit ratio of the response cache per route since this worker started.
+    """
+    return response_cache.stats()
+
+
+@router.get(
+    "/compression-stats/",
+    dependencies=[Depends(get_current_active_admin_or_superuser)],
+)
+def compression_stats_view() -> dict[str, Any]:
+    """
+    Bytes saved and CPU time spent per response encoding since this worker started.
+    """
+    return compression_stats.as_dict()
+
+
+@router.get(
+    "/slow-queries/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def slow_queries_view(limit: int = Query(default=20, ge=1, le=500)) -> list[dict[str, Any]]:
+    """
+    Statements slower than SLOW_QUERY_MS since the workers started, by total time
+    spent in them, with the routes that ran them and the last captured plan. Other
+    workers' totals are those they last wrote to SLOW_QUERY_STATS_DIR.
+    """
+    return slow_query_log.top(limit)
+
+
+@router.get(
+    "/memory/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def memory_status() -> dict[str, Any]:
+    """
+    tracemalloc state, snapshots and sampled peak allocation per route on the worker
+    that serves the request; each worker traces separately.
+    """
+    return memory_profiler.status()
+
+
+def _require_control_file() -> None:
+    if not settings.MEMORY_CONTROL_FILE:
+        raise HTTPException(status_code=400, detail="MEMORY_CONTROL_FILE is not set, so workers cannot be reached")
+
+
+@router.post(
+    "/memory/start/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def start_memory_tracing(
+    frames: int = Query(default=10, ge=1, le=100), all_workers: bool = False
+) -> dict[str, Any]:
+    """
+    Start tracing allocations on this worker, or with `all_workers` on every worker,
+    keeping `frames` frames per allocation. Tracing slows workers down and uses
+    memory of its own, so stop it when done.
+    """
+    if all_workers:
+        _require_control_file()
+        memory_control.publish(tracing=True, frames=frames)
+    memory_profiler.start(frames)
+    return memory_profiler.status()
+
+
+@router.post(
+    "/memory/stop/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def stop_memory_tracing(all_workers: bool = False) -> dict[str, Any]:
+    """
+    Stop tracing on this worker, or with `all_workers` on every worker, and drop the
+    snapshots.
+    """
+    if all_workers:
+        _require_control_file()
+        memory_control.publish(tracing=False)
+    memory_profiler.stop()
+    return memory_profiler.status()
+
+
+@router.post(
+    "/memory/snapshots/",
+    dependencies=[Depends(get_current_active_superuser)],
+    status_code=201,
+)
+def take_memory_snapshot(all_workers: bool = False) -> dict[str, Any]:
+    """
+    Snapshot the allocations traced on this worker; only the latest few are kept.
+    With `all_workers`, every worker tracing since a start with `all_workers` takes
+    one as well; GET /utils/memory/ on each lists its own.
+    """
+    if all_workers:
+        _require_control_file()
+        # Catch up first, in case tracing was started through another worker
+        memory_control.apply()
+        state = memory_control.read()
+        if state is None or not state["tracing"]:
+            raise HTTPException(status_code=409, detail="Memory tracing was not started on all workers")
+        memory_control.publish(tracing=True, frames=state["frames"], snapshot_at=time.time())
+    try:
+        return memory_profiler.take_snapshot()
+    except RuntimeError:
+        raise HTTPException(status_code=409, detail="Memory tracing is not running on this worker")
+
+
+@router.get(
+    "/memory/snapshots/{snapshot_id}/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def read_memory_snapshot(
+    snapshot_id: str,
+    base: Optional[str] = None,
+    limit: int = Query(default=20, ge=1, le=500),
+    group_by: GroupBy = "lineno",
+) -> list[dict[str, Any]]:
+    """
+    Top allocation sites in a snapshot, or with `base` the sites that grew the most
+    since that earlier snapshot. Snapshots stay on the worker that took them, which
+    their id starts with; a request reaching another worker gets a 409 to retry.
+    """
+    try:
+        if base is None:
+            return memory_profiler.top(snapshot_id, limit=limit, group_by=group_by)
+        return memory_profiler.diff(snapshot_id, base, limit=limit, group_by=group_by)
+    except SnapshotOnAnotherWorker as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Snapshot {e} was taken by worker {e.pid}, not this one; retry to reach it",
+        )
+    except SnapshotNotFound as e:
+        raise HTTPException(status_code=404, detail=f"Snapshot {e} not found on this worker")
+
+
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
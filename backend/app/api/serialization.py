@@ -0,0 +1,68 @@
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlmodel import SQLModel
+
+from app import models
+from app.api.content_negotiation import negotiated, packb, wants_msgpack
+from app.api.responses import json_bytes_response, msgpack_bytes_response
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+else:  # pragma: no cover
+    FastJSONResponse = JSONResponse
+
+# Default response classes that also speak MessagePack (see content_negotiation.py)
+NegotiatedJSONResponse = negotiated(JSONResponse)
+NegotiatedFastJSONResponse = negotiated(FastJSONResponse)
+
+# Compiling the core schema of the nested *Public models is the expensive part, so do
+# it once at import instead of on every response
+PUBLIC_ADAPTERS: dict[type[SQLModel], TypeAdapter[Any]] = {
+    model: TypeAdapter(model)
+    for name, model in vars(models).items()
+    if name.endswith("Public") and isinstance(model, type) and issubclass(model, SQLModel)
+}
+
+
+def dump_public(model: type[SQLModel], content: Any, *, context: Optional[dict[str, Any]] = None) -> bytes:
+    """
+    Serialize loaded rows as `model` with a single validation pass: attributes are read
+    straight off the ORM objects and pydantic-core writes the JSON bytes. `context` is
+    handed to field serializers (see deps.get_demo_context).
+    """
+    adapter = PUBLIC_ADAPTERS.get(model) or TypeAdapter(model)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True), context=context)
+
+
+def dump_public_msgpack(model: type[SQLModel], content: Any, *, context: Optional[dict[str, Any]] = None) -> bytes:
+    """Same as dump_public, packed as MessagePack from the JSON-mode Python dump."""
+    adapter = PUBLIC_ADAPTERS.get(model) or TypeAdapter(model)
+    validated = adapter.validate_python(content, from_attributes=True)
+    return packb(adapter.dump_python(validated, mode="json", context=context))
+
+
+def public_response(
+    model: type[SQLModel], content: Any, response: Response, *, context: Optional[dict[str, Any]] = None
+) -> Any:
+    """
+    Return `content` (ORM rows, or a dict of them for list models) rendered as `model`.
+
+    With FAST_JSON_RESPONSES off and no serialization `context` this hands `content`
+    back for FastAPI to validate against the route's `response_model` as usual, so both
+    paths produce the same body. FastAPI cannot pass a context, so those responses are
+    always rendered here.
+    """
+    if not settings.FAST_JSON_RESPONSES and context is None:
+        return content
+    if wants_msgpack():
+        return msgpack_bytes_response(dump_public_msgpack(model, content, context=context), response)
+    return json_bytes_response(dump_public(model, content, context=context), response)
@@ -0,0 +1,204 @@
+import gzip
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoder
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional encoder
+    zstandard = None
+
+# Bodies in these formats are already compressed; squeezing them again only costs CPU
+_PRECOMPRESSED_PREFIXES = ("image/", "video/", "audio/", "font/woff")
+_PRECOMPRESSED_TYPES = frozenset(
+    {
+        "application/gzip",
+        "application/zip",
+        "application/zstd",
+        "application/x-brotli",
+        "application/octet-stream",
+        "application/pdf",
+    }
+)
+
+
+@dataclass
+class EncodingStats:
+    responses: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    cpu_seconds: float = 0.0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_in - self.bytes_out
+
+
+@dataclass
+class CompressionStats:
+    by_encoding: dict[str, EncodingStats] = field(default_factory=dict)
+    skipped: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float) -> None:
+        with self._lock:
+            stats = self.by_encoding.setdefault(encoding, EncodingStats())
+            stats.responses += 1
+            stats.bytes_in += bytes_in
+            stats.bytes_out += bytes_out
+            stats.cpu_seconds += cpu_seconds
+
+    def as_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "skipped": self.skipped,
+                "encodings": {
+                    name: {
+                        "responses": stats.responses,
+                        "bytes_in": stats.bytes_in,
+                        "bytes_out": stats.bytes_out,
+                        "bytes_saved": stats.bytes_saved,
+                        "cpu_seconds": round(stats.cpu_seconds, 6),
+                    }
+                    for name, stats in self.by_encoding.items()
+                },
+            }
+
+
+compression_stats = CompressionStats()
+
+
+def make_encoders(*, gzip_level: int, brotli_quality: int, zstd_level: int) -> dict[str, Callable[[bytes], bytes]]:
+    """Available encoders, in server preference order."""
+    encoders: dict[str, Callable[[bytes], bytes]] = {}
+    if brotli is not None:
+        encoders["br"] = lambda body: brotli.compress(body, quality=brotli_quality)
+    if zstandard is not None:
+        encoders["zstd"] = lambda body: zstandard.ZstdCompressor(level=zstd_level).compress(body)
+    encoders["gzip"] = lambda body: gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    return encoders
+
+
+def negotiate(accept_encoding: str, available: list[str]) -> Optional[str]:
+    """Pick the client's highest-q encoding among `available`, breaking ties by server preference."""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in available:
+        q = weights.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers or "content-range" in headers:
+        return False
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "text/event-stream":
+        return False
+    return not (content_type in _PRECOMPRESSED_TYPES or content_type.startswith(_PRECOMPRESSED_PREFIXES))
+
+
+class CompressionMiddleware:
+    """
+    Compress complete response bodies with the best encoding the client accepts.
+
+    Streaming responses (more than one body message) pass through untouched, as do
+    bodies under `minimum_size` and content that is already compressed. Bodies of at
+    least `thread_threshold` bytes are compressed in a worker thread so the event loop
+    keeps serving other requests.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        thread_threshold: int = 256 * 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        stats: CompressionStats = compression_stats,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_threshold = thread_threshold
+        self.encoders = make_encoders(gzip_level=gzip_level, brotli_quality=brotli_quality, zstd_level=zstd_level)
+        self.stats = stats
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), list(self.encoders))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                # Hold the headers until the first body chunk shows what we are dealing with
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            assert start is not None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            passthrough = True
+            if message.get("more_body", False) or len(body) < self.minimum_size or not _is_compressible(headers):
+                self.stats.skipped += 1
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) >= self.thread_threshold:
+                compressed, cpu = await anyio.to_thread.run_sync(self._compress, encoding, body)
+            else:
+                compressed, cpu = self._compress(encoding, body)
+            self.stats.record(encoding, len(body), len(compressed), cpu)
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compress(self, encoding: str, body: bytes) -> tuple[bytes, float]:
+        # thread_time counts only this thread, so it is right inline and in a worker
+        started = time.thread_time()
+        compressed = self.encoders[encoding](body)
+        return compressed, time.thread_time() - started
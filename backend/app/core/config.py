@@ -69,6 +69,124 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Serialized audit templates kept in each worker, see app/template_cache.py
+    TEMPLATE_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    # Broadcast template and company writes over Postgres LISTEN/NOTIFY so every worker
+    # drops its copy of the template, or of the demo company ids, right away. Cached
+    # templates are checked against the database on every read either way.
+    TEMPLATE_CACHE_NOTIFY: bool = False
+    # How long a worker trusts its demo company ids (see app/demo_companies.py) without
+    # hearing of a change: the most a write made by another worker goes unseen
+    DEMO_COMPANY_IDS_TTL_SECONDS: float = 5.0
+
+    # Shared cache for list responses, see app/response_cache.py. A redis:// URL points
+    # it at any Redis-protocol server; otherwise each worker keeps its own copy.
+    RESPONSE_CACHE_URL: str | None = None
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10_000
+    # Seconds per cached route; routes missing here (or at 0) are not cached
+    RESPONSE_CACHE_TTLS: dict[str, int] = {"my-assignments": 30, "areas": 120}
+
+    # Opt-in: render *Public responses straight from ORM rows with precompiled
+    # serializers (app/api/serialization.py) instead of FastAPI's response_model pass
+    FAST_JSON_RESPONSES: bool = False
+
+    # Response compression, see app/core/compression.py. Brotli and zstd are offered
+    # when their packages are installed, gzip always.
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    # Bodies at least this large are compressed off the event loop
+    COMPRESSION_THREAD_THRESHOLD: int = 256 * 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    # Delta sync (GET /sync). Issued tokens lag the database clock by this much so rows
+    # written by transactions still open at sync time are not skipped.
+    SYNC_OVERLAP_SECONDS: int = 10
+    # Tombstones older than this are purged; older tokens get a full snapshot instead
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 30
+
+    # How long a stored Idempotency-Key result is replayed; devices may stay offline for days
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 7 * 24
+
+    # Per-request SQL statement counts and DB time, reported in a Server-Timing header
+    # and a JSON log line (see app/core/query_stats.py)
+    QUERY_STATS_ENABLED: bool = True
+    # A statement shape run this many times in one request is flagged as a likely N+1
+    QUERY_N_PLUS_ONE_THRESHOLD: int = 10
+    # Raise instead of only logging; meant for tests
+    QUERY_N_PLUS_ONE_STRICT: bool = False
+
+    # Statements slower than SLOW_QUERY_MS are logged with their route and counted per
+    # statement shape for GET /utils/slow-queries/, see app/core/slow_queries.py
+    SLOW_QUERY_LOG_ENABLED: bool = True
+    SLOW_QUERY_MS: float = 200.0
+    # Share of slow SELECTs whose plan is captured with EXPLAIN (ANALYZE, BUFFERS) on a
+    # separate connection (PostgreSQL only); the statement runs a second time
+    SLOW_QUERY_EXPLAIN_RATIO: float = 0.05
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS: int = 10_000
+    # Write slow statements and plans to rotating files instead of the app log, one per
+    # worker process: "slow.log" becomes "slow.<pid>.log"
+    SLOW_QUERY_LOG_FILE: str | None = None
+    SLOW_QUERY_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS: int = 5
+    # With several worker processes, a directory they share where each one writes its
+    # per-shape totals, at most every SLOW_QUERY_STATS_FLUSH_SECONDS; the endpoint adds
+    # them all up. Without it, the endpoint only knows the worker serving it.
+    SLOW_QUERY_STATS_DIR: str | None = None
+    SLOW_QUERY_STATS_FLUSH_SECONDS: float = 5.0
+
+    # Superusers can profile a request by sending an X-Profile header or profile=1;
+    # the response is then a speedscope profile, see app/api/profiling.py
+    PROFILING_ENABLED: bool = True
+    PROFILING_INTERVAL_MS: float = 1.0
+
+    # Share of requests whose peak traced memory is recorded per route while
+    # tracemalloc runs (started from /utils/memory/ or with PYTHONTRACEMALLOC)
+    MEMORY_ROUTE_SAMPLE_RATIO: float = 0.1
+    # With several worker processes, a file on storage they share through which
+    # /utils/memory/ start, stop and snapshots reach all of them (all_workers=true);
+    # each worker checks it at most every MEMORY_CONTROL_POLL_SECONDS while serving
+    MEMORY_CONTROL_FILE: str | None = None
+    MEMORY_CONTROL_POLL_SECONDS: float = 1.0
+
+    # Prometheus metrics at /metrics, see app/core/metrics.py. With several worker
+    # processes set PROMETHEUS_MULTIPROC_DIR to a directory emptied before they start.
+    METRICS_ENABLED: bool = True
+    # When set, scrapes must send it as a bearer token
+    METRICS_TOKEN: str | None = None
+    # Serve the email worker's own metrics on this port
+    EMAIL_WORKER_METRICS_PORT: int | None = None
+
+    # OpenTelemetry tracing of routes, auth dependencies, SQL, email and background
+    # jobs, see app/core/tracing.py. Needs the opentelemetry-sdk package; "otlp" also
+    # needs opentelemetry-exporter-otlp-proto-http and reads OTEL_EXPORTER_OTLP_*.
+    TRACING_EXPORTER: Literal["none", "console", "file", "otlp"] = "none"
+    # Where the "file" exporter appends spans, one JSON object per line
+    TRACING_FILE: str = "traces.jsonl"
+    # Share of traces recorded; requests carrying a sampled traceparent are always kept
+    TRACING_SAMPLE_RATIO: float = 1.0
+
+    # Most sub-requests a single POST /batch may carry
+    BATCH_MAX_REQUESTS: int = 20
+
+    # Photo storage, see app/core/storage.py. Blobs are keyed by SHA-256, so a photo
+    # attached to many answers is stored once.
+    PHOTO_STORAGE_DIR: str = "/app/data/photos"
+    PHOTO_MAX_BYTES: int = 25 * 1024 * 1024
+    PHOTO_CONTENT_TYPES: list[str] = ["image/jpeg", "image/png", "image/heic", "image/webp"]
+    # Unfinished uploads are dropped after this long
+    PHOTO_UPLOAD_TTL_HOURS: int = 24
+    # Photos no answer or response refers to are deleted once unreferenced this long,
+    # leaving clients time to attach what they just uploaded
+    PHOTO_GC_GRACE_HOURS: int = 24
+    # Thumbnails at GET /photos/{sha256}/thumbnails/{size}, by longest side in pixels.
+    # Rendered on first request by a process pool (needs Pillow) and cached on disk.
+    PHOTO_THUMBNAIL_SIZES: dict[str, int] = {"small": 160, "medium": 480, "large": 1280}
+    PHOTO_THUMBNAIL_QUALITY: int = 80
+    PHOTO_THUMBNAIL_DIR: str = "/app/data/photos/thumbnails"
+    PHOTO_THUMBNAIL_WORKERS: int = 2
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -86,6 +204,22 @@ class Settings(BaseSettings):
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
 
+    # Email outbox worker, see app/email_outbox.py. Requests only queue mail; the worker
+    # sends it in batches over up to EMAIL_SMTP_POOL_SIZE reused SMTP connections.
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_SECONDS: float = 5.0
+    EMAIL_SMTP_POOL_SIZE: int = 2
+    # Temporary failures are retried after 30s, 60s, 120s... up to the cap
+    EMAIL_RETRY_BASE_SECONDS: int = 30
+    EMAIL_RETRY_MAX_SECONDS: int = 60 * 60
+    EMAIL_MAX_ATTEMPTS: int = 8
+    # Sent and failed messages are purged after this long
+    EMAIL_OUTBOX_RETENTION_DAYS: int = 14
+
+    # Due-date reminders, see app/reminder_digest.py: one email per auditor listing the
+    # open assignments falling due within this many days
+    REMINDER_DIGEST_DAYS_AHEAD: int = 7
+
     @computed_field  # type: ignore[prop-decorator]
     @property
     def emails_enabled(self) -> bool:
@@ -1,10 +1,14 @@
 from sqlmodel import Session, create_engine, select
 
 from app import crud
+from app.core import slow_queries
 from app.core.config import settings
+from app.core.metrics import InstrumentedQueuePool
 from app.models import User, UserCreate, UserRole
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), poolclass=InstrumentedQueuePool)
+if settings.SLOW_QUERY_LOG_ENABLED:
+    slow_queries.install(engine)
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+from app.core.storage import StorageBackend
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = ImageOps = None
+
+THUMBNAIL_MEDIA_TYPE = "image/jpeg"
+
+
+def render_thumbnail(storage: StorageBackend, digest: str, target: Path, max_side: int, quality: int) -> None:
+    """
+    Runs in a pool process: decode the photo, turn it upright per its EXIF orientation,
+    shrink it to fit `max_side` and write it to `target` as a JPEG with no metadata
+    (EXIF, GPS position included, is not carried over).
+    """
+    with storage.open(digest) as blob, Image.open(blob) as image:
+        # JPEGs decode straight at a reduced scale, far cheaper than decoding full size
+        image.draft("RGB", (max_side, max_side))
+        upright = ImageOps.exif_transpose(image)
+        upright.thumbnail((max_side, max_side))
+        if upright.mode != "RGB":
+            upright = upright.convert("RGB")
+        fd, partial = tempfile.mkstemp(dir=target.parent, suffix=".partial")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                upright.save(out, "JPEG", quality=quality, optimize=True)
+            os.replace(partial, target)
+        except BaseException:
+            os.unlink(partial)
+            raise
+
+
+class ThumbnailCache:
+    """
+    Thumbnails rendered on first request by a pool of worker processes, so the API
+    process never decodes images, and kept on disk from then on. Photos never change,
+    so a cached thumbnail never goes stale.
+    """
+
+    def __init__(self, root: Path, *, workers: int, quality: int) -> None:
+        self.root = root
+        self.workers = workers
+        self.quality = quality
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        # Striped locks: concurrent requests for one thumbnail render it once
+        self._render_locks = [threading.Lock() for _ in range(64)]
+
+    @staticmethod
+    def available() -> bool:
+        return Image is not None
+
+    def path(self, digest: str, max_side: int) -> Path:
+        return self.root / digest[:2] / f"{digest}-{max_side}.jpg"
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Forking a process with live threads and connections is unsafe; spawn clean workers
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def get(self, storage: StorageBackend, digest: str, max_side: int) -> Path:
+        """Path of the thumbnail, rendering it first if needed. Blocks until it exists."""
+        path = self.path(digest, max_side)
+        if path.exists():
+            return path
+        with self._render_locks[hash(path) % len(self._render_locks)]:
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._executor().submit(render_thumbnail, storage, digest, path, max_side, self.quality).result()
+        return path
+
+    def delete(self, digest: str) -> None:
+        for path in (self.root / digest[:2]).glob(f"{digest}-*.jpg"):
+            path.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+@lru_cache
+def get_thumbnails() -> ThumbnailCache:
+    return ThumbnailCache(
+        Path(settings.PHOTO_THUMBNAIL_DIR),
+        workers=settings.PHOTO_THUMBNAIL_WORKERS,
+        quality=settings.PHOTO_THUMBNAIL_QUALITY,
+    )
@@ -0,0 +1,295 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Literal, Optional
+
+import anyio.to_thread
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import route_template
+
+GroupBy = Literal["lineno", "filename", "traceback"]
+
+# Snapshots hold every traced allocation, so only the latest few are kept
+_MAX_SNAPSHOTS = 5
+# Allocations made by tracemalloc itself and by imports are not the app's
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class SnapshotNotFound(LookupError):
+    pass
+
+
+class SnapshotOnAnotherWorker(SnapshotNotFound):
+    """The snapshot id names another worker process, which holds the snapshot."""
+
+    def __init__(self, snapshot_id: str, pid: int) -> None:
+        super().__init__(snapshot_id)
+        self.pid = pid
+
+
+@dataclass
+class _Snapshot:
+    id: str
+    taken_at: float
+    snapshot: tracemalloc.Snapshot
+
+    @property
+    def traced_bytes(self) -> int:
+        return sum(stat.size for stat in self.snapshot.statistics("filename"))
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"id": self.id, "taken_at": self.taken_at, "traced_bytes": self.traced_bytes}
+
+
+def _stat(stat: Any) -> dict[str, Any]:
+    line: dict[str, Any] = {
+        "site": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+        "size": stat.size,
+        "count": stat.count,
+    }
+    if isinstance(stat, tracemalloc.StatisticDiff):
+        line["size_diff"] = stat.size_diff
+        line["count_diff"] = stat.count_diff
+    return line
+
+
+@dataclass
+class MemoryProfiler:
+    """tracemalloc controls and snapshots for this worker process."""
+
+    # Ids are "<pid>-<n>": requests land on any worker, and a snapshot is only on one
+    snapshots: dict[str, _Snapshot] = field(default_factory=dict)
+    _next_id: int = 1
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def start(self, frames: int) -> None:
+        # Restarting with a different depth would make earlier snapshots incomparable
+        if tracemalloc.is_tracing() and tracemalloc.get_traceback_limit() != frames:
+            self.stop()
+        tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        with self._lock:
+            self.snapshots.clear()
+
+    def take_snapshot(self) -> dict[str, Any]:
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        with self._lock:
+            snapshot_id = f"{os.getpid()}-{self._next_id}"
+            taken = self.snapshots[snapshot_id] = _Snapshot(snapshot_id, time.time(), snapshot)
+            self._next_id += 1
+            while len(self.snapshots) > _MAX_SNAPSHOTS:
+                del self.snapshots[next(iter(self.snapshots))]
+        return taken.as_dict()
+
+    def _get(self, snapshot_id: str) -> _Snapshot:
+        pid, _, _ = snapshot_id.partition("-")
+        if pid.isdigit() and int(pid) != os.getpid():
+            raise SnapshotOnAnotherWorker(snapshot_id, int(pid))
+        with self._lock:
+            taken = self.snapshots.get(snapshot_id)
+        if taken is None:
+            raise SnapshotNotFound(snapshot_id)
+        return taken
+
+    def top(self, snapshot_id: str, *, limit: int, group_by: GroupBy) -> list[dict[str, Any]]:
+        """Allocation sites holding the most memory in the snapshot."""
+        stats = self._get(snapshot_id).snapshot.statistics(group_by)
+        return [_stat(stat) for stat in stats[:limit]]
+
+    def diff(self, snapshot_id: str, base_id: str, *, limit: int, group_by: GroupBy) -> list[dict[str, Any]]:
+        """Allocation sites whose memory grew (or shrank) the most since `base_id`."""
+        stats = self._get(snapshot_id).snapshot.compare_to(self._get(base_id).snapshot, group_by)
+        return [_stat(stat) for stat in stats[:limit]]
+
+    def status(self) -> dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            snapshots = [taken.as_dict() for taken in self.snapshots.values()]
+        return {
+            # Each worker traces on its own; the pid says which one answered
+            "pid": os.getpid(),
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else None,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "snapshots": snapshots,
+            "routes": route_memory.as_dict(),
+        }
+
+
+memory_profiler = MemoryProfiler()
+
+
+class MemoryControl:
+    """
+    Tracing state wanted on every worker, kept in MEMORY_CONTROL_FILE. A request
+    reaches one worker only, so the endpoints write the state here when asked to act
+    on all workers, and each worker's MemoryMiddleware applies it on the first request
+    it serves after the file changed (checked every MEMORY_CONTROL_POLL_SECONDS).
+    """
+
+    def __init__(self) -> None:
+        # Snapshots asked for before this worker started are not its to take
+        self._snapshot_seen = time.time()
+        self._checked_at = 0.0
+        self._version: Optional[tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def read(self) -> Optional[dict[str, Any]]:
+        if not settings.MEMORY_CONTROL_FILE:
+            return None
+        try:
+            with open(settings.MEMORY_CONTROL_FILE) as f:
+                return json.load(f)  # type: ignore[no-any-return]
+        except (OSError, ValueError):
+            return None
+
+    def publish(self, *, tracing: bool, frames: Optional[int] = None, snapshot_at: Optional[float] = None) -> None:
+        """Write the state every worker should be in; the caller applies it to its own."""
+        assert settings.MEMORY_CONTROL_FILE
+        state = {"tracing": tracing, "frames": frames, "snapshot_at": snapshot_at}
+        directory = os.path.dirname(os.path.abspath(settings.MEMORY_CONTROL_FILE))
+        fd, partial = tempfile.mkstemp(dir=directory, suffix=".partial")
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+        # Replaced whole, so workers never read a half-written state
+        os.replace(partial, settings.MEMORY_CONTROL_FILE)
+        with self._lock:
+            self._version = self._stat()
+            self._snapshot_seen = max(self._snapshot_seen, snapshot_at or 0.0)
+
+    def _stat(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = os.stat(settings.MEMORY_CONTROL_FILE)  # type: ignore[arg-type]
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def changed(self) -> bool:
+        """Whether the file changed since this worker last applied it; cheap to call."""
+        if not settings.MEMORY_CONTROL_FILE:
+            return False
+        now = time.monotonic()
+        if now - self._checked_at < settings.MEMORY_CONTROL_POLL_SECONDS:
+            return False
+        self._checked_at = now
+        version = self._stat()
+        return version is not None and version != self._version
+
+    def apply(self) -> None:
+        with self._lock:
+            self._version = self._stat()
+            state = self.read()
+            if state is None:
+                return
+            if not state["tracing"]:
+                if tracemalloc.is_tracing():
+                    memory_profiler.stop()
+                return
+            memory_profiler.start(state["frames"])
+            snapshot_at = state.get("snapshot_at")
+            if snapshot_at is not None and snapshot_at > self._snapshot_seen:
+                self._snapshot_seen = snapshot_at
+                memory_profiler.take_snapshot()
+
+
+memory_control = MemoryControl()
+
+
+@dataclass
+class RouteMemory:
+    samples: int = 0
+    total_peak_bytes: int = 0
+    max_peak_bytes: int = 0
+    total_retained_bytes: int = 0
+
+
+@dataclass
+class RouteMemoryStats:
+    by_route: dict[str, RouteMemory] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, route: str, peak_bytes: int, retained_bytes: int) -> None:
+        with self._lock:
+            stats = self.by_route.setdefault(route, RouteMemory())
+            stats.samples += 1
+            stats.total_peak_bytes += peak_bytes
+            stats.max_peak_bytes = max(stats.max_peak_bytes, peak_bytes)
+            stats.total_retained_bytes += retained_bytes
+
+    def as_dict(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            ranked = sorted(self.by_route.items(), key=lambda item: item[1].max_peak_bytes, reverse=True)
+            return {
+                route: {
+                    "samples": stats.samples,
+                    "max_peak_bytes": stats.max_peak_bytes,
+                    "mean_peak_bytes": stats.total_peak_bytes // stats.samples,
+                    "mean_retained_bytes": stats.total_retained_bytes // stats.samples,
+                }
+                for route, stats in ranked
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.by_route.clear()
+
+
+route_memory = RouteMemoryStats()
+
+# tracemalloc has a single process-wide peak, so one request is sampled at a time
+_sampling = threading.Lock()
+
+
+class MemoryMiddleware:
+    """
+    While tracemalloc is tracing, measure how far traced memory peaks above where it
+    started for a sample (MEMORY_ROUTE_SAMPLE_RATIO) of requests, and how much of it
+    is still held when the response is done, per route template. Other requests
+    served concurrently by the same worker add to the peak, so treat a route's
+    numbers as an upper bound. It also applies changes to MEMORY_CONTROL_FILE; when
+    tracing is off and that file is unchanged this is a couple of function calls.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if memory_control.changed():
+            # Stopping and snapshotting walk every traced block, so off the event loop
+            await anyio.to_thread.run_sync(memory_control.apply)
+        if (
+            scope["type"] != "http"
+            or not tracemalloc.is_tracing()
+            or random.random() >= settings.MEMORY_ROUTE_SAMPLE_RATIO
+            or not _sampling.acquire(blocking=False)
+        ):
+            await self.app(scope, receive, send)
+            return
+        tracemalloc.reset_peak()
+        started, _ = tracemalloc.get_traced_memory()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # The request may have been the one that stopped tracing
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                route = f"{scope['method']} {route_template(scope)}"
+                route_memory.record(route, max(peak - started, 0), current - started)
+            _sampling.release()
@@ -0,0 +1,211 @@
+import os
+import secrets
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+import anyio.to_thread
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# Set in the environment when several worker processes serve the app; each process
+# then writes its samples to files there and a scrape adds them up
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+# Threadpool usage changes faster than anyone scrapes, so one sample a second is plenty
+_THREADPOOL_SAMPLE_SECONDS = 1.0
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to serve a request, by route template and status.",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests being served.", multiprocess_mode="livesum"
+)
+THREADPOOL_IN_USE = Gauge(
+    "threadpool_threads_in_use",
+    "Threads busy running sync endpoints and dependencies.",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_CAPACITY = Gauge(
+    "threadpool_threads_capacity", "Threads available to sync endpoints.", multiprocess_mode="livesum"
+)
+
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts", "Connections handed out by the pool.")
+DB_POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts", "Checkouts that gave up waiting for a connection.")
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to get a connection from the pool, including opening a new one.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out", "Connections in use.", multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections", "Connections open beyond the pool size.", multiprocess_mode="livesum"
+)
+
+CACHE_LOOKUPS = Counter("cache_lookups", "Cache lookups by cache, route and result.", ["cache", "route", "result"])
+
+JOB_RUNS = Counter("background_job_runs", "Background job runs by outcome.", ["job", "outcome"])
+JOB_ITEMS = Counter("background_job_items", "Rows or messages processed by background jobs.", ["job"])
+JOB_DURATION = Histogram(
+    "background_job_duration_seconds",
+    "Time per background job run.",
+    ["job"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0),
+)
+JOB_LAST_SUCCESS = Gauge(
+    "background_job_last_success_timestamp_seconds",
+    "When each background job last finished without error.",
+    ["job"],
+    multiprocess_mode="max",
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports checkouts, time spent waiting for a connection and overflow."""
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        DB_POOL_WAIT.observe(time.perf_counter() - started)
+        DB_POOL_CHECKOUTS.inc()
+        self._report()
+        return record
+
+    def _do_return_conn(self, record: Any) -> None:
+        super()._do_return_conn(record)
+        self._report()
+
+    def _report(self) -> None:
+        DB_POOL_CHECKED_OUT.set(self.checkedout())
+        # Negative until the pool has opened pool_size connections
+        DB_POOL_OVERFLOW.set(max(self.overflow(), 0))
+
+
+def record_cache_lookup(cache: str, route: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache, route, "hit" if hit else "miss").inc()
+
+
+@dataclass
+class JobRun:
+    items: int = 0
+
+
+@contextmanager
+def track_job(job: str) -> Iterator[JobRun]:
+    """Record one run of a background job; set `items` on the yielded run to count its work."""
+    run = JobRun()
+    started = time.perf_counter()
+    try:
+        yield run
+    except Exception:
+        JOB_RUNS.labels(job, "failed").inc()
+        raise
+    else:
+        JOB_RUNS.labels(job, "succeeded").inc()
+        JOB_LAST_SUCCESS.labels(job).set_to_current_time()
+    finally:
+        JOB_DURATION.labels(job).observe(time.perf_counter() - started)
+        JOB_ITEMS.labels(job).inc(run.items)
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route that served the request, "unmatched" if none did."""
+    route = scope.get("route")
+    if route is None:
+        # Middlewares that rewrite the request route a copy of the scope; match again
+        for candidate in scope["app"].router.routes:
+            match, child_scope = candidate.matches(scope)
+            if match == Match.FULL:
+                route = child_scope.get("route", candidate)
+                break
+        else:
+            return "unmatched"
+    return str(getattr(route, "path", "unmatched"))
+
+
+class MetricsMiddleware:
+    """
+    Times each request into REQUEST_LATENCY under its route template (so path
+    parameters do not blow up the label set), counts requests in flight and samples
+    threadpool usage. All of it is a few in-memory (or mmap) updates per request.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._children: dict[tuple[str, str, int], Any] = {}
+        self._threadpool_sampled = 0.0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        if started - self._threadpool_sampled >= _THREADPOOL_SAMPLE_SECONDS:
+            self._threadpool_sampled = started
+            limiter = anyio.to_thread.current_default_thread_limiter()
+            THREADPOOL_IN_USE.set(limiter.borrowed_tokens)
+            THREADPOOL_CAPACITY.set(limiter.total_tokens)
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            key = (scope["method"], route_template(scope), status)
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = REQUEST_LATENCY.labels(key[0], key[1], str(status))
+            child.observe(time.perf_counter() - started)
+
+
+def metrics_endpoint(request: Request) -> Response:
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not secrets.compare_digest(request.headers.get("authorization", ""), expected):
+            return Response(status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    registry = REGISTRY
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the shared files when it shuts down."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
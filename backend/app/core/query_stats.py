@@ -0,0 +1,174 @@
+import json
+import logging
+import re
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+# Placeholder lists from IN (...) and multi-row VALUES vary in length with the data,
+# not with the code that issued them
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|\$\d+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|\$\d+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class NPlusOneError(RuntimeError):
+    """The same statement shape ran too many times within one request."""
+
+
+def statement_shape(statement: str) -> str:
+    return _WHITESPACE.sub(" ", _PLACEHOLDER_LIST.sub("(?)", statement)).strip()
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: Optional[str] = None
+    shapes: Counter[str] = field(default_factory=Counter)
+    shape_seconds: defaultdict[str, float] = field(default_factory=lambda: defaultdict(float))
+    # Raise NPlusOneError as soon as a shape reaches this many executions
+    strict_threshold: Optional[int] = None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds, self.slowest_statement = seconds, statement
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        self.shape_seconds[shape] += seconds
+        if self.strict_threshold is not None and self.shapes[shape] == self.strict_threshold:
+            raise NPlusOneError(f"Statement ran {self.strict_threshold} times in one request: {shape[:500]}")
+
+    def merge(self, other: "QueryStats") -> None:
+        self.count += other.count
+        self.seconds += other.seconds
+        if other.slowest_seconds >= self.slowest_seconds:
+            self.slowest_seconds, self.slowest_statement = other.slowest_seconds, other.slowest_statement
+        self.shapes.update(other.shapes)
+        for shape, seconds in other.shape_seconds.items():
+            self.shape_seconds[shape] += seconds
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Statement shapes run at least `threshold` times, the usual sign of an N+1 loop."""
+        return {shape: n for shape, n in self.shapes.most_common() if n >= threshold}
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.2f};desc="{self.count} queries"'
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_request: ContextVar[Optional[Scope]] = ContextVar("query_stats_request", default=None)
+
+
+def current_route() -> Optional[str]:
+    """Method and route template of the request being served, None outside one."""
+    scope = _request.get()
+    return None if scope is None else f"{scope['method']} {route_template(scope)}"
+
+
+@contextmanager
+def track_queries(*, strict_threshold: Optional[int] = None) -> Iterator[QueryStats]:
+    """
+    Count the statements run in this context, including threads it hands work to.
+    Nested trackers also add their totals to the enclosing one.
+    """
+    parent = _current.get()
+    stats = QueryStats(strict_threshold=strict_threshold)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        if parent is not None:
+            parent.merge(stats)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    if _current.get() is not None and context is not None:
+        context._query_stats_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    stats = _current.get()
+    started = getattr(context, "_query_stats_started", None)
+    if stats is None or started is None:
+        return
+    stats.record(statement, time.perf_counter() - started)
+
+
+class QueryStatsMiddleware:
+    """
+    Count each request's SQL statements and DB time, report them in a Server-Timing
+    header and log one JSON line per request, flagging statement shapes repeated
+    QUERY_N_PLUS_ONE_THRESHOLD times or more. With QUERY_N_PLUS_ONE_STRICT the
+    statement that reaches the threshold raises NPlusOneError instead, which lets
+    tests fail on N+1 loops.
+
+    Statements issued after the response headers went out (while streaming a body)
+    are logged but cannot be in the header.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # Read per request so tests can switch strict mode on
+        threshold = settings.QUERY_N_PLUS_ONE_THRESHOLD
+        status = 0
+
+        token = _request.set(scope)
+        with track_queries(strict_threshold=threshold if settings.QUERY_N_PLUS_ONE_STRICT else None) as stats:
+
+            async def send_with_timing(message: Message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                _request.reset(token)
+                _log_request(scope, status, stats, threshold)
+
+
+def _log_request(scope: Scope, status: int, stats: QueryStats, threshold: int) -> None:
+    if not stats.count:
+        return
+    line: dict[str, Any] = {
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status,
+        "queries": stats.count,
+        "db_ms": round(stats.seconds * 1000, 2),
+        "slowest_ms": round(stats.slowest_seconds * 1000, 2),
+        "slowest_statement": (stats.slowest_statement or "")[:500],
+    }
+    repeated = stats.repeated(threshold)
+    if repeated:
+        line["n_plus_one"] = [{"statement": shape[:500], "count": n} for shape, n in repeated.items()]
+        logger.warning(json.dumps(line))
+    else:
+        logger.info(json.dumps(line))
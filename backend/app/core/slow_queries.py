@@ -0,0 +1,310 @@
+import glob
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from logging.handlers import RotatingFileHandler
+from typing import Any, Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.query_stats import current_route, statement_shape
+
+logger = logging.getLogger(__name__)
+
+# Distinct statement shapes kept per worker; the one with the least total time makes room
+_MAX_SHAPES = 500
+# Plans waiting to be captured; slow statements beyond this are logged without one
+_MAX_PENDING_EXPLAINS = 4
+# EXPLAIN ANALYZE runs the statement again, so only plain reads are explained
+_EXPLAINABLE = ("SELECT",)
+# Plans show the statement's parameters as constants in conditions and filters
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_CONDITION_LINE = re.compile(r"^\s*(?:[\w-]+ )*(?:Cond|(?<!by )Filter|Key): ")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?(?![\w.])")
+
+
+def parameters_shape(parameters: Any) -> Any:
+    """Parameter names and types, never values, which may hold personal data."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: one set of parameters per row
+            return {"rows": len(parameters), "row": parameters_shape(parameters[0])}
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def redact_plan(plan: str) -> str:
+    """The plan with string constants, and numbers in its conditions, replaced by ?."""
+    lines = []
+    for line in plan.splitlines():
+        line = _STRING_LITERAL.sub("'?'", line)
+        if _CONDITION_LINE.match(line):
+            label, _, condition = line.partition(": ")
+            line = f"{label}: {_NUMBER_LITERAL.sub('?', condition)}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+@dataclass
+class ShapeStats:
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    routes: dict[str, int] = field(default_factory=dict)
+    plan: Optional[str] = None
+
+
+def _stats_file(pid: int) -> str:
+    assert settings.SLOW_QUERY_STATS_DIR
+    return os.path.join(settings.SLOW_QUERY_STATS_DIR, f"slow-queries.{pid}.json")
+
+
+def _read_other_workers() -> list[dict[str, ShapeStats]]:
+    """Totals the other workers last wrote to SLOW_QUERY_STATS_DIR."""
+    if not settings.SLOW_QUERY_STATS_DIR:
+        return []
+    own = _stats_file(os.getpid())
+    workers = []
+    for path in glob.glob(os.path.join(settings.SLOW_QUERY_STATS_DIR, "slow-queries.*.json")):
+        if path == own:
+            continue
+        try:
+            with open(path) as f:
+                workers.append({shape: ShapeStats(**stats) for shape, stats in json.load(f).items()})
+        except (OSError, ValueError, TypeError):
+            # Being replaced, or left half-written by a worker that was killed
+            continue
+    return workers
+
+
+def _merge(into: dict[str, ShapeStats], other: dict[str, ShapeStats]) -> None:
+    for shape, stats in other.items():
+        merged = into.setdefault(shape, ShapeStats())
+        merged.count += stats.count
+        merged.total_seconds += stats.total_seconds
+        merged.max_seconds = max(merged.max_seconds, stats.max_seconds)
+        for route, count in stats.routes.items():
+            merged.routes[route] = merged.routes.get(route, 0) + count
+        merged.plan = merged.plan or stats.plan
+
+
+@dataclass
+class SlowQueryLog:
+    """
+    Per-shape totals of this worker. With SLOW_QUERY_STATS_DIR set, they are also
+    written there for the other workers to add up, as each request reaches only one.
+    """
+
+    by_shape: dict[str, ShapeStats] = field(default_factory=dict)
+    _flush: Optional[threading.Timer] = field(default=None, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, shape: str, seconds: float, route: Optional[str]) -> None:
+        with self._lock:
+            stats = self.by_shape.get(shape)
+            if stats is None:
+                if len(self.by_shape) >= _MAX_SHAPES:
+                    smallest = min(self.by_shape, key=lambda s: self.by_shape[s].total_seconds)
+                    del self.by_shape[smallest]
+                stats = self.by_shape[shape] = ShapeStats()
+            stats.count += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            route = route or "-"
+            stats.routes[route] = stats.routes.get(route, 0) + 1
+            self._schedule_flush()
+
+    def record_plan(self, shape: str, plan: str) -> None:
+        with self._lock:
+            if (stats := self.by_shape.get(shape)) is not None:
+                stats.plan = plan
+                self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        # Called with the lock held; one write covers everything recorded until then
+        if settings.SLOW_QUERY_STATS_DIR and self._flush is None:
+            self._flush = threading.Timer(settings.SLOW_QUERY_STATS_FLUSH_SECONDS, self.flush)
+            self._flush.daemon = True
+            self._flush.start()
+
+    def flush(self) -> None:
+        """Write this worker's totals to SLOW_QUERY_STATS_DIR."""
+        with self._lock:
+            self._flush = None
+            if not settings.SLOW_QUERY_STATS_DIR:
+                return
+            totals = {shape: asdict(stats) for shape, stats in self.by_shape.items()}
+        path = _stats_file(os.getpid())
+        try:
+            fd, partial = tempfile.mkstemp(dir=settings.SLOW_QUERY_STATS_DIR, suffix=".partial")
+            with os.fdopen(fd, "w") as f:
+                json.dump(totals, f)
+            # Replaced whole, so other workers never read half of it
+            os.replace(partial, path)
+        except OSError:
+            logger.warning("Could not write slow query totals to %s", path, exc_info=True)
+
+    def top(self, limit: int) -> list[dict[str, Any]]:
+        """Slow statement shapes by total time spent in them on all workers, worst first."""
+        by_shape: dict[str, ShapeStats] = {}
+        for other in _read_other_workers():
+            _merge(by_shape, other)
+        with self._lock:
+            # This worker's own totals are current, whatever its file says
+            _merge(by_shape, self.by_shape)
+        ranked = sorted(by_shape.items(), key=lambda item: item[1].total_seconds, reverse=True)
+        return [
+            {
+                "statement": shape,
+                "count": stats.count,
+                "total_ms": round(stats.total_seconds * 1000, 2),
+                "mean_ms": round(stats.total_seconds * 1000 / stats.count, 2),
+                "max_ms": round(stats.max_seconds * 1000, 2),
+                "routes": dict(sorted(stats.routes.items(), key=lambda item: -item[1])),
+                "plan": stats.plan,
+            }
+            for shape, stats in ranked[:limit]
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.by_shape.clear()
+            if self._flush is not None:
+                self._flush.cancel()
+                self._flush = None
+
+
+slow_query_log = SlowQueryLog()
+
+
+class _Explainer:
+    """
+    Captures EXPLAIN (ANALYZE, BUFFERS) for sampled slow statements on one
+    background thread, over a connection of its own outside the application pool,
+    so a burst of slow queries neither slows requests further nor starves the pool.
+    """
+
+    def __init__(self) -> None:
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._engine: Optional[Engine] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, engine: Engine, shape: str, statement: str, parameters: Any) -> bool:
+        with self._lock:
+            if self._pending >= _MAX_PENDING_EXPLAINS:
+                return False
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+                self._engine = create_engine(engine.url, poolclass=NullPool)
+        self._executor.submit(self._explain, shape, statement, parameters)
+        return True
+
+    def _explain(self, shape: str, statement: str, parameters: Any) -> None:
+        assert self._engine is not None
+        try:
+            with self._engine.connect() as conn:
+                # Read only, so a mislabelled statement cannot change data, and capped,
+                # since the statement runs again in full
+                conn.execute(text("SET TRANSACTION READ ONLY"))
+                conn.execute(text(f"SET LOCAL statement_timeout = {int(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}"))
+                rows = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters).all()
+                conn.rollback()
+            # Kept and logged, so it must not carry what the parameters held
+            plan = redact_plan("\n".join(row[0] for row in rows))
+        except Exception:
+            logger.warning("Could not explain slow statement: %s", shape[:500], exc_info=True)
+            return
+        finally:
+            with self._lock:
+                self._pending -= 1
+        slow_query_log.record_plan(shape, plan)
+        logger.warning(json.dumps({"event": "slow_query_plan", "statement": shape[:2000], "plan": plan}))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, engine = self._executor, self._engine
+            self._executor = self._engine = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if engine is not None:
+            engine.dispose()
+
+
+_explainer = _Explainer()
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    if context is not None:
+        context._slow_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    started = getattr(context, "_slow_query_started", None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    if seconds * 1000 < settings.SLOW_QUERY_MS:
+        return
+    shape = statement_shape(statement)
+    route = current_route()
+    slow_query_log.record(shape, seconds, route)
+    explained = (
+        conn.dialect.name == "postgresql"
+        and not executemany
+        and statement.lstrip().upper().startswith(_EXPLAINABLE)
+        and random.random() < settings.SLOW_QUERY_EXPLAIN_RATIO
+        and _explainer.submit(conn.engine, shape, statement, parameters)
+    )
+    logger.warning(
+        json.dumps(
+            {
+                "event": "slow_query",
+                "statement": shape[:2000],
+                "parameters": parameters_shape(parameters),
+                "duration_ms": round(seconds * 1000, 2),
+                "route": route,
+                "explained": explained,
+            }
+        )
+    )
+
+
+def _log_file(path: str) -> str:
+    """`path` with this worker's pid before the extension: rotation is not safe across processes."""
+    root, extension = os.path.splitext(path)
+    return f"{root}.{os.getpid()}{extension}"
+
+
+def install(engine: Engine) -> None:
+    """Log statements on `engine` slower than SLOW_QUERY_MS and keep per-shape totals."""
+    if settings.SLOW_QUERY_LOG_FILE and not logger.handlers:
+        handler = RotatingFileHandler(
+            _log_file(settings.SLOW_QUERY_LOG_FILE),
+            maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+        )
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def shutdown() -> None:
+    """Wait for plans being captured, close the explain connection and write the totals."""
+    _explainer.shutdown()
+    slow_query_log.flush()
@@ -0,0 +1,38 @@
+from typing import Any
+
+from sqlalchemy import func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import Uuid
+from sqlmodel import Session, select
+
+
+class new_uuid(FunctionElement[Any]):
+    """Server-side random UUID, used by set-based ``INSERT ... SELECT`` statements."""
+
+    type = Uuid()
+    inherit_cache = True
+
+
+@compiles(new_uuid, "postgresql")
+def _compile_new_uuid_postgresql(element: new_uuid, compiler: Any, **kw: Any) -> str:
+    # uuid-ossp is enabled by the initial migration
+    return "uuid_generate_v4()"
+
+
+@compiles(new_uuid)
+def _compile_new_uuid_default(element: new_uuid, compiler: Any, **kw: Any) -> str:
+    # Non-native UUID columns store the 32 character hex form
+    return "lower(hex(randomblob(16)))"
+
+
+def try_advisory_xact_lock(session: Session, key: int) -> bool:
+    """
+    Take a transaction-scoped Postgres advisory lock without waiting.
+
+    Returns False when another transaction already holds the lock. On other
+    dialects there is nothing to coordinate with, so the lock is always granted.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return True
+    return bool(session.exec(select(func.pg_try_advisory_xact_lock(key))).one())
@@ -0,0 +1,98 @@
+import os
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from app.core.config import settings
+
+# Read and write granularity for blobs and partial uploads
+CHUNK_SIZE = 64 * 1024
+
+
+def read_chunks(file: BinaryIO, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """Bytes `start` up to (not including) `end` of `file`, CHUNK_SIZE at a time."""
+    file.seek(start)
+    remaining = end - start if end is not None else None
+    while remaining is None or remaining > 0:
+        chunk = file.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+        if not chunk:
+            return
+        if remaining is not None:
+            remaining -= len(chunk)
+        yield chunk
+
+
+class StorageBackend(ABC):
+    """
+    Content-addressed blob store: every blob is written once, under the SHA-256 hex
+    digest of its content, and never modified afterwards.
+
+    Partial uploads are always staged on local disk under `staging_dir`; only finished,
+    verified files are handed to `put`, so a remote backend only needs whole-object
+    operations. Backends must be picklable: thumbnail workers read blobs in their own
+    processes.
+    """
+
+    staging_dir: Path
+
+    @abstractmethod
+    def put(self, digest: str, source: Path) -> None:
+        """Store the file at `source` under `digest`, consuming it. A no-op if the blob exists."""
+
+    @abstractmethod
+    def exists(self, digest: str) -> bool: ...
+
+    @abstractmethod
+    def open(self, digest: str) -> BinaryIO:
+        """Open the blob for reading. Raises FileNotFoundError if it is missing."""
+
+    @abstractmethod
+    def size(self, digest: str) -> int: ...
+
+    @abstractmethod
+    def delete(self, digest: str) -> None:
+        """Remove the blob; missing blobs are ignored."""
+
+    def iter_chunks(self, digest: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with self.open(digest) as blob:
+            yield from read_chunks(blob, start, end)
+
+
+class LocalStorage(StorageBackend):
+    """Blobs under `root/blobs/ab/cd/abcd…`, partial uploads under `root/uploads`."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.staging_dir = root / "uploads"
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / digest[2:4] / digest
+
+    def put(self, digest: str, source: Path) -> None:
+        path = self._path(digest)
+        if path.exists():
+            source.unlink(missing_ok=True)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Staging shares the filesystem, so this is an atomic rename: readers never see a partial blob
+        os.replace(source, path)
+
+    def exists(self, digest: str) -> bool:
+        return self._path(digest).exists()
+
+    def open(self, digest: str) -> BinaryIO:
+        return self._path(digest).open("rb")
+
+    def size(self, digest: str) -> int:
+        return self._path(digest).stat().st_size
+
+    def delete(self, digest: str) -> None:
+        self._path(digest).unlink(missing_ok=True)
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    return LocalStorage(Path(settings.PHOTO_STORAGE_DIR))
@@ -0,0 +1,225 @@
+import functools
+import inspect
+import logging
+import threading
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Any, Optional, ParamSpec, TypeVar, cast, overload
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import route_template
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor,
+        ConsoleSpanExporter,
+        SpanExporter,
+        SpanExportResult,
+    )
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # pragma: no cover - optional dependency
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Statements are recorded as span attributes; huge IN lists are not worth shipping
+_MAX_STATEMENT_LENGTH = 2000
+
+_provider: Any = None
+
+
+def tracing_enabled() -> bool:
+    return trace is not None and settings.TRACING_EXPORTER != "none"
+
+
+if trace is not None:
+
+    class JsonLinesSpanExporter(SpanExporter):
+        """Appends each finished span as one JSON line, for reading traces without a collector."""
+
+        def __init__(self, path: str) -> None:
+            self.path = path
+            self._lock = threading.Lock()
+
+        def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+            lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self) -> None:
+            pass
+
+
+def _make_exporter() -> Optional["SpanExporter"]:
+    if settings.TRACING_EXPORTER == "console":
+        return ConsoleSpanExporter()
+    if settings.TRACING_EXPORTER == "file":
+        return JsonLinesSpanExporter(settings.TRACING_FILE)
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        logger.warning("TRACING_EXPORTER is otlp but opentelemetry-exporter-otlp-proto-http is not installed")
+        return None
+    # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+    return OTLPSpanExporter()
+
+
+def setup_tracing(service_name: str) -> None:
+    """
+    Install the tracer provider for this process and start recording SQL statements.
+    Does nothing when TRACING_EXPORTER is "none" or OpenTelemetry is not installed.
+    """
+    global _provider
+    if not tracing_enabled() or _provider is not None:
+        return
+    exporter = _make_exporter()
+    if exporter is None:
+        return
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name, "deployment.environment": settings.ENVIRONMENT}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO)),
+    )
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+
+
+def shutdown_tracing() -> None:
+    """Flush spans still waiting in the batch processor and stop tracing SQL."""
+    global _provider
+    if _provider is None:
+        return
+    event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.remove(Engine, "handle_error", _handle_error)
+    _provider.shutdown()
+    _provider = None
+
+
+def _tracer() -> Any:
+    return trace.get_tracer("app")
+
+
+@overload
+def traced(func: Callable[P, R], *, name: Optional[str] = None) -> Callable[P, R]: ...
+
+
+@overload
+def traced(func: None = None, *, name: Optional[str] = None) -> Callable[[Callable[P, R]], Callable[P, R]]: ...
+
+
+def traced(
+    func: Optional[Callable[P, R]] = None, *, name: Optional[str] = None
+) -> Callable[P, R] | Callable[[Callable[P, R]], Callable[P, R]]:
+    """
+    Run the function inside a span named after it. Applied at import time, so with
+    tracing off the function is returned as is and costs nothing.
+    """
+
+    def decorate(f: Callable[P, R]) -> Callable[P, R]:
+        if not tracing_enabled():
+            return f
+        span_name = name or f"{f.__module__}.{f.__qualname__}"
+
+        if inspect.iscoroutinefunction(f):
+
+            @functools.wraps(f)
+            async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> Any:
+                with _tracer().start_as_current_span(span_name):
+                    return await cast(Awaitable[Any], f(*args, **kwargs))
+
+            # A coroutine function like `f`, so it returns what `f` does
+            return cast(Callable[P, R], async_wrapper)
+
+        @functools.wraps(f)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with _tracer().start_as_current_span(span_name):
+                return f(*args, **kwargs)
+
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    if context is None:
+        return
+    span = _tracer().start_span(
+        statement.split(None, 1)[0].upper() if statement else "SQL",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:_MAX_STATEMENT_LENGTH],
+            "db.executemany": executemany,
+        },
+    )
+    context._tracing_span = span
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    span = getattr(context, "_tracing_span", None)
+    if span is not None:
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            span.set_attribute("db.rowcount", cursor.rowcount)
+        span.end()
+        context._tracing_span = None
+
+
+def _handle_error(exception_context: Any) -> None:
+    context = exception_context.execution_context
+    span = getattr(context, "_tracing_span", None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.set_status(Status(StatusCode.ERROR))
+        span.end()
+        context._tracing_span = None
+
+
+class TracingMiddleware:
+    """
+    Server span per request, continuing the caller's trace when it sends a
+    traceparent header. Named after the route template once routing has run.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        carrier = dict(Headers(scope=scope).items())
+        with _tracer().start_as_current_span(
+            f"{scope['method']} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": scope["method"], "url.path": scope["path"]},
+        ) as span:
+
+            async def send_with_status(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = route_template(scope)
+                span.update_name(f"{scope['method']} {route}")
+                span.set_attribute("http.route", route)
@@ -7,6 +7,10 @@ from .audit_assignment import audit_assignment
 from .assigned_question import assigned_question
 from .audit_response import audit_response
 from .answer import answer
+from .sync import sync
+from .idempotency_key import idempotency_key
+from .photo import photo
+from .email_outbox import email_outbox
 
 __all__ = [
     "user",
@@ -18,4 +22,8 @@ __all__ = [
     "assigned_question",
     "audit_response",
     "answer",
+    "sync",
+    "idempotency_key",
+    "photo",
+    "email_outbox",
 ]
\ No newline at end of file
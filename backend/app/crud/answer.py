@@ -15,20 +15,41 @@ def _validate_answer_value(answer_value: Any, assigned_question: AssignedQuestio
     # Add more validation as needed
 
 
+def build(
+    *, answer_in: AnswerCreate, assigned_question: AssignedQuestion, audit_response_id: uuid.UUID, audit_type_def: Any
+) -> Answer:
+    """Validate an answer against its question and return it unsaved, for batched inserts."""
+    _validate_answer_value(answer_in.answer_value, assigned_question, audit_type_def)
+    return Answer.model_validate(answer_in, update={"audit_response_id": audit_response_id})
+
+
 def create(*, session: Session, answer_in: AnswerCreate, audit_response_id: uuid.UUID, audit_type_def: Any) -> Answer:
     assigned_question = session.get(AssignedQuestion, answer_in.assigned_question_id)
     if not assigned_question:
         raise HTTPException(status_code=404, detail="Assigned Question not found")
 
-    _validate_answer_value(answer_in.answer_value, assigned_question, audit_type_def)
-
-    db_answer = Answer.model_validate(answer_in, update={"audit_response_id": audit_response_id})
+    db_answer = build(
+        answer_in=answer_in,
+        assigned_question=assigned_question,
+        audit_response_id=audit_response_id,
+        audit_type_def=audit_type_def,
+    )
     session.add(db_answer)
     session.flush()
     session.refresh(db_answer)
     return db_answer
 
 class CRUDAnswer:
+    def build(
+        self, *, answer_in: AnswerCreate, assigned_question: AssignedQuestion, audit_response_id: uuid.UUID, audit_type_def: Any
+    ) -> Answer:
+        return build(
+            answer_in=answer_in,
+            assigned_question=assigned_question,
+            audit_response_id=audit_response_id,
+            audit_type_def=audit_type_def,
+        )
+
     def create(self, session: Session, *, answer_in: AnswerCreate, audit_response_id: uuid.UUID, audit_type_def: Any) -> Answer:
         return create(session=session, answer_in=answer_in, audit_response_id=audit_response_id, audit_type_def=audit_type_def)
 
@@ -1,10 +1,11 @@
 import uuid
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from fastapi import HTTPException
 from sqlmodel import Session, select, func
 
 from app.models import Area, AreaCreate, AreaUpdate, Company, User, UserRole
+from app.response_cache import mark_stale, tag
 
 
 def get(*, session: Session, area_id: uuid.UUID, company_id: Optional[uuid.UUID] = None) -> Optional[Area]:
@@ -56,6 +57,14 @@ def count_by_company(*, session: Session, company_id: uuid.UUID, current_user: U
     return count if count is not None else 0
 
 
+def get_collection_version(*, session: Session, company_id: uuid.UUID) -> tuple[Any, ...]:
+    """Change marker for the areas of a company: (count, max(updated_at))."""
+    row = session.exec(
+        select(func.count(Area.id), func.max(Area.updated_at)).where(Area.company_id == company_id)
+    ).one()
+    return tuple(row)
+
+
 def create(*, session: Session, area_in: AreaCreate, company_id: uuid.UUID) -> Area:
     if not session.get(Company, company_id):
         raise HTTPException(status_code=404, detail="Company not found")
@@ -66,6 +75,7 @@ def create(*, session: Session, area_in: AreaCreate, company_id: uuid.UUID) -> A
     session.add(db_area)
     session.flush()
     session.refresh(db_area)
+    mark_stale(session, tag("company", company_id))
     return db_area
 
 
@@ -79,6 +89,7 @@ def update(*, session: Session, db_area: Area, area_in: AreaUpdate) -> Area:
     session.add(db_area)
     session.flush()
     session.refresh(db_area)
+    mark_stale(session, tag("area", db_area.id))
     return db_area
 
 
@@ -91,6 +102,7 @@ def remove(*, session: Session, area_id: uuid.UUID, company_id: uuid.UUID) -> Op
     
     session.delete(area)
     session.flush()
+    mark_stale(session, tag("company", company_id), tag("area", area_id))
     return area
 
 class CRUDArea:
@@ -107,6 +119,9 @@ class CRUDArea:
     def count_by_company(self, session: Session, *, company_id: uuid.UUID, current_user: User) -> int:
         return count_by_company(session=session, company_id=company_id, current_user=current_user)
 
+    def get_collection_version(self, session: Session, *, company_id: uuid.UUID) -> tuple[Any, ...]:
+        return get_collection_version(session=session, company_id=company_id)
+
     def create(self, session: Session, *, area_in: AreaCreate, company_id: uuid.UUID) -> Area:
         return create(session=session, area_in=area_in, company_id=company_id)
 
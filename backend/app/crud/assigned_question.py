@@ -1,10 +1,11 @@
 import uuid
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from fastapi import HTTPException
 from sqlmodel import Session, select, func
 
 from app.models import AssignedQuestion, AssignedQuestionUpdate, AuditAssignment
+from app.response_cache import mark_stale, tag
 
 
 def get(*, session: Session, question_id: uuid.UUID, assignment_id: Optional[uuid.UUID] = None) -> Optional[AssignedQuestion]:
@@ -38,6 +39,15 @@ def count_for_assignment(*, session: Session, audit_assignment_id: uuid.UUID) ->
     return count if count is not None else 0
 
 
+def get_collection_version(*, session: Session, audit_assignment_id: uuid.UUID) -> tuple[Any, ...]:
+    """Change marker for the questions of an assignment: (count, max(updated_at))."""
+    row = session.exec(
+        select(func.count(AssignedQuestion.id), func.max(AssignedQuestion.updated_at))
+        .where(AssignedQuestion.audit_assignment_id == audit_assignment_id)
+    ).one()
+    return tuple(row)
+
+
 def update(*, session: Session, db_question: AssignedQuestion, question_in: AssignedQuestionUpdate) -> AssignedQuestion:
     if question_in.model_dump(exclude_unset=True).get("question_type"):
         raise HTTPException(status_code=400, detail="Question type of an assigned question cannot be changed")
@@ -47,6 +57,7 @@ def update(*, session: Session, db_question: AssignedQuestion, question_in: Assi
     session.add(db_question)
     session.flush()
     session.refresh(db_question)
+    mark_stale(session, tag("assignment", db_question.audit_assignment_id))
     return db_question
 
 
@@ -56,6 +67,7 @@ def remove(*, session: Session, question_id: uuid.UUID, assignment_id: uuid.UUID
         return None
     session.delete(question)
     session.flush()
+    mark_stale(session, tag("assignment", assignment_id))
     return question
 
 class CRUDAssignedQuestion:
@@ -72,6 +84,9 @@ class CRUDAssignedQuestion:
     def count_for_assignment(self, session: Session, *, audit_assignment_id: uuid.UUID) -> int:
         return count_for_assignment(session=session, audit_assignment_id=audit_assignment_id)
 
+    def get_collection_version(self, session: Session, *, audit_assignment_id: uuid.UUID) -> tuple[Any, ...]:
+        return get_collection_version(session=session, audit_assignment_id=audit_assignment_id)
+
     def update(
         self, session: Session, *, db_question: AssignedQuestion, question_in: AssignedQuestionUpdate
     ) -> AssignedQuestion:
@@ -1,11 +1,18 @@
+import heapq
 import uuid
+from collections.abc import Iterator
+from datetime import date, datetime, time, timedelta
 from typing import List, Optional, Any
 
+import sqlalchemy as sa
 from fastapi import HTTPException
 from sqlalchemy import desc, nulls_last
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select, func, or_
 
-from app.crud.audit_template import audit_template
+from app.core.sql import new_uuid
+from app.core.tracing import traced
+from app.crud.audit_template import get_collection_version_columns as template_version_columns
 from app.crud.company import company
 from app.crud.area import area
 from app.models import (
@@ -13,19 +20,36 @@ from app.models import (
     AuditAssignmentCreate,
     AuditAssignmentUpdate,
     AuditAssignmentStatus,
+    AuditPeriodicity,
     AssignedQuestion,
     AssignedQuestionCreate,
+    AuditCalendarEntry,
+    AuditTemplate,
+    QuestionTemplate,
     User,
+    UserAreaAssignmentLink,
     UserRole,
 )
+from app import template_cache
+from app.response_cache import mark_stale, tag
+from app.recurrence import RECURRING_PERIODICITIES, advance_due_date, iter_occurrences
 
 
 def get(*, session: Session, assignment_id: uuid.UUID) -> Optional[AuditAssignment]:
     return session.get(AuditAssignment, assignment_id)
 
 
+def _with_public_relations(statement: Any) -> Any:
+    # AuditAssignmentPublic nests the questions and the template, load them per page
+    # rather than per assignment
+    return statement.options(
+        selectinload(AuditAssignment.assigned_questions),
+        selectinload(AuditAssignment.audit_template).selectinload(AuditTemplate.question_templates),
+    )
+
+
 def get_all(*, session: Session, skip: int = 0, limit: int = 100) -> List[AuditAssignment]:
-    statement = select(AuditAssignment).offset(skip).limit(limit)
+    statement = _with_public_relations(select(AuditAssignment).offset(skip).limit(limit))
     return list(session.exec(statement).all())
 
 
@@ -35,7 +59,8 @@ def count_all(*, session: Session) -> int:
 
 
 def _get_auditor_assignment_conditions(current_user: User) -> list[Any]:
-    user_assigned_area_ids = {area.id for area in current_user.assigned_areas if area.id}
+    # The link rows carry the area ids, no need to load every Area
+    user_assigned_area_ids = {link.area_id for link in current_user.area_links}
     return [
         AuditAssignment.company_id == current_user.company_id,
         or_(
@@ -66,6 +91,7 @@ def get_multi_for_auditor(*, session: Session, current_user: User, skip: int = 0
         .offset(skip)
         .limit(limit)
     )
+    statement = _with_public_relations(statement)
     return list(session.exec(statement).all())
 
 
@@ -87,7 +113,7 @@ def get_multi_for_company(
     # Permission checks
     base_query = select(AuditAssignment).where(AuditAssignment.company_id == company_id)
     # ... additional permission logic ...
-    statement = base_query.offset(skip).limit(limit)
+    statement = _with_public_relations(base_query.offset(skip).limit(limit))
     return list(session.exec(statement).all())
 
 
@@ -99,8 +125,52 @@ def count_for_company(*, session: Session, company_id: uuid.UUID, current_user:
     return count if count is not None else 0
 
 
+def get_version(*, session: Session, assignment_id: uuid.UUID) -> Optional[tuple[Any, ...]]:
+    """
+    Change marker for an assignment as served by the API, including its questions and
+    nested template. None if the assignment does not exist.
+    """
+    of_assignment = AssignedQuestion.audit_assignment_id == assignment_id
+    of_template = QuestionTemplate.audit_template_id == AuditAssignment.audit_template_id
+    row = session.exec(
+        select(
+            AuditAssignment.updated_at,
+            select(func.max(AssignedQuestion.updated_at)).where(of_assignment).scalar_subquery(),
+            select(func.count(AssignedQuestion.id)).where(of_assignment).scalar_subquery(),
+            select(AuditTemplate.updated_at)
+            .where(AuditTemplate.id == AuditAssignment.audit_template_id)
+            .scalar_subquery(),
+            select(func.max(QuestionTemplate.updated_at)).where(of_template).scalar_subquery(),
+            select(func.count(QuestionTemplate.id)).where(of_template).scalar_subquery(),
+        ).where(AuditAssignment.id == assignment_id)
+    ).first()
+    return tuple(row) if row else None
+
+
+def get_collection_version(*, session: Session, conditions: list[Any]) -> tuple[Any, ...]:
+    """Change marker for every assignment matching `conditions`, their questions and templates."""
+    scoped_questions = AssignedQuestion.audit_assignment_id.in_(
+        select(AuditAssignment.id).where(*conditions)
+    )
+    row = session.exec(
+        select(
+            select(func.count(AuditAssignment.id)).where(*conditions).scalar_subquery(),
+            select(func.max(AuditAssignment.updated_at)).where(*conditions).scalar_subquery(),
+            select(func.count(AssignedQuestion.id)).where(scoped_questions).scalar_subquery(),
+            select(func.max(AssignedQuestion.updated_at)).where(scoped_questions).scalar_subquery(),
+            *template_version_columns(),
+        )
+    ).one()
+    return tuple(row)
+
+
+def get_auditor_conditions(*, current_user: User) -> list[Any]:
+    return _get_auditor_assignment_conditions(current_user)
+
+
+@traced
 def create_with_questions(*, session: Session, assignment_in: AuditAssignmentCreate, creator_id: uuid.UUID) -> AuditAssignment:
-    template = audit_template.get(session=session, template_id=assignment_in.audit_template_id)
+    template = template_cache.get(session, assignment_in.audit_template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Audit Template not found")
     if not company.get(session=session, company_id=assignment_in.company_id):
@@ -115,7 +185,7 @@ def create_with_questions(*, session: Session, assignment_in: AuditAssignmentCre
     session.add(db_assignment)
     session.flush()
 
-    for qt in template.question_templates:
+    for qt in template.questions:
         assigned_q_create = AssignedQuestionCreate(
             text=qt.text,
             question_type=qt.question_type,
@@ -131,6 +201,7 @@ def create_with_questions(*, session: Session, assignment_in: AuditAssignmentCre
 
     session.flush()
     session.refresh(db_assignment)
+    mark_stale(session, tag("company", db_assignment.company_id))
     return db_assignment
 
 
@@ -145,6 +216,7 @@ def update(*, session: Session, db_assignment: AuditAssignment, assignment_in: A
     session.add(db_assignment)
     session.flush()
     session.refresh(db_assignment)
+    mark_stale(session, tag("company", db_assignment.company_id))
     return db_assignment
 
 
@@ -154,8 +226,270 @@ def remove(*, session: Session, assignment_id: uuid.UUID) -> Optional[AuditAssig
         return None
     session.delete(assignment)
     session.flush()
+    mark_stale(session, tag("company", assignment.company_id))
     return assignment
 
+def _materialize_occurrences(*, session: Session, due_on: date, periodicity: AuditPeriodicity) -> int:
+    """
+    Clone every series with the given periodicity that is due on `due_on`, together
+    with its assigned questions, and advance the series. Three statements in total,
+    regardless of how many series share that due date.
+    """
+    assignment_table = AuditAssignment.__table__
+    question_table = AssignedQuestion.__table__
+    series = assignment_table.alias("series")
+    occurrence = assignment_table.alias("occurrence")
+    source_question = question_table.alias("source_question")
+    existing_question = question_table.alias("existing_question")
+
+    due_at = datetime.combine(due_on, time.min)
+    due_series = sa.and_(series.c.periodicity == periodicity, series.c.next_due_date == due_on)
+    is_occurrence_of_series = sa.and_(
+        occurrence.c.recurrence_source_id == series.c.id,
+        occurrence.c.due_date == sa.literal(due_at, assignment_table.c.due_date.type),
+    )
+
+    # 1. One occurrence per due series, unless a previous (interrupted) run already created it
+    occurrence_columns = [
+        "id", "title", "description", "due_date", "status", "is_public",
+        "audit_template_id", "company_id", "area_id", "created_by_id", "recurrence_source_id",
+    ]
+    occurrence_rows = (
+        sa.select(
+            new_uuid(),
+            series.c.title,
+            series.c.description,
+            sa.literal(due_at, assignment_table.c.due_date.type),
+            sa.literal(AuditAssignmentStatus.PENDING, assignment_table.c.status.type),
+            series.c.is_public,
+            series.c.audit_template_id,
+            series.c.company_id,
+            series.c.area_id,
+            series.c.created_by_id,
+            series.c.id,
+        )
+        .where(due_series)
+        .where(~sa.select(occurrence.c.id).where(is_occurrence_of_series).exists())
+    )
+    result = session.execute(
+        sa.insert(assignment_table).from_select(occurrence_columns, occurrence_rows)
+    )
+    created = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else 0
+
+    # 2. Copy the series' assigned questions onto occurrences that have none yet
+    question_columns = [
+        "id", "audit_assignment_id", "text", "question_type", "options", "order",
+        "is_mandatory", "section_id", "scoring_weight", "original_question_template_id",
+    ]
+    question_rows = (
+        sa.select(
+            new_uuid(),
+            occurrence.c.id,
+            source_question.c.text,
+            source_question.c.question_type,
+            source_question.c.options,
+            source_question.c.order,
+            source_question.c.is_mandatory,
+            source_question.c.section_id,
+            source_question.c.scoring_weight,
+            source_question.c.original_question_template_id,
+        )
+        .select_from(
+            series.join(occurrence, is_occurrence_of_series).join(
+                source_question, source_question.c.audit_assignment_id == series.c.id
+            )
+        )
+        .where(due_series)
+        .where(
+            ~sa.select(existing_question.c.id)
+            .where(existing_question.c.audit_assignment_id == occurrence.c.id)
+            .exists()
+        )
+    )
+    session.execute(sa.insert(question_table).from_select(question_columns, question_rows))
+
+    # 3. Move every series in this group to its next occurrence
+    session.execute(
+        sa.update(assignment_table)
+        .where(assignment_table.c.periodicity == periodicity, assignment_table.c.next_due_date == due_on)
+        .values(next_due_date=advance_due_date(due_on, periodicity))
+    )
+    return created
+
+
+def materialize_due_recurring(*, session: Session, as_of: date, max_passes: int = 366) -> int:
+    """
+    Create the occurrences of every recurring assignment whose `next_due_date` is on or
+    before `as_of`. Series are processed in groups sharing (next_due_date, periodicity),
+    so the statement count depends on the number of distinct due dates, not on the number
+    of series. Series that fell behind are caught up one occurrence per pass.
+
+    Safe to re-run: occurrences are keyed by (recurrence_source_id, due_date), so an
+    interrupted run never duplicates work. Callers should hold the materializer advisory
+    lock to avoid two runs advancing the same series concurrently.
+    """
+    created = 0
+    for _ in range(max_passes):
+        due_groups = session.exec(
+            select(AuditAssignment.next_due_date, AuditAssignment.periodicity)
+            .where(
+                AuditAssignment.periodicity.in_(list(RECURRING_PERIODICITIES)),
+                AuditAssignment.next_due_date <= as_of,
+            )
+            .distinct()
+            .order_by(AuditAssignment.next_due_date)
+        ).all()
+        if not due_groups:
+            break
+        for due_on, periodicity in due_groups:
+            created += _materialize_occurrences(session=session, due_on=due_on, periodicity=periodicity)
+    # The statements above bypass the ORM, so loaded assignments are stale
+    session.expire_all()
+    if created:
+        mark_stale(session, tag("assignments"))
+    return created
+
+
+def get_calendar_conditions(*, current_user: User) -> Optional[list[Any]]:
+    """
+    Visibility filter for the calendar, resolved eagerly so it can be reused after the
+    request session is gone. Returns None when the user can see nothing.
+    """
+    if current_user.is_superuser or current_user.role == UserRole.ADMIN:
+        return []
+    if not current_user.company_id:
+        return None
+    return _get_auditor_assignment_conditions(current_user)
+
+
+def _iter_materialized_entries(
+    *, session: Session, conditions: list[Any], window_from: date, window_to: date
+) -> Iterator[AuditCalendarEntry]:
+    statement = (
+        select(
+            AuditAssignment.id,
+            AuditAssignment.title,
+            AuditAssignment.company_id,
+            AuditAssignment.area_id,
+            AuditAssignment.status,
+            AuditAssignment.due_date,
+        )
+        .where(
+            *conditions,
+            AuditAssignment.due_date >= datetime.combine(window_from, time.min),
+            AuditAssignment.due_date < datetime.combine(window_to + timedelta(days=1), time.min),
+        )
+        .order_by(AuditAssignment.due_date)
+        .execution_options(yield_per=500)
+    )
+    for row in session.exec(statement):
+        yield AuditCalendarEntry(
+            due_on=row.due_date.date(),
+            assignment_id=row.id,
+            title=row.title,
+            company_id=row.company_id,
+            area_id=row.area_id,
+            status=row.status,
+            is_materialized=True,
+        )
+
+
+def _iter_projected_entries(
+    *, series: Any, window_from: date, window_to: date
+) -> Iterator[AuditCalendarEntry]:
+    for occurrence in iter_occurrences(
+        series.next_due_date, series.periodicity, window_from=window_from, window_to=window_to
+    ):
+        yield AuditCalendarEntry(
+            due_on=occurrence,
+            assignment_id=series.id,
+            title=series.title,
+            company_id=series.company_id,
+            area_id=series.area_id,
+            is_materialized=False,
+        )
+
+
+def iter_calendar(
+    *, session: Session, conditions: list[Any], window_from: date, window_to: date
+) -> Iterator[AuditCalendarEntry]:
+    """
+    Yield calendar entries in date order: assignments that already exist in the window,
+    merged with occurrences projected from recurring series that have not been
+    materialized yet. Nothing is expanded beyond what the consumer reads.
+    """
+    # Series are advanced past every occurrence they have materialized, so
+    # projections start at next_due_date and never duplicate existing rows.
+    series_rows = session.exec(
+        select(
+            AuditAssignment.id,
+            AuditAssignment.title,
+            AuditAssignment.company_id,
+            AuditAssignment.area_id,
+            AuditAssignment.periodicity,
+            AuditAssignment.next_due_date,
+        ).where(
+            *conditions,
+            AuditAssignment.periodicity.in_(list(RECURRING_PERIODICITIES)),
+            AuditAssignment.next_due_date != None,  # noqa: E711
+            AuditAssignment.next_due_date <= window_to,
+        )
+    ).all()
+
+    streams = [
+        _iter_projected_entries(series=series, window_from=window_from, window_to=window_to)
+        for series in series_rows
+    ]
+    streams.append(
+        _iter_materialized_entries(
+            session=session, conditions=conditions, window_from=window_from, window_to=window_to
+        )
+    )
+    yield from heapq.merge(*streams, key=lambda entry: entry.due_on)
+
+
+def iter_upcoming_for_auditors(*, session: Session, window_from: date, window_to: date) -> Iterator[Any]:
+    """
+    Stream (user, assignment) rows for every active auditor and each open assignment
+    they can see that falls due in the window, ordered by user. Visibility mirrors
+    `get_auditor_conditions`, resolved for all users at once by joining the area links.
+    """
+    link = UserAreaAssignmentLink
+    due_from = datetime.combine(window_from, time.min)
+    due_before = datetime.combine(window_to + timedelta(days=1), time.min)
+    statement = (
+        select(
+            User.id.label("user_id"),
+            User.email,
+            User.full_name,
+            AuditAssignment.id,
+            AuditAssignment.title,
+            AuditAssignment.due_date,
+            AuditAssignment.next_due_date,
+        )
+        .join(AuditAssignment, AuditAssignment.company_id == User.company_id)
+        .outerjoin(link, sa.and_(link.user_id == User.id, link.area_id == AuditAssignment.area_id))
+        .where(
+            User.is_active,
+            User.role == UserRole.AUDITOR,
+            AuditAssignment.status != AuditAssignmentStatus.COMPLETED,
+            or_(AuditAssignment.is_public, AuditAssignment.area_id == None, link.user_id != None),  # noqa: E711
+            or_(
+                sa.and_(AuditAssignment.due_date >= due_from, AuditAssignment.due_date < due_before),
+                sa.and_(
+                    AuditAssignment.periodicity.in_(list(RECURRING_PERIODICITIES)),
+                    AuditAssignment.next_due_date >= window_from,
+                    AuditAssignment.next_due_date <= window_to,
+                ),
+            ),
+        )
+        .order_by(User.id)
+        .execution_options(yield_per=1000)
+    )
+    yield from session.exec(statement)
+
+
+@traced
 def can_user_access_assignment(user: User, assignment: AuditAssignment, session: Session) -> bool:
     if not user or not assignment:
         return False
@@ -205,6 +539,15 @@ class CRUDAuditAssignment:
     def count_for_company(self, session: Session, *, company_id: uuid.UUID, current_user: User) -> int:
         return count_for_company(session=session, company_id=company_id, current_user=current_user)
 
+    def get_version(self, session: Session, *, assignment_id: uuid.UUID) -> Optional[tuple[Any, ...]]:
+        return get_version(session=session, assignment_id=assignment_id)
+
+    def get_collection_version(self, session: Session, *, conditions: list[Any]) -> tuple[Any, ...]:
+        return get_collection_version(session=session, conditions=conditions)
+
+    def get_auditor_conditions(self, *, current_user: User) -> list[Any]:
+        return get_auditor_conditions(current_user=current_user)
+
     def create_with_questions(
         self, session: Session, *, assignment_in: AuditAssignmentCreate, creator_id: uuid.UUID
     ) -> AuditAssignment:
@@ -218,6 +561,22 @@ class CRUDAuditAssignment:
     def remove(self, session: Session, *, assignment_id: uuid.UUID) -> Optional[AuditAssignment]:
         return remove(session=session, assignment_id=assignment_id)
     
+    def materialize_due_recurring(self, session: Session, *, as_of: date, max_passes: int = 366) -> int:
+        return materialize_due_recurring(session=session, as_of=as_of, max_passes=max_passes)
+
+    def get_calendar_conditions(self, *, current_user: User) -> Optional[list[Any]]:
+        return get_calendar_conditions(current_user=current_user)
+
+    def iter_calendar(
+        self, session: Session, *, conditions: list[Any], window_from: date, window_to: date
+    ) -> Iterator[AuditCalendarEntry]:
+        return iter_calendar(
+            session=session, conditions=conditions, window_from=window_from, window_to=window_to
+        )
+
+    def iter_upcoming_for_auditors(self, session: Session, *, window_from: date, window_to: date) -> Iterator[Any]:
+        return iter_upcoming_for_auditors(session=session, window_from=window_from, window_to=window_to)
+
     def can_user_access_assignment(self, user: User, assignment: AuditAssignment, session: Session) -> bool:
         return can_user_access_assignment(user=user, assignment=assignment, session=session)
 
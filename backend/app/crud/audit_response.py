@@ -7,17 +7,22 @@ from fastapi import HTTPException
 from sqlmodel import Session, select, func
 
 from app.audit_types import get_audit_type_definition
+from app.core.tracing import traced
 from app.crud.audit_assignment import audit_assignment as crud_audit_assignment
 from app.crud.assigned_question import assigned_question as crud_assigned_question
 from app.crud.answer import answer as crud_answer
+from app.crud.photo import photo as crud_photo
 from app.models import (
     AuditAssignment,
     AuditResponse,
     AuditResponseCreate,
+    AuditResponseSubmit,
     AuditResponseUpdate,
     AuditResponseStatus,
     AuditAssignmentStatus,
     AnswerCreate,
+    AssignedQuestion,
+    QuestionType,
     User,
     UserRole,
 )
@@ -37,6 +42,7 @@ def can_user_respond(user: User, assignment: "AuditAssignment") -> bool:
     return False
 
 
+@traced
 def get(*, session: Session, response_id: uuid.UUID, assignment_id: Optional[uuid.UUID] = None) -> Optional[AuditResponse]:
     statement = select(AuditResponse).where(AuditResponse.id == response_id)
     if assignment_id:
@@ -67,6 +73,11 @@ def create(*, session: Session, response_in: AuditResponseCreate, auditor_id: uu
     auditor = session.get(User, auditor_id)
     if not auditor or not can_user_respond(user=auditor, assignment=assignment):
         raise HTTPException(status_code=403, detail="User cannot respond to this assignment")
+    crud_photo.check_attachable(
+        session=session,
+        urls=[*(response_in.photo_urls or ()), *(url for a in response_in.answers or () for url in a.photo_urls or ())],
+        user=auditor,
+    )
 
     # ... (rest of the creation logic)
     db_response = AuditResponse.model_validate(
@@ -92,6 +103,74 @@ def update(*, session: Session, db_response: AuditResponse, response_in: AuditRe
     # ... (update logic with permission checks)
     return db_response
 
+def submit(
+    *, session: Session, assignment: AuditAssignment, submission_in: AuditResponseSubmit, auditor: User
+) -> AuditResponse:
+    """
+    Validate a complete response with all of its answers and write it with a single
+    flush. Nothing is written if any answer is invalid.
+    """
+    if not can_user_respond(user=auditor, assignment=assignment):
+        raise HTTPException(status_code=403, detail="User cannot respond to this assignment")
+    crud_photo.check_attachable(
+        session=session,
+        urls=[*(submission_in.photo_urls or ()), *(url for a in submission_in.answers for url in a.photo_urls or ())],
+        user=auditor,
+    )
+
+    questions = {
+        question.id: question
+        for question in session.exec(
+            select(AssignedQuestion).where(AssignedQuestion.audit_assignment_id == assignment.id)
+        )
+    }
+    audit_type_def = get_audit_type_definition(assignment.audit_template.audit_type_definition_key)
+    submitted = submission_in.status == AuditResponseStatus.SUBMITTED
+    db_response = AuditResponse.model_validate(
+        submission_in.model_dump(exclude={"answers"}),
+        update={
+            "audit_assignment_id": assignment.id,
+            "auditor_id": auditor.id,
+            "submission_date": datetime.now(timezone.utc) if submitted else None,
+        },
+    )
+
+    answers = []
+    answered: set[uuid.UUID] = set()
+    for answer_in in submission_in.answers:
+        question = questions.get(answer_in.assigned_question_id)
+        if question is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Assigned Question {answer_in.assigned_question_id} does not belong to this assignment",
+            )
+        if question.id in answered:
+            raise HTTPException(status_code=400, detail=f"Assigned Question {question.id} is answered more than once")
+        answers.append(
+            crud_answer.build(
+                answer_in=answer_in,
+                assigned_question=question,
+                audit_response_id=db_response.id,
+                audit_type_def=audit_type_def,
+            )
+        )
+        answered.add(question.id)
+
+    if submitted:
+        missing = [
+            str(question.id)
+            for question in questions.values()
+            if question.is_mandatory and question.question_type != QuestionType.SECTION_HEADER and question.id not in answered
+        ]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Mandatory questions are unanswered: {', '.join(missing)}")
+
+    db_response.answers = answers
+    session.add(db_response)
+    session.flush()
+    return db_response
+
+
 class CRUDAuditResponse:
     def get(self, session: Session, *, response_id: uuid.UUID, assignment_id: Optional[uuid.UUID] = None) -> Optional[AuditResponse]:
         return get(session=session, response_id=response_id, assignment_id=assignment_id)
@@ -108,4 +187,9 @@ class CRUDAuditResponse:
     def update(self, session: Session, *, db_response: AuditResponse, response_in: AuditResponseUpdate, current_user: User) -> AuditResponse:
         return update(session=session, db_response=db_response, response_in=response_in, current_user=current_user)
 
+    def submit(
+        self, session: Session, *, assignment: AuditAssignment, submission_in: AuditResponseSubmit, auditor: User
+    ) -> AuditResponse:
+        return submit(session=session, assignment=assignment, submission_in=submission_in, auditor=auditor)
+
 audit_response = CRUDAuditResponse()
@@ -1,11 +1,13 @@
 import uuid
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from fastapi import HTTPException
 from sqlmodel import Session, select, func
 
 from app.audit_types import get_audit_type_definition
 from app.models import AuditTemplate, AuditTemplateCreate, AuditTemplateUpdate, QuestionTemplate, User
+from app import template_cache
+from app.response_cache import mark_stale, tag
 
 
 def get(*, session: Session, template_id: uuid.UUID) -> Optional[AuditTemplate]:
@@ -26,6 +28,41 @@ def count(*, session: Session) -> int:
     return count if count is not None else 0
 
 
+def get_versions(*, session: Session, template_ids: List[uuid.UUID]) -> dict[uuid.UUID, tuple[Any, ...]]:
+    """Change markers for templates and their questions; templates that do not exist are left out."""
+    if not template_ids:
+        return {}
+    of_template = QuestionTemplate.audit_template_id == AuditTemplate.id
+    rows = session.exec(
+        select(
+            AuditTemplate.id,
+            AuditTemplate.updated_at,
+            select(func.max(QuestionTemplate.updated_at)).where(of_template).scalar_subquery(),
+            select(func.count(QuestionTemplate.id)).where(of_template).scalar_subquery(),
+        ).where(AuditTemplate.id.in_(template_ids))
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def get_version(*, session: Session, template_id: uuid.UUID) -> Optional[tuple[Any, ...]]:
+    """Change marker for a template and its questions, or None if the template does not exist."""
+    return get_versions(session=session, template_ids=[template_id]).get(template_id)
+
+
+def get_collection_version_columns() -> list[Any]:
+    """Scalar subqueries that change whenever any template or question template changes."""
+    return [
+        select(func.count(AuditTemplate.id)).scalar_subquery(),
+        select(func.max(AuditTemplate.updated_at)).scalar_subquery(),
+        select(func.count(QuestionTemplate.id)).scalar_subquery(),
+        select(func.max(QuestionTemplate.updated_at)).scalar_subquery(),
+    ]
+
+
+def get_collection_version(*, session: Session) -> tuple[Any, ...]:
+    return tuple(session.exec(select(*get_collection_version_columns())).one())
+
+
 def create(*, session: Session, template_in: AuditTemplateCreate, creator_id: uuid.UUID) -> AuditTemplate:
     if not get_audit_type_definition(template_in.audit_type_definition_key):
         raise HTTPException(status_code=400, detail="Invalid audit_type_definition_key")
@@ -65,6 +102,8 @@ def update(*, session: Session, db_template: AuditTemplate, template_in: AuditTe
     session.add(db_template)
     session.flush()
     session.refresh(db_template)
+    template_cache.mark_stale(session, db_template.id)
+    mark_stale(session, tag("template", db_template.id))
     return db_template
 
 
@@ -77,6 +116,8 @@ def remove(*, session: Session, template_id: uuid.UUID) -> Optional[AuditTemplat
     
     session.delete(template)
     session.flush()
+    template_cache.mark_stale(session, template.id)
+    mark_stale(session, tag("template", template.id))
     return template
 
 class CRUDAuditTemplate:
@@ -89,6 +130,15 @@ class CRUDAuditTemplate:
     def count(self, session: Session) -> int:
         return count(session=session)
 
+    def get_version(self, session: Session, *, template_id: uuid.UUID) -> Optional[tuple[Any, ...]]:
+        return get_version(session=session, template_id=template_id)
+
+    def get_versions(self, session: Session, *, template_ids: List[uuid.UUID]) -> dict[uuid.UUID, tuple[Any, ...]]:
+        return get_versions(session=session, template_ids=template_ids)
+
+    def get_collection_version(self, session: Session) -> tuple[Any, ...]:
+        return get_collection_version(session=session)
+
     def create(self, session: Session, *, template_in: AuditTemplateCreate, creator_id: uuid.UUID) -> AuditTemplate:
         return create(session=session, template_in=template_in, creator_id=creator_id)
 
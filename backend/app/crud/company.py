@@ -4,7 +4,9 @@ from typing import List, Optional
 from fastapi import HTTPException
 from sqlmodel import Session, select, func
 
+from app import demo_companies
 from app.models import Company, CompanyCreate, CompanyUpdate, User, UserRole
+from app.response_cache import mark_stale, tag
 
 
 def get(*, session: Session, company_id: uuid.UUID) -> Optional[Company]:
@@ -40,6 +42,7 @@ def create(*, session: Session, company_in: CompanyCreate) -> Company:
     session.add(db_company)
     session.flush()
     session.refresh(db_company)
+    demo_companies.mark_stale(session)
     return db_company
 
 
@@ -49,6 +52,8 @@ def update(*, session: Session, db_company: Company, company_in: CompanyUpdate)
     session.add(db_company)
     session.flush()
     session.refresh(db_company)
+    mark_stale(session, tag("company", db_company.id))
+    demo_companies.mark_stale(session)
     return db_company
 
 
@@ -58,6 +63,8 @@ def remove(*, session: Session, company_id: uuid.UUID) -> Optional[Company]:
         return None
     session.delete(company)
     session.flush()
+    mark_stale(session, tag("company", company_id))
+    demo_companies.mark_stale(session)
     return company
 
 class CRUDCompany:
@@ -0,0 +1,112 @@
+from datetime import datetime
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlmodel import Session, col, delete, select
+
+from app.models import EmailOutbox, EmailStatus
+
+
+def enqueue(*, session: Session, email_to: str, subject: str, html_content: str) -> EmailOutbox:
+    """Queue an email; it goes out only if the caller's transaction commits."""
+    message = EmailOutbox(email_to=email_to, subject=subject, html_content=html_content)
+    session.add(message)
+    session.flush()
+    return message
+
+
+def enqueue_many(
+    *, session: Session, messages: list[tuple[str, str, str]], dedupe_keys: Optional[list[str]] = None
+) -> int:
+    """
+    Queue many (email_to, subject, html_content) emails with one executemany INSERT,
+    without loading them into the session. `dedupe_keys`, one per message, must not be
+    in the outbox yet; see `queued_dedupe_keys`.
+    """
+    if not messages:
+        return 0
+    keys: list[Optional[str]] = list(dedupe_keys) if dedupe_keys is not None else [None] * len(messages)
+    rows = [
+        EmailOutbox(email_to=email_to, subject=subject, html_content=html_content, dedupe_key=key).model_dump()
+        for (email_to, subject, html_content), key in zip(messages, keys, strict=True)
+    ]
+    session.execute(sa.insert(EmailOutbox.__table__), rows)  # type: ignore[attr-defined]
+    return len(rows)
+
+
+def queued_dedupe_keys(*, session: Session, prefix: str) -> set[str]:
+    """Dedupe keys starting with `prefix` of messages in the outbox, sent or not."""
+    statement = select(EmailOutbox.dedupe_key).where(col(EmailOutbox.dedupe_key).startswith(prefix, autoescape=True))
+    return {key for key in session.exec(statement) if key is not None}
+
+
+def claim_due(*, session: Session, now: datetime, limit: int) -> list[EmailOutbox]:
+    """
+    Lock up to `limit` pending messages that are due. Rows another worker holds are
+    skipped, so several workers can drain the outbox without sending anything twice.
+    """
+    statement = (
+        select(EmailOutbox)
+        .where(EmailOutbox.status == EmailStatus.PENDING, EmailOutbox.next_attempt_at <= now)
+        .order_by(col(EmailOutbox.next_attempt_at))
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return list(session.exec(statement))
+
+
+def mark_sent(*, session: Session, message: EmailOutbox, now: datetime) -> None:
+    message.status = EmailStatus.SENT
+    message.attempts += 1
+    message.sent_at = now
+    message.last_error = None
+    session.add(message)
+
+
+def mark_failed(*, session: Session, message: EmailOutbox, error: str, retry_at: Optional[datetime]) -> None:
+    """Record a failed attempt; without `retry_at` the message is given up on."""
+    message.attempts += 1
+    message.last_error = error
+    if retry_at is None:
+        message.status = EmailStatus.FAILED
+    else:
+        message.next_attempt_at = retry_at
+    session.add(message)
+
+
+def purge_finished(*, session: Session, before: datetime) -> int:
+    result = session.exec(
+        delete(EmailOutbox).where(  # type: ignore[call-overload]
+            col(EmailOutbox.status).in_([EmailStatus.SENT, EmailStatus.FAILED]),
+            EmailOutbox.created_at < before,
+        )
+    )
+    return result.rowcount or 0
+
+
+class CRUDEmailOutbox:
+    def enqueue(self, session: Session, *, email_to: str, subject: str, html_content: str) -> EmailOutbox:
+        return enqueue(session=session, email_to=email_to, subject=subject, html_content=html_content)
+
+    def enqueue_many(
+        self, session: Session, *, messages: list[tuple[str, str, str]], dedupe_keys: Optional[list[str]] = None
+    ) -> int:
+        return enqueue_many(session=session, messages=messages, dedupe_keys=dedupe_keys)
+
+    def queued_dedupe_keys(self, session: Session, *, prefix: str) -> set[str]:
+        return queued_dedupe_keys(session=session, prefix=prefix)
+
+    def claim_due(self, session: Session, *, now: datetime, limit: int) -> list[EmailOutbox]:
+        return claim_due(session=session, now=now, limit=limit)
+
+    def mark_sent(self, session: Session, *, message: EmailOutbox, now: datetime) -> None:
+        mark_sent(session=session, message=message, now=now)
+
+    def mark_failed(self, session: Session, *, message: EmailOutbox, error: str, retry_at: Optional[datetime]) -> None:
+        mark_failed(session=session, message=message, error=error, retry_at=retry_at)
+
+    def purge_finished(self, session: Session, *, before: datetime) -> int:
+        return purge_finished(session=session, before=before)
+
+
+email_outbox = CRUDEmailOutbox()
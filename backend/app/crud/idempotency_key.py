@@ -0,0 +1,74 @@
+import hashlib
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlmodel import Session, delete
+
+from app.models import IdempotencyKey
+
+
+def fingerprint(*parts: str) -> str:
+    """Hash identifying a request, so a key reused for a different request is caught."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def get(*, session: Session, user_id: uuid.UUID, key: str) -> Optional[IdempotencyKey]:
+    record = session.get(IdempotencyKey, (user_id, key))
+    if record is None or record.expires_at <= datetime.utcnow():
+        return None
+    return record
+
+
+def claim(*, session: Session, user_id: uuid.UUID, key: str, request_hash: str, ttl: timedelta) -> IdempotencyKey:
+    """
+    Insert the key before doing the work. A concurrent request with the same key blocks
+    on the primary key until this transaction ends and then fails with IntegrityError.
+    """
+    expired = session.get(IdempotencyKey, (user_id, key))
+    if expired is not None:
+        session.delete(expired)
+        session.flush()
+    record = IdempotencyKey(user_id=user_id, key=key, request_hash=request_hash, expires_at=datetime.utcnow() + ttl)
+    session.add(record)
+    session.flush()
+    return record
+
+
+def complete(*, session: Session, record: IdempotencyKey, status_code: int, body: bytes) -> IdempotencyKey:
+    record.status_code = status_code
+    record.response_body = body
+    session.add(record)
+    session.flush()
+    return record
+
+
+def purge_expired(*, session: Session, now: datetime) -> int:
+    result = session.exec(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))  # type: ignore[call-overload]
+    return result.rowcount or 0
+
+
+class CRUDIdempotencyKey:
+    def fingerprint(self, *parts: str) -> str:
+        return fingerprint(*parts)
+
+    def get(self, session: Session, *, user_id: uuid.UUID, key: str) -> Optional[IdempotencyKey]:
+        return get(session=session, user_id=user_id, key=key)
+
+    def claim(
+        self, session: Session, *, user_id: uuid.UUID, key: str, request_hash: str, ttl: timedelta
+    ) -> IdempotencyKey:
+        return claim(session=session, user_id=user_id, key=key, request_hash=request_hash, ttl=ttl)
+
+    def complete(self, session: Session, *, record: IdempotencyKey, status_code: int, body: bytes) -> IdempotencyKey:
+        return complete(session=session, record=record, status_code=status_code, body=body)
+
+    def purge_expired(self, session: Session, *, now: datetime) -> int:
+        return purge_expired(session=session, now=now)
+
+
+idempotency_key = CRUDIdempotencyKey()
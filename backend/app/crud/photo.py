@@ -0,0 +1,257 @@
+import re
+import uuid
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+import sqlalchemy as sa
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, delete, select, update
+
+from app.core.config import settings
+from app.crud.audit_assignment import get_auditor_conditions
+from app.models import (
+    Answer,
+    AuditAssignment,
+    AuditResponse,
+    Photo,
+    PhotoReference,
+    PhotoUpload,
+    PhotoUploadCreate,
+    User,
+    UserRole,
+)
+
+# Only URLs served by GET /photos/{sha256} are counted; other URLs in photo_urls are left alone
+_PHOTO_URL = re.compile(r"/photos/([0-9a-f]{64})$")
+
+
+def photo_url(sha256: str) -> str:
+    return f"{settings.API_V1_STR}/photos/{sha256}"
+
+
+def referenced_digests(urls: Optional[Iterable[str]]) -> set[str]:
+    return {match.group(1) for url in urls or () if (match := _PHOTO_URL.search(url))}
+
+
+def get(*, session: Session, sha256: str) -> Optional[Photo]:
+    return session.get(Photo, sha256)
+
+
+def get_upload(*, session: Session, upload_id: uuid.UUID, user_id: uuid.UUID) -> Optional[PhotoUpload]:
+    upload = session.get(PhotoUpload, upload_id)
+    if upload is None or upload.user_id != user_id or upload.expires_at <= datetime.utcnow():
+        return None
+    return upload
+
+
+def can_read(*, session: Session, sha256: str, user: User) -> bool:
+    """
+    Whether `user` may download a photo: they uploaded its bytes themselves, or a
+    response or answer of an assignment they can access refers to it. Knowing the
+    digest is not enough.
+    """
+    if user.is_superuser or user.role == UserRole.ADMIN:
+        return True
+    uploaded = select(PhotoUpload.id).where(
+        PhotoUpload.user_id == user.id, PhotoUpload.sha256 == sha256, PhotoUpload.completed
+    )
+    referenced = (
+        select(PhotoReference.audit_assignment_id)
+        .join(AuditAssignment, AuditAssignment.id == PhotoReference.audit_assignment_id)  # type: ignore[arg-type]
+        .where(PhotoReference.sha256 == sha256, PhotoReference.ref_count > 0, *get_auditor_conditions(current_user=user))
+    )
+    return bool(session.scalar(sa.select(sa.or_(uploaded.exists(), referenced.exists()))))
+
+
+def check_attachable(*, session: Session, urls: Iterable[str], user: User) -> None:
+    """Refuse photo URLs to photos `user` may not read: attaching one would grant access to it."""
+    for sha256 in sorted(referenced_digests(urls)):
+        if not can_read(session=session, sha256=sha256, user=user):
+            raise HTTPException(status_code=403, detail=f"Photo {sha256} was not uploaded by you")
+
+
+def create_upload(*, session: Session, upload_in: PhotoUploadCreate, user: User, ttl: timedelta) -> PhotoUpload:
+    """
+    Start an upload, complete from the outset when the declared digest is already
+    stored and `user` may read it; anyone else sends the bytes, proving they have them.
+    """
+    upload = PhotoUpload.model_validate(upload_in, update={"user_id": user.id, "expires_at": datetime.utcnow() + ttl})
+    if (
+        upload_in.sha256 is not None
+        and (photo := session.get(Photo, upload_in.sha256)) is not None
+        and can_read(session=session, sha256=upload_in.sha256, user=user)
+    ):
+        upload.offset = upload.length = photo.size
+        upload.completed = True
+        # Restart the grace period so the photo outlives the upload even if still unreferenced
+        photo.updated_at = datetime.utcnow()
+    session.add(upload)
+    session.flush()
+    return upload
+
+
+def complete_upload(*, session: Session, upload: PhotoUpload, sha256: str) -> Photo:
+    """Record the stored blob for a finished upload. The blob must already be in storage."""
+    upload.sha256 = sha256
+    upload.completed = True
+    session.add(upload)
+    photo = session.get(Photo, sha256)
+    if photo is not None:
+        photo.updated_at = datetime.utcnow()
+    else:
+        photo = Photo(sha256=sha256, size=upload.length, content_type=upload.content_type)
+        try:
+            with session.begin_nested():
+                session.add(photo)
+        except IntegrityError:
+            # The same photo finished uploading concurrently
+            photo = session.get(Photo, sha256)
+            assert photo is not None
+    session.flush()
+    return photo
+
+
+def purge_expired_uploads(*, session: Session, now: datetime) -> list[uuid.UUID]:
+    """Drop expired uploads and return their ids, whose staged files the caller removes."""
+    result = session.exec(delete(PhotoUpload).where(PhotoUpload.expires_at <= now).returning(PhotoUpload.id))  # type: ignore[call-overload]
+    return list(result.scalars())
+
+
+def purge_unreferenced(*, session: Session, before: datetime) -> list[str]:
+    """
+    Drop photos nothing has referred to since `before` and return their digests. Delete
+    the blobs only after committing, so a rollback never leaves rows without blobs.
+    """
+    result = session.exec(
+        delete(Photo).where(Photo.ref_count <= 0, Photo.updated_at < before).returning(Photo.sha256)  # type: ignore[call-overload]
+    )
+    return list(result.scalars())
+
+
+class _Assignments:
+    """The assignment each response, and so each answer, in the flush belongs to."""
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+        self.by_response = {
+            obj.id: obj.audit_assignment_id
+            for obj in (*session.identity_map.values(), *session.new, *session.deleted)
+            if isinstance(obj, AuditResponse)
+        }
+
+    def of(self, obj: Answer | AuditResponse) -> Optional[uuid.UUID]:
+        if isinstance(obj, AuditResponse):
+            return obj.audit_assignment_id
+        if obj.audit_response_id not in self.by_response:
+            self.by_response[obj.audit_response_id] = self.session.exec(
+                select(AuditResponse.audit_assignment_id).where(AuditResponse.id == obj.audit_response_id)
+            ).one_or_none()
+        return self.by_response[obj.audit_response_id]
+
+
+def _reference_deltas(session: Session) -> Counter[tuple[str, Optional[uuid.UUID]]]:
+    """Change in references per (digest, assignment) the flush is about to make."""
+    deltas: Counter[tuple[str, Optional[uuid.UUID]]] = Counter()
+    assignments = _Assignments(session)
+    for obj in session.new:
+        if isinstance(obj, (Answer, AuditResponse)):
+            assignment_id = assignments.of(obj)
+            deltas.update((sha256, assignment_id) for sha256 in referenced_digests(obj.photo_urls))
+    for obj in session.deleted:
+        if isinstance(obj, (Answer, AuditResponse)):
+            assignment_id = assignments.of(obj)
+            deltas.subtract((sha256, assignment_id) for sha256 in referenced_digests(obj.photo_urls))
+    for obj in session.dirty:
+        if not isinstance(obj, (Answer, AuditResponse)):
+            continue
+        history = sa.inspect(obj).attrs.photo_urls.history
+        if not history.added:
+            continue
+        if history.deleted:
+            old_urls = history.deleted[0]
+        else:
+            # The old value was never loaded (e.g. expired by a commit); the row still has it
+            model = type(obj)
+            old_urls = session.exec(select(model.photo_urls).where(model.id == obj.id)).one_or_none()
+        assignment_id = assignments.of(obj)
+        deltas.update((sha256, assignment_id) for sha256 in referenced_digests(history.added[0]))
+        deltas.subtract((sha256, assignment_id) for sha256 in referenced_digests(old_urls))
+    return deltas
+
+
+def _count_assignment_references(session: Session, deltas: dict[tuple[str, uuid.UUID], int]) -> None:
+    rows = [
+        {"sha256": sha256, "audit_assignment_id": assignment_id, "ref_count": delta}
+        for (sha256, assignment_id), delta in deltas.items()
+        if delta
+    ]
+    if not rows:
+        return
+    # SQLite (the tests) has the same upsert as Postgres
+    dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    table = PhotoReference.__table__  # type: ignore[attr-defined]
+    statement = dialect.insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.sha256, table.c.audit_assignment_id],
+        set_={"ref_count": table.c.ref_count + statement.excluded.ref_count},
+    )
+    session.execute(statement, rows)
+
+
+@event.listens_for(Session, "before_flush")
+def _count_references(session: Session, flush_context: Any, instances: Any) -> None:
+    with session.no_autoflush:
+        pair_deltas = _reference_deltas(session)
+        deltas: Counter[str] = Counter()
+        for (sha256, _), delta in pair_deltas.items():
+            deltas[sha256] += delta
+        _count_assignment_references(
+            session,
+            {(sha256, assignment_id): delta for (sha256, assignment_id), delta in pair_deltas.items() if assignment_id},
+        )
+        by_delta: defaultdict[int, list[str]] = defaultdict(list)
+        for sha256, delta in deltas.items():
+            if delta:
+                by_delta[delta].append(sha256)
+        # One UPDATE per distinct delta, usually just +1 and -1
+        for delta, digests in by_delta.items():
+            session.exec(
+                update(Photo).where(Photo.sha256.in_(digests)).values(ref_count=Photo.ref_count + delta)  # type: ignore[call-overload, attr-defined]
+            )
+
+
+class CRUDPhoto:
+    def photo_url(self, sha256: str) -> str:
+        return photo_url(sha256)
+
+    def get(self, session: Session, *, sha256: str) -> Optional[Photo]:
+        return get(session=session, sha256=sha256)
+
+    def can_read(self, session: Session, *, sha256: str, user: User) -> bool:
+        return can_read(session=session, sha256=sha256, user=user)
+
+    def check_attachable(self, session: Session, *, urls: Iterable[str], user: User) -> None:
+        check_attachable(session=session, urls=urls, user=user)
+
+    def get_upload(self, session: Session, *, upload_id: uuid.UUID, user_id: uuid.UUID) -> Optional[PhotoUpload]:
+        return get_upload(session=session, upload_id=upload_id, user_id=user_id)
+
+    def create_upload(self, session: Session, *, upload_in: PhotoUploadCreate, user: User, ttl: timedelta) -> PhotoUpload:
+        return create_upload(session=session, upload_in=upload_in, user=user, ttl=ttl)
+
+    def complete_upload(self, session: Session, *, upload: PhotoUpload, sha256: str) -> Photo:
+        return complete_upload(session=session, upload=upload, sha256=sha256)
+
+    def purge_expired_uploads(self, session: Session, *, now: datetime) -> list[uuid.UUID]:
+        return purge_expired_uploads(session=session, now=now)
+
+    def purge_unreferenced(self, session: Session, *, before: datetime) -> list[str]:
+        return purge_unreferenced(session=session, before=before)
+
+
+photo = CRUDPhoto()
@@ -6,6 +6,8 @@ from sqlmodel import Session, select, func
 
 from app.audit_types import get_audit_type_definition
 from app.models import QuestionTemplate, QuestionTemplateCreate, QuestionTemplateUpdate, AuditTemplate
+from app import template_cache
+from app.response_cache import mark_stale, tag
 
 
 def get(*, session: Session, question_id: uuid.UUID, audit_template_id: Optional[uuid.UUID] = None) -> Optional[QuestionTemplate]:
@@ -58,6 +60,8 @@ def create(*, session: Session, question_in: QuestionTemplateCreate) -> Question
     session.add(db_question)
     session.flush()
     session.refresh(db_question)
+    template_cache.mark_stale(session, db_question.audit_template_id)
+    mark_stale(session, tag("template", db_question.audit_template_id))
     return db_question
 
 
@@ -81,6 +85,8 @@ def update(*, session: Session, db_question: QuestionTemplate, question_in: Ques
     session.add(db_question)
     session.flush()
     session.refresh(db_question)
+    template_cache.mark_stale(session, db_question.audit_template_id)
+    mark_stale(session, tag("template", db_question.audit_template_id))
     return db_question
 
 
@@ -90,6 +96,8 @@ def remove(*, session: Session, question_id: uuid.UUID, audit_template_id: uuid.
         return None
     session.delete(question)
     session.flush()
+    template_cache.mark_stale(session, audit_template_id)
+    mark_stale(session, tag("template", audit_template_id))
     return question
 
 class CRUDQuestionTemplate:
@@ -0,0 +1,270 @@
+import base64
+import uuid
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, and_, delete, exists, func, or_, select
+
+from app.core.config import settings
+from app.crud.audit_assignment import get_auditor_conditions
+from app.models import (
+    Answer,
+    Area,
+    AssignedQuestion,
+    AuditAssignment,
+    AuditResponse,
+    AuditResponsePublic,
+    SyncChange,
+    SyncEntityType,
+    SyncPublic,
+    SyncTombstone,
+    User,
+    UserAreaAssignmentLink,
+    UserRole,
+)
+
+_TOKEN_VERSION = "1"
+
+
+def encode_token(mark: datetime) -> str:
+    return base64.urlsafe_b64encode(f"{_TOKEN_VERSION}:{mark.isoformat()}".encode()).decode()
+
+
+def decode_token(token: str) -> datetime:
+    """High-water mark from a token issued by `get_changes`. Raises ValueError if malformed."""
+    try:
+        version, _, mark = base64.urlsafe_b64decode(token.encode()).decode().partition(":")
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Malformed sync token") from e
+    if version != _TOKEN_VERSION:
+        raise ValueError("Unsupported sync token version")
+    return datetime.fromisoformat(mark)
+
+
+def _scope(current_user: User) -> tuple[list[Any], list[Any]]:
+    """Conditions on AuditAssignment and SyncTombstone for what `current_user` may sync."""
+    visible_tombstones = SyncTombstone.user_id == None  # noqa: E711
+    if current_user.is_superuser or current_user.role == UserRole.ADMIN:
+        assignment_conditions = [AuditAssignment.company_id == current_user.company_id]
+    else:
+        assignment_conditions = get_auditor_conditions(current_user=current_user)
+        area_ids = [link.area_id for link in current_user.area_links]
+        visible_tombstones = and_(
+            visible_tombstones,
+            or_(SyncTombstone.area_id == None, SyncTombstone.area_id.in_(area_ids)),  # noqa: E711
+        )
+    tombstone_conditions = [
+        SyncTombstone.company_id == current_user.company_id,
+        or_(visible_tombstones, SyncTombstone.user_id == current_user.id),
+    ]
+    return assignment_conditions, tombstone_conditions
+
+
+def _newly_linked_area_ids(current_user: User, mark: datetime) -> list[uuid.UUID]:
+    # Assignments in an area the caller just joined are new to them, however old they are
+    return [link.area_id for link in current_user.area_links if link.assigned_at > mark]
+
+
+def _changed_since(
+    mark: datetime, assignment_conditions: list[Any], tombstone_conditions: list[Any], new_area_ids: list[uuid.UUID]
+) -> Any:
+    """
+    One statement telling whether anything in scope moved past `mark`. Every branch is a
+    range scan on an updated_at/deleted_at index, so a no-op sync reads a handful of
+    index pages whatever the size of the tables.
+    """
+    scoped = [AuditAssignment.id == AssignedQuestion.audit_assignment_id, *assignment_conditions]
+    assignment_changed = AuditAssignment.updated_at > mark
+    if new_area_ids:
+        assignment_changed = or_(assignment_changed, AuditAssignment.area_id.in_(new_area_ids))
+    return or_(
+        exists().where(assignment_changed, *assignment_conditions),
+        exists().where(AssignedQuestion.updated_at > mark, *scoped),
+        exists().where(
+            AuditResponse.updated_at > mark,
+            AuditAssignment.id == AuditResponse.audit_assignment_id,
+            *assignment_conditions,
+        ),
+        exists().where(
+            Answer.updated_at > mark,
+            AuditResponse.id == Answer.audit_response_id,
+            AuditAssignment.id == AuditResponse.audit_assignment_id,
+            *assignment_conditions,
+        ),
+        exists().where(SyncTombstone.deleted_at > mark, *tombstone_conditions),
+    )
+
+
+def _utc(moment: datetime) -> datetime:
+    # Postgres now() is timestamptz while the columns are naive UTC
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _upsert(entity_type: SyncEntityType, row_id: uuid.UUID, data: dict[str, Any]) -> SyncChange:
+    data.pop("id", None)
+    return SyncChange(op="upsert", type=entity_type, id=row_id, data=data)
+
+
+def get_changes(*, session: Session, current_user: User, since: Optional[datetime]) -> SyncPublic:
+    """
+    Everything in the caller's scope that changed after `since`, as a compact change
+    stream. Without `since`, or when it predates the tombstone retention window, the
+    result is a full snapshot flagged `reset`.
+
+    An assignment that changed itself (or became visible) is sent with all of its
+    questions and responses, since the client may have dropped them along with it;
+    otherwise only the changed questions and responses are sent. The returned token
+    lags the database clock by SYNC_OVERLAP_SECONDS so rows from transactions still
+    in flight are picked up by the next sync rather than skipped.
+    """
+    assignment_conditions, tombstone_conditions = _scope(current_user)
+    retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    reset = since is None
+    if since is None:
+        now = _utc(session.exec(select(func.now())).one())
+    else:
+        new_area_ids = _newly_linked_area_ids(current_user, since)
+        now, changed = session.exec(
+            select(func.now(), _changed_since(since, assignment_conditions, tombstone_conditions, new_area_ids))
+        ).one()
+        now = _utc(now)
+        reset = since < now - retention
+        if not changed and not reset:
+            return SyncPublic(token=encode_token(since))
+
+    token = encode_token(now - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS))
+    changes: list[SyncChange] = []
+    if reset:
+        full_assignment = sa.true()
+        question_changed = response_changed = sa.false()
+    else:
+        assert since is not None
+        changes.extend(
+            SyncChange(op="delete", type=SyncEntityType(entity_type), id=entity_id)
+            for entity_type, entity_id in session.exec(
+                select(SyncTombstone.entity_type, SyncTombstone.entity_id)
+                .where(SyncTombstone.deleted_at > since, *tombstone_conditions)
+                .order_by(SyncTombstone.deleted_at)
+            )
+        )
+        full_assignment = AuditAssignment.updated_at > since
+        if new_area_ids:
+            full_assignment = or_(full_assignment, AuditAssignment.area_id.in_(new_area_ids))
+        question_changed = AssignedQuestion.updated_at > since
+        response_changed = or_(
+            AuditResponse.updated_at > since,
+            AuditResponse.id.in_(select(Answer.audit_response_id).where(Answer.updated_at > since)),
+        )
+
+    for assignment in session.exec(
+        select(AuditAssignment).where(full_assignment, *assignment_conditions).order_by(AuditAssignment.id)
+    ):
+        changes.append(_upsert(SyncEntityType.ASSIGNMENT, assignment.id, assignment.model_dump(mode="json", exclude_none=True)))
+    for question in session.exec(
+        select(AssignedQuestion)
+        .join(AuditAssignment, AuditAssignment.id == AssignedQuestion.audit_assignment_id)
+        .where(or_(full_assignment, question_changed), *assignment_conditions)
+        .order_by(AssignedQuestion.audit_assignment_id, AssignedQuestion.order)
+    ):
+        changes.append(_upsert(SyncEntityType.QUESTION, question.id, question.model_dump(mode="json", exclude_none=True)))
+    for audit_response in session.exec(
+        select(AuditResponse)
+        .join(AuditAssignment, AuditAssignment.id == AuditResponse.audit_assignment_id)
+        .where(or_(full_assignment, response_changed), *assignment_conditions)
+        .options(selectinload(AuditResponse.answers))
+        .order_by(AuditResponse.audit_assignment_id, AuditResponse.id)
+    ):
+        data = AuditResponsePublic.model_validate(audit_response).model_dump(mode="json", exclude_none=True)
+        changes.append(_upsert(SyncEntityType.RESPONSE, audit_response.id, data))
+    return SyncPublic(token=token, reset=reset, changes=changes)
+
+
+def purge_tombstones(*, session: Session, before: datetime) -> int:
+    """Drop tombstones no token still in its retention window can ask for."""
+    result = session.exec(delete(SyncTombstone).where(SyncTombstone.deleted_at < before))  # type: ignore[call-overload]
+    return result.rowcount or 0
+
+
+def _visible_area_id(assignment: AuditAssignment) -> Optional[uuid.UUID]:
+    return None if assignment.is_public else assignment.area_id
+
+
+def _tombstones_for(session: Session, deleted: Iterable[Any], dirty: Iterable[Any]) -> list[SyncTombstone]:
+    deleted = list(deleted)
+    deleted_ids = {(type(obj), obj.id) for obj in deleted if hasattr(obj, "id")}
+    tombstones = []
+    for obj in deleted:
+        if isinstance(obj, AuditAssignment):
+            tombstones.append(
+                SyncTombstone(entity_type=SyncEntityType.ASSIGNMENT.value, entity_id=obj.id, company_id=obj.company_id)
+            )
+        elif isinstance(obj, (AssignedQuestion, AuditResponse)):
+            # Deleting the assignment already tells clients to drop its children
+            if (AuditAssignment, obj.audit_assignment_id) in deleted_ids:
+                continue
+            assignment = session.get(AuditAssignment, obj.audit_assignment_id)
+            if assignment is None:
+                continue
+            entity_type = SyncEntityType.QUESTION if isinstance(obj, AssignedQuestion) else SyncEntityType.RESPONSE
+            tombstones.append(
+                SyncTombstone(
+                    entity_type=entity_type.value,
+                    entity_id=obj.id,
+                    company_id=assignment.company_id,
+                    area_id=_visible_area_id(assignment),
+                )
+            )
+        elif isinstance(obj, Answer):
+            # Answers travel inside their response, so resend the response
+            audit_response = session.get(AuditResponse, obj.audit_response_id)
+            if audit_response is not None and (AuditResponse, audit_response.id) not in deleted_ids:
+                audit_response.updated_at = datetime.utcnow()
+        elif isinstance(obj, Area):
+            tombstones.append(SyncTombstone(entity_type=SyncEntityType.AREA.value, entity_id=obj.id, company_id=obj.company_id))
+        elif isinstance(obj, UserAreaAssignmentLink):
+            area = session.get(Area, obj.area_id)
+            if area is None or (Area, area.id) in deleted_ids or (User, obj.user_id) in deleted_ids:
+                continue
+            tombstones.append(
+                SyncTombstone(
+                    entity_type=SyncEntityType.AREA.value, entity_id=area.id, company_id=area.company_id, user_id=obj.user_id
+                )
+            )
+    for obj in dirty:
+        if not isinstance(obj, AuditAssignment):
+            continue
+        # Moving an assignment to another area or making it private hides it from some
+        # auditors: everyone drops it, and those who still see it get it back as an upsert
+        attrs = sa.inspect(obj).attrs
+        area_moved = attrs.area_id.history.deleted and attrs.area_id.history.deleted[0] != obj.area_id
+        made_private = attrs.is_public.history.deleted and attrs.is_public.history.deleted[0] and not obj.is_public
+        if area_moved or made_private:
+            tombstones.append(
+                SyncTombstone(entity_type=SyncEntityType.ASSIGNMENT.value, entity_id=obj.id, company_id=obj.company_id)
+            )
+    return tombstones
+
+
+@event.listens_for(Session, "before_flush")
+def _record_tombstones(session: Session, flush_context: Any, instances: Any) -> None:
+    if not session.deleted and not session.dirty:
+        return
+    with session.no_autoflush:
+        session.add_all(_tombstones_for(session, session.deleted, session.dirty))
+
+
+class CRUDSync:
+    def get_changes(self, session: Session, *, current_user: User, since: Optional[datetime]) -> SyncPublic:
+        return get_changes(session=session, current_user=current_user, since=since)
+
+    def purge_tombstones(self, session: Session, *, before: datetime) -> int:
+        return purge_tombstones(session=session, before=before)
+
+
+sync = CRUDSync()
@@ -0,0 +1,70 @@
+import threading
+import time
+import uuid
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import Company
+
+NOTIFY_CHANNEL = "company_changed"
+_STALE_KEY = "stale_demo_company_ids"
+
+
+class DemoCompanyIds:
+    """
+    Process-local copy of the ids of demo companies, which every request serializing
+    users for a non-admin needs (see deps.get_demo_context).
+
+    As in TemplateCache, a version counter is bumped on invalidation and a load whose
+    version moved while it read the database is not kept. Loaded ids are also dropped
+    after `ttl` seconds, which bounds how long a write made by another worker goes
+    unseen when no notification tells this one.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._ids: Optional[frozenset[uuid.UUID]] = None
+        self._loaded_at = 0.0
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, session: Session) -> frozenset[uuid.UUID]:
+        with self._lock:
+            ids, version = self._ids, self._version
+            if ids is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return ids
+        started = time.monotonic()
+        ids = frozenset(session.exec(select(Company.id).where(Company.is_demo)).all())
+        with self._lock:
+            if version == self._version:
+                self._ids, self._loaded_at = ids, started
+        return ids
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._ids = None
+
+
+demo_company_ids = DemoCompanyIds(settings.DEMO_COMPANY_IDS_TTL_SECONDS)
+
+
+def mark_stale(session: Session) -> None:
+    """
+    Drop the ids after `session` wrote a company, now and again when the transaction
+    ends (see template_cache.mark_stale).
+    """
+    demo_company_ids.invalidate()
+    session.info[_STALE_KEY] = True
+    if settings.TEMPLATE_CACHE_NOTIFY and session.get_bind().dialect.name == "postgresql":
+        session.execute(text("SELECT pg_notify(:channel, '')"), {"channel": NOTIFY_CHANNEL})
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_at_transaction_end(session: Session) -> None:
+    if session.info.pop(_STALE_KEY, False):
+        demo_company_ids.invalidate()
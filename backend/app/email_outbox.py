@@ -0,0 +1,209 @@
+import argparse
+import contextvars
+import logging
+import queue
+import random
+import smtplib
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Optional
+
+from prometheus_client import start_http_server
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import track_job
+from app.core.tracing import setup_tracing, traced
+from app.models import EmailOutbox
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Idle connections older than this are checked with NOOP before reuse
+_STALE_AFTER_SECONDS = 30.0
+
+
+def connect_smtp() -> smtplib.SMTP:
+    if settings.SMTP_SSL and not settings.SMTP_TLS:
+        smtp: smtplib.SMTP = smtplib.SMTP_SSL(settings.SMTP_HOST or "", settings.SMTP_PORT, timeout=30)
+    else:
+        smtp = smtplib.SMTP(settings.SMTP_HOST or "", settings.SMTP_PORT, timeout=30)
+        if settings.SMTP_TLS:
+            smtp.starttls()
+    if settings.SMTP_USER:
+        smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD or "")
+    return smtp
+
+
+class SMTPPool:
+    """
+    SMTP connections kept open between messages and batches, one per sending thread.
+    A connection that errors is dropped; the next checkout opens a fresh one.
+    """
+
+    def __init__(self, size: int, connect: Callable[[], smtplib.SMTP] = connect_smtp) -> None:
+        self.size = size
+        self._connect = connect
+        self._idle: queue.LifoQueue[tuple[smtplib.SMTP, float]] = queue.LifoQueue()
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                smtp, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - idle_since < _STALE_AFTER_SECONDS:
+                return smtp
+            try:
+                if smtp.noop()[0] == 250:
+                    return smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            _close(smtp)
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        smtp = self._checkout()
+        try:
+            yield smtp
+        except (smtplib.SMTPServerDisconnected, OSError):
+            _close(smtp)
+            raise
+        except smtplib.SMTPException:
+            # The server refused this message but the session is still usable
+            self._idle.put((smtp, time.monotonic()))
+            raise
+        else:
+            self._idle.put((smtp, time.monotonic()))
+
+    def close(self) -> None:
+        while True:
+            try:
+                smtp, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                _close(smtp)
+
+
+def _close(smtp: smtplib.SMTP) -> None:
+    try:
+        smtp.close()
+    except OSError:
+        pass
+
+
+def build_message(message: EmailOutbox) -> EmailMessage:
+    email = EmailMessage()
+    email["From"] = formataddr((settings.EMAILS_FROM_NAME or "", settings.EMAILS_FROM_EMAIL or ""))
+    email["To"] = message.email_to
+    email["Subject"] = message.subject
+    email.set_content(message.html_content, subtype="html")
+    return email
+
+
+def is_permanent(error: Exception) -> bool:
+    """5xx replies (bad address, rejected content) will fail again; anything else may not."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter, so messages failed together do not retry together."""
+    delay = min(settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.EMAIL_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(1.0, 1.1))
+
+
+class OutboxSender:
+    """Sends a batch concurrently, one thread per pooled connection."""
+
+    def __init__(self, pool: SMTPPool) -> None:
+        self.pool = pool
+        self._executor = ThreadPoolExecutor(pool.size, thread_name_prefix="smtp")
+
+    @traced(name="smtp.send")
+    def _send(self, email: EmailMessage) -> Optional[Exception]:
+        try:
+            with self.pool.connection() as smtp:
+                smtp.send_message(email)
+        except (smtplib.SMTPException, OSError) as e:
+            return e
+        return None
+
+    def send_all(self, emails: list[EmailMessage]) -> list[Optional[Exception]]:
+        # Each send runs under the caller's trace context
+        context = contextvars.copy_context()
+        return list(self._executor.map(lambda email: context.copy().run(self._send, email), emails))
+
+    def close(self) -> None:
+        self._executor.shutdown()
+        self.pool.close()
+
+
+@traced(name="job.email_outbox")
+def run_batch(session: Session, sender: OutboxSender, *, now: Optional[datetime] = None) -> int:
+    """Send one batch of due messages and record the outcomes. Returns how many were claimed."""
+    now = now or datetime.utcnow()
+    messages = crud.email_outbox.claim_due(session=session, now=now, limit=settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not messages:
+        session.rollback()
+        return 0
+    errors = sender.send_all([build_message(message) for message in messages])
+    for message, error in zip(messages, errors, strict=True):
+        if error is None:
+            crud.email_outbox.mark_sent(session=session, message=message, now=now)
+            continue
+        logger.warning(f"Sending email {message.id} failed: {error!r}")
+        attempts = message.attempts + 1
+        give_up = is_permanent(error) or attempts >= settings.EMAIL_MAX_ATTEMPTS
+        crud.email_outbox.mark_failed(
+            session=session,
+            message=message,
+            error=repr(error),
+            retry_at=None if give_up else now + retry_delay(attempts),
+        )
+    session.commit()
+    return len(messages)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Send queued emails.")
+    parser.add_argument("--once", action="store_true", help="Send what is due and exit instead of polling.")
+    args = parser.parse_args()
+    if not settings.emails_enabled:
+        logger.warning("Emails are disabled (SMTP_HOST or EMAILS_FROM_EMAIL unset), nothing to send")
+        return
+
+    setup_tracing("email-worker")
+    if settings.EMAIL_WORKER_METRICS_PORT:
+        start_http_server(settings.EMAIL_WORKER_METRICS_PORT)
+    sender = OutboxSender(SMTPPool(settings.EMAIL_SMTP_POOL_SIZE))
+    try:
+        while True:
+            with Session(engine) as session, track_job("email_outbox") as job:
+                claimed = job.items = run_batch(session, sender)
+            if claimed:
+                logger.info(f"Processed {claimed} emails")
+            if args.once and claimed < settings.EMAIL_OUTBOX_BATCH_SIZE:
+                return
+            # A full batch means more may be waiting, so go again right away
+            if claimed < settings.EMAIL_OUTBOX_BATCH_SIZE:
+                time.sleep(settings.EMAIL_OUTBOX_POLL_SECONDS)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sender.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,25 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
+from app.api.content_negotiation import MessagePackMiddleware
 from app.api.main import api_router
+from app.api.profiling import ProfilingMiddleware
+from app.api.serialization import NegotiatedFastJSONResponse, NegotiatedJSONResponse
+from app.core import slow_queries
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.images import get_thumbnails
+from app.core.memory import MemoryMiddleware
+from app.core.metrics import MetricsMiddleware, mark_process_dead, metrics_endpoint
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.tracing import TracingMiddleware, setup_tracing, shutdown_tracing, tracing_enabled
+from app.template_cache import start_invalidation_listener
+from app.utils import load_email_templates
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -14,10 +29,27 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+setup_tracing("backend")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    stop_listener = start_invalidation_listener() if settings.TEMPLATE_CACHE_NOTIFY else None
+    load_email_templates()
+    yield
+    if stop_listener:
+        stop_listener.set()
+    get_thumbnails().shutdown()
+    mark_process_dead()
+    shutdown_tracing()
+    slow_queries.shutdown()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
+    default_response_class=NegotiatedFastJSONResponse if settings.FAST_JSON_RESPONSES else NegotiatedJSONResponse,
 )
 
 # Set all CORS enabled origins
@@ -30,4 +62,34 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+app.add_middleware(MessagePackMiddleware)
+
+# Only measures anything while tracemalloc is tracing
+app.add_middleware(MemoryMiddleware)
+
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+if settings.QUERY_STATS_ENABLED:
+    app.add_middleware(QueryStatsMiddleware)
+
+# Wraps everything but metrics so it compresses the final body
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        thread_threshold=settings.COMPRESSION_THREAD_THRESHOLD,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+    )
+
+# Added last so request latency includes every other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+if tracing_enabled():
+    app.add_middleware(TracingMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
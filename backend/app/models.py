@@ -1,10 +1,10 @@
 import enum
 import uuid
 from datetime import datetime, date
-from typing import List, Optional, Any
+from typing import List, Literal, Optional, Any
 
 import sqlalchemy as sa
-from pydantic import model_validator
+from pydantic import SerializationInfo, field_serializer, model_validator
 from sqlalchemy.dialects import postgresql
 from sqlmodel import Field, Relationship, SQLModel
 
@@ -46,6 +46,20 @@ class AuditResponseStatus(str, enum.Enum):
     SUBMITTED = "SUBMITTED"
 
 
+class SyncEntityType(str, enum.Enum):
+    ASSIGNMENT = "assignment"
+    QUESTION = "question"
+    RESPONSE = "response"
+    # Deleting an area (or the caller's link to it) drops every assignment in it
+    AREA = "area"
+
+
+class EmailStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    SENT = "SENT"
+    FAILED = "FAILED"
+
+
 # Generic and auth-related API Schemas
 # Placed at top to avoid circular import issues
 class Message(SQLModel):
@@ -283,6 +297,10 @@ class AuditAssignment(AuditAssignmentBase, table=True):
     company_id: uuid.UUID = Field(foreign_key="company.id")
     area_id: Optional[uuid.UUID] = Field(default=None, foreign_key="area.id")
     created_by_id: uuid.UUID = Field(foreign_key="user.id")
+    # Set on occurrences materialized from a recurring assignment
+    recurrence_source_id: Optional[uuid.UUID] = Field(
+        default=None, foreign_key="audit_assignment.id", index=True
+    )
     created_at: datetime = Field(
         default_factory=datetime.utcnow,
         nullable=False,
@@ -305,6 +323,15 @@ class AuditAssignment(AuditAssignmentBase, table=True):
         back_populates="audit_assignment", sa_relationship_kwargs={"cascade": "all, delete-orphan"}
     )
 
+    __table_args__ = (
+        sa.UniqueConstraint(
+            "recurrence_source_id", "due_date", name="uq_audit_assignment_recurrence_occurrence"
+        ),
+        sa.Index("ix_audit_assignment_next_due_date", "next_due_date"),
+        # Delta sync range scans (see crud/sync.py)
+        sa.Index("ix_audit_assignment_company_id_updated_at", "company_id", "updated_at"),
+    )
+
 
 # Base model for shared AssignedQuestion fields
 class AssignedQuestionBase(SQLModel):
@@ -340,6 +367,8 @@ class AssignedQuestion(AssignedQuestionBase, table=True):
     original_question_template: Optional["QuestionTemplate"] = Relationship()
     answers: List["Answer"] = Relationship(back_populates="assigned_question")
 
+    __table_args__ = (sa.Index("ix_assigned_question_updated_at", "updated_at"),)
+
 
 # Base model for shared AuditResponse fields
 class AuditResponseBase(SQLModel):
@@ -358,6 +387,11 @@ class AuditResponse(AuditResponseBase, table=True):
     audit_assignment_id: uuid.UUID = Field(foreign_key="audit_assignment.id")
     auditor_id: uuid.UUID = Field(foreign_key="user.id")
     submission_date: Optional[datetime] = Field(default=None)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"server_default": sa.func.now(), "onupdate": sa.func.now()},
+    )
 
     audit_assignment: "AuditAssignment" = Relationship(back_populates="audit_responses")
     auditor: "User" = Relationship(back_populates="audit_responses")
@@ -392,6 +426,114 @@ class Answer(AnswerBase, table=True):
     audit_response: "AuditResponse" = Relationship(back_populates="answers")
     assigned_question: "AssignedQuestion" = Relationship(back_populates="answers")
 
+    __table_args__ = (sa.Index("ix_answer_updated_at", "updated_at"),)
+
+
+# Outcome of a request made under an Idempotency-Key, replayed to retries until it expires
+class IdempotencyKey(SQLModel, table=True):
+    __tablename__ = "idempotency_key"
+    user_id: uuid.UUID = Field(primary_key=True)
+    key: str = Field(primary_key=True, max_length=255)
+    request_hash: str = Field(max_length=64)
+    status_code: Optional[int] = Field(default=None)
+    # None while the first request is still running
+    response_body: Optional[bytes] = Field(default=None, sa_column=sa.Column(sa.LargeBinary, nullable=True))
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"server_default": sa.func.now()},
+    )
+    expires_at: datetime = Field(index=True)
+
+
+# Deletion log for delta sync: one row per deleted (or no longer visible) object
+class SyncTombstone(SQLModel, table=True):
+    __tablename__ = "sync_tombstone"
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    entity_type: str = Field(max_length=32)  # SyncEntityType value
+    entity_id: uuid.UUID
+    company_id: uuid.UUID
+    # Who may see the tombstone: area-bound rows only reach that area's auditors and
+    # user-bound rows (a removed area link) only that user
+    area_id: Optional[uuid.UUID] = Field(default=None)
+    user_id: Optional[uuid.UUID] = Field(default=None)
+    deleted_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"server_default": sa.func.now()},
+    )
+
+    __table_args__ = (sa.Index("ix_sync_tombstone_company_id_deleted_at", "company_id", "deleted_at"),)
+
+
+# A rendered email waiting for app/email_outbox.py to send it
+class EmailOutbox(SQLModel, table=True):
+    __tablename__ = "email_outbox"
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    email_to: str = Field(max_length=255)
+    subject: str
+    html_content: str
+    status: EmailStatus = Field(default=EmailStatus.PENDING, sa_column=sa.Column(sa.Enum(EmailStatus), nullable=False))
+    attempts: int = Field(default=0)
+    last_error: Optional[str] = Field(default=None)
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"server_default": sa.func.now()},
+    )
+    # Retries back off by pushing this forward
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    sent_at: Optional[datetime] = Field(default=None)
+    # Set by jobs that must not queue the same email twice, e.g. on a rerun
+    dedupe_key: Optional[str] = Field(default=None, max_length=255, unique=True, index=True)
+
+    __table_args__ = (sa.Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),)
+
+
+# A stored photo blob, keyed by the SHA-256 of its content (see app/core/storage.py)
+class Photo(SQLModel, table=True):
+    sha256: str = Field(primary_key=True, max_length=64)
+    size: int
+    content_type: str = Field(max_length=64)
+    # Answers and responses whose photo_urls point here; kept by app/crud/photo.py
+    ref_count: int = Field(default=0)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"server_default": sa.func.now(), "onupdate": sa.func.now()},
+    )
+
+    __table_args__ = (sa.Index("ix_photo_ref_count_updated_at", "ref_count", "updated_at"),)
+
+
+# How many responses and answers of an assignment refer to a photo; reading a photo
+# needs access to one of them (see crud.photo.can_read). Kept by app/crud/photo.py.
+# No foreign key: a row left behind by a deleted assignment grants nothing.
+class PhotoReference(SQLModel, table=True):
+    __tablename__ = "photo_reference"
+    sha256: str = Field(primary_key=True, max_length=64)
+    audit_assignment_id: uuid.UUID = Field(primary_key=True)
+    ref_count: int = Field(default=0)
+
+
+# A resumable photo upload; the bytes received so far are staged on disk
+class PhotoUpload(SQLModel, table=True):
+    __tablename__ = "photo_upload"
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="user.id")
+    length: int
+    offset: int = Field(default=0)
+    content_type: str = Field(max_length=64)
+    # Declared by the client up front (verified on completion), set by the server once complete
+    sha256: Optional[str] = Field(default=None, max_length=64)
+    completed: bool = Field(default=False)
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"server_default": sa.func.now()},
+    )
+    expires_at: datetime = Field(index=True)
+
 
 
 
@@ -418,10 +560,28 @@ class UserUpdate(SQLModel):
     company_id: Optional[uuid.UUID] = None
 
 
+DEMO_HIDDEN_EMAIL = "hidden"
+DEMO_HIDDEN_FULL_NAME = "Demo User"
+
+
+def _is_demo_identity_hidden(company_id: Optional[uuid.UUID], info: SerializationInfo) -> bool:
+    # Set per request by deps.get_demo_context, only for viewers who are not admins
+    demo_company_ids = (info.context or {}).get("demo_company_ids")
+    return bool(demo_company_ids) and company_id in demo_company_ids
+
+
 class UserPublic(UserBase):
     id: uuid.UUID
     created_at: datetime
 
+    @field_serializer("email")
+    def _serialize_email(self, email: str, info: SerializationInfo) -> str:
+        return DEMO_HIDDEN_EMAIL if _is_demo_identity_hidden(self.company_id, info) else email
+
+    @field_serializer("full_name")
+    def _serialize_full_name(self, full_name: Optional[str], info: SerializationInfo) -> Optional[str]:
+        return DEMO_HIDDEN_FULL_NAME if _is_demo_identity_hidden(self.company_id, info) else full_name
+
 
 class UsersPublic(SQLModel):
     data: List[UserPublic]
@@ -551,6 +711,7 @@ class AuditAssignmentPublic(AuditAssignmentBase):
     company_id: uuid.UUID
     area_id: Optional[uuid.UUID] = None
     created_by_id: uuid.UUID
+    recurrence_source_id: Optional[uuid.UUID] = None
     created_at: datetime
     updated_at: datetime
     audit_template: Optional[AuditTemplatePublic] = None
@@ -562,6 +723,17 @@ class AuditAssignmentsPublic(SQLModel):
     count: int
 
 
+class AuditCalendarEntry(SQLModel):
+    due_on: date
+    assignment_id: uuid.UUID
+    title: str
+    company_id: uuid.UUID
+    area_id: Optional[uuid.UUID] = None
+    status: Optional[AuditAssignmentStatus] = None
+    # False for occurrences projected from a recurring assignment (assignment_id is the series)
+    is_materialized: bool
+
+
 # AssignedQuestion models
 class AssignedQuestionCreate(AssignedQuestionBase):
     audit_assignment_id: uuid.UUID
@@ -604,6 +776,11 @@ class AuditResponseCreate(AuditResponseBase):
     answers: Optional[List[AnswerCreate]] = []
 
 
+# A complete response recorded offline, submitted in one request under an Idempotency-Key
+class AuditResponseSubmit(AuditResponseBase):
+    answers: List[AnswerCreate] = []
+
+
 class AuditResponseUpdate(SQLModel):
     overall_comments: Optional[str] = None
     photo_urls: Optional[List[str]] = None
@@ -624,6 +801,69 @@ class AuditResponsesPublic(SQLModel):
     count: int
 
 
+# Delta sync models
+class SyncChange(SQLModel):
+    op: Literal["upsert", "delete"]
+    type: SyncEntityType
+    id: uuid.UUID
+    # Flat row for upserts: assignments without their nested template and questions,
+    # which arrive as their own changes; None for deletes
+    data: Optional[dict[str, Any]] = None
+
+
+class SyncPublic(SQLModel):
+    # Pass back as `since` on the next sync
+    token: str
+    # The token was too old (or missing): drop local data and apply `changes` as a snapshot
+    reset: bool = False
+    # Deletes first, then upserts; applying them in order always converges
+    changes: List[SyncChange] = []
+
+
+# Photo upload models
+class PhotoUploadCreate(SQLModel):
+    length: int = Field(gt=0)
+    content_type: str
+    # Hex SHA-256 of the whole file; lets the server skip uploads it already stores
+    sha256: Optional[str] = Field(default=None, regex=r"^[0-9a-f]{64}$")
+
+
+class PhotoUploadPublic(SQLModel):
+    id: uuid.UUID
+    length: int
+    offset: int
+    content_type: str
+    expires_at: datetime
+    completed: bool
+    sha256: Optional[str] = None
+    # What to put in photo_urls once the upload is complete
+    photo_url: Optional[str] = None
+
+
+# Batch request models
+class BatchRequestItem(SQLModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    # Relative to the API prefix, e.g. "/audit-assignments/{id}?limit=10"
+    path: str = Field(regex=r"^/(?!/)")
+    body: Optional[Any] = None
+    # Per-request headers such as If-None-Match or Idempotency-Key
+    headers: dict[str, str] = {}
+
+
+class BatchRequest(SQLModel):
+    requests: List[BatchRequestItem] = Field(min_length=1)
+
+
+class BatchResponseItem(SQLModel):
+    status: int
+    headers: dict[str, str] = {}
+    body: Optional[Any] = None
+
+
+class BatchResponse(SQLModel):
+    responses: List[BatchResponseItem]
+
+
 # Update forward references to resolve circular dependencies
 AuditTemplatePublic.model_rebuild()
 AuditAssignmentPublic.model_rebuild()
@@ -0,0 +1,57 @@
+import logging
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.core.images import get_thumbnails
+from app.core.metrics import track_job
+from app.core.storage import get_storage
+from app.core.tracing import setup_tracing, traced
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@traced(name="job.purge_expired")
+def purge() -> None:
+    """
+    Drop sync tombstones past their retention window, expired idempotency keys and photo
+    uploads, photos nothing has referred to for PHOTO_GC_GRACE_HOURS and old outbox mail.
+    """
+    now = datetime.utcnow()
+    tombstones_before = now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    photos_before = now - timedelta(hours=settings.PHOTO_GC_GRACE_HOURS)
+    emails_before = now - timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)
+    storage = get_storage()
+    with track_job("purge_expired") as job:
+        with Session(engine) as session:
+            tombstones = crud.sync.purge_tombstones(session=session, before=tombstones_before)
+            keys = crud.idempotency_key.purge_expired(session=session, now=now)
+            upload_ids = crud.photo.purge_expired_uploads(session=session, now=now)
+            digests = crud.photo.purge_unreferenced(session=session, before=photos_before)
+            emails = crud.email_outbox.purge_finished(session=session, before=emails_before)
+            session.commit()
+        # Files go only once the rows are gone for good
+        for upload_id in upload_ids:
+            (storage.staging_dir / str(upload_id)).unlink(missing_ok=True)
+        thumbnails = get_thumbnails()
+        for digest in digests:
+            storage.delete(digest)
+            thumbnails.delete(digest)
+        job.items = tombstones + keys + len(upload_ids) + len(digests) + emails
+    logger.info(f"Purged {tombstones} sync tombstones older than {tombstones_before:%Y-%m-%d %H:%M}")
+    logger.info(f"Purged {keys} expired idempotency keys")
+    logger.info(f"Purged {len(upload_ids)} expired photo uploads and {len(digests)} unreferenced photos")
+    logger.info(f"Purged {emails} sent or failed emails")
+
+
+def main() -> None:
+    setup_tracing("purge-expired")
+    purge()
+
+
+if __name__ == "__main__":
+    main()
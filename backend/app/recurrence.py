@@ -0,0 +1,69 @@
+import calendar
+from collections.abc import Iterator
+from datetime import date, timedelta
+from typing import Optional
+
+from app.models import AuditPeriodicity
+
+RECURRING_PERIODICITIES = frozenset(
+    {
+        AuditPeriodicity.DAILY,
+        AuditPeriodicity.WEEKLY,
+        AuditPeriodicity.MONTHLY,
+        AuditPeriodicity.QUARTERLY,
+        AuditPeriodicity.ANNUALLY,
+    }
+)
+
+_DAY_STEPS = {
+    AuditPeriodicity.DAILY: 1,
+    AuditPeriodicity.WEEKLY: 7,
+}
+
+_MONTH_STEPS = {
+    AuditPeriodicity.MONTHLY: 1,
+    AuditPeriodicity.QUARTERLY: 3,
+    AuditPeriodicity.ANNUALLY: 12,
+}
+
+
+def is_recurring(periodicity: Optional[AuditPeriodicity]) -> bool:
+    return periodicity in RECURRING_PERIODICITIES
+
+
+def add_months(value: date, months: int) -> date:
+    """Add calendar months, clamping to the last day of shorter months (Jan 31 -> Feb 28/29)."""
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
+
+
+def advance_due_date(due: date, periodicity: AuditPeriodicity) -> date:
+    """Return the occurrence that follows `due` for the given periodicity."""
+    if periodicity in _DAY_STEPS:
+        return due + timedelta(days=_DAY_STEPS[periodicity])
+    if periodicity in _MONTH_STEPS:
+        return add_months(due, _MONTH_STEPS[periodicity])
+    raise ValueError(f"Periodicity '{periodicity}' does not recur")
+
+
+def iter_occurrences(
+    start: date, periodicity: AuditPeriodicity, *, window_from: date, window_to: date
+) -> Iterator[date]:
+    """
+    Lazily yield the occurrences of a series starting at `start` that fall in
+    [window_from, window_to], stepping exactly like the materializer does.
+    """
+    current = start
+    if current < window_from and periodicity in _DAY_STEPS:
+        # Fixed-length steps can jump straight to the window
+        step = _DAY_STEPS[periodicity]
+        skipped = (window_from - current).days // step
+        current += timedelta(days=skipped * step)
+    while current < window_from:
+        current = advance_due_date(current, periodicity)
+    while current <= window_to:
+        yield current
+        current = advance_due_date(current, periodicity)
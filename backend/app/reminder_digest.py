@@ -0,0 +1,163 @@
+import argparse
+import logging
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import date, timedelta
+from itertools import groupby
+from operator import attrgetter
+from typing import Any
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import track_job
+from app.core.sql import try_advisory_xact_lock
+from app.core.tracing import setup_tracing, traced
+from app.utils import render_email_template
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Every host running the job must agree on the key, so derive it from a fixed tag
+REMINDER_LOCK_KEY = int.from_bytes(b"auditrem", "big")
+
+
+@dataclass
+class DigestItem:
+    assignment_id: Any
+    title: str
+    due_on: date
+
+
+@dataclass
+class DigestRunStats:
+    users: int = 0
+    assignments: int = 0
+    emails: int = 0
+    # Auditors whose digest for the day an earlier run already queued
+    already_queued: int = 0
+    query_seconds: float = 0.0
+    render_seconds: float = 0.0
+    enqueue_seconds: float = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.emails} digests for {self.users} users covering {self.assignments} assignments, "
+            f"{self.already_queued} already queued "
+            f"(query {self.query_seconds:.2f}s, render {self.render_seconds:.2f}s, "
+            f"enqueue {self.enqueue_seconds:.2f}s)"
+        )
+
+
+def dedupe_key(as_of: date, user_id: Any) -> str:
+    """One digest per auditor per reminder day, however often the job runs that day."""
+    return f"reminder_digest:{as_of.isoformat()}:{user_id}"
+
+
+def _due_on(row: Any, window_from: date, window_to: date) -> date:
+    """The earliest due date of the row inside the window; a series may match on either column."""
+    candidates = []
+    if row.due_date is not None and window_from <= row.due_date.date() <= window_to:
+        candidates.append(row.due_date.date())
+    if row.next_due_date is not None and window_from <= row.next_due_date <= window_to:
+        candidates.append(row.next_due_date)
+    return min(candidates)
+
+
+def iter_digests(rows: Iterable[Any], *, window_from: date, window_to: date) -> Iterator[tuple[Any, list[DigestItem]]]:
+    """Group rows ordered by user into (first row, items sorted by due date), one pass, no buffering across users."""
+    for _, user_rows in groupby(rows, key=attrgetter("user_id")):
+        items = []
+        first = None
+        for row in user_rows:
+            first = first or row
+            items.append(DigestItem(assignment_id=row.id, title=row.title, due_on=_due_on(row, window_from, window_to)))
+        items.sort(key=lambda item: (item.due_on, item.title))
+        yield first, items
+
+
+@traced(name="job.reminder_digest")
+def run(session: Session, *, as_of: date, days_ahead: int, dry_run: bool = False) -> DigestRunStats:
+    """
+    Queue one reminder digest per auditor with assignments due from `as_of` through
+    `days_ahead` days later. Auditors whose digest for `as_of` is already in the outbox
+    are skipped, so rerunning the job on the same day sends nothing twice.
+    """
+    stats = DigestRunStats()
+    if not dry_run and not try_advisory_xact_lock(session, REMINDER_LOCK_KEY):
+        logger.info("Another reminder run holds the lock, skipping")
+        return stats
+    window_to = as_of + timedelta(days=days_ahead)
+    subject = f"{settings.PROJECT_NAME} - Upcoming audit assignments"
+
+    messages: list[tuple[str, str, str]] = []
+    keys: list[str] = []
+    started = time.perf_counter()
+    queued = crud.email_outbox.queued_dedupe_keys(session=session, prefix=dedupe_key(as_of, ""))
+    rows = crud.audit_assignment.iter_upcoming_for_auditors(session=session, window_from=as_of, window_to=window_to)
+    for user, items in iter_digests(rows, window_from=as_of, window_to=window_to):
+        key = dedupe_key(as_of, user.user_id)
+        if key in queued:
+            stats.already_queued += 1
+            continue
+        render_started = time.perf_counter()
+        html_content = render_email_template(
+            template_name="reminder_digest.html",
+            context={
+                "project_name": settings.PROJECT_NAME,
+                "name": user.full_name or user.email,
+                "assignments": items,
+                "days_ahead": days_ahead,
+                "link": settings.FRONTEND_HOST,
+            },
+        )
+        stats.render_seconds += time.perf_counter() - render_started
+        messages.append((user.email, subject, html_content))
+        keys.append(key)
+        stats.users += 1
+        stats.assignments += len(items)
+    # Rows are streamed, so the query time is what rendering did not account for
+    stats.query_seconds = time.perf_counter() - started - stats.render_seconds
+
+    stats.emails = len(messages)
+    if dry_run:
+        session.rollback()
+        return stats
+    started = time.perf_counter()
+    crud.email_outbox.enqueue_many(session=session, messages=messages, dedupe_keys=keys)
+    session.commit()
+    stats.enqueue_seconds = time.perf_counter() - started
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Queue due-date reminder digests for auditors.")
+    parser.add_argument(
+        "--as-of",
+        type=date.fromisoformat,
+        default=None,
+        help="First day of the reminder window (YYYY-MM-DD). Defaults to today.",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=settings.REMINDER_DIGEST_DAYS_AHEAD,
+        help="How many days past --as-of to look ahead.",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Build and render the digests without queueing them.")
+    args = parser.parse_args()
+    as_of = args.as_of or date.today()
+    setup_tracing("reminder-digest")
+
+    logger.info(f"Building reminder digests for {as_of} to {as_of + timedelta(days=args.days)}")
+    with Session(engine) as session, track_job("reminder_digest") as job:
+        stats = run(session, as_of=as_of, days_ahead=args.days, dry_run=args.dry_run)
+        job.items = stats.emails
+    logger.info(f"{'Dry run: ' if args.dry_run else ''}{stats}")
+
+
+if __name__ == "__main__":
+    main()
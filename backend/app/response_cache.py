@@ -0,0 +1,295 @@
+import hashlib
+import logging
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from collections.abc import Iterable
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+_STALE_KEY = "stale_response_cache_tags"
+# Tag sets in Redis must outlive every entry they point to
+_TAG_TTL = 24 * 60 * 60
+
+
+def tag(kind: str, value: Any = None) -> str:
+    """Invalidation tag, e.g. tag("company", company_id) or tag("assignments") for a whole kind."""
+    return kind if value is None else f"{kind}:{value}"
+
+
+class CacheBackendError(Exception):
+    pass
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]: ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, *, ttl: int, tags: Iterable[str]) -> None: ...
+
+    @abstractmethod
+    def invalidate_tags(self, tags: Iterable[str]) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU with expiry and a tag -> keys index."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, bytes, frozenset[str]]] = OrderedDict()
+        self._tags: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, *, ttl: int, tags: Iterable[str]) -> None:
+        with self._lock:
+            self._drop(key)
+            entry_tags = frozenset(tags)
+            self._entries[key] = (time.monotonic() + ttl, value, entry_tags)
+            for entry_tag in entry_tags:
+                self._tags.setdefault(entry_tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for entry_tag in tags:
+                for key in self._tags.pop(entry_tag, set()):
+                    self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for entry_tag in entry[2]:
+            keys = self._tags.get(entry_tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[entry_tag]
+
+
+class RedisBackend(CacheBackend):
+    """
+    Shared cache speaking the Redis protocol (RESP) directly, so any Redis-compatible
+    server works without a client library. Each thread keeps its own connection and
+    every operation is sent as a single pipeline.
+    """
+
+    def __init__(self, url: str, *, prefix: str = "rc:", timeout: float = 0.5) -> None:
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def get(self, key: str) -> Optional[bytes]:
+        (value,) = self._pipeline([b"GET", self._key(key)])
+        return value
+
+    def set(self, key: str, value: bytes, *, ttl: int, tags: Iterable[str]) -> None:
+        entry_key = self._key(key)
+        commands: list[list[Any]] = [[b"SET", entry_key, value, b"EX", ttl]]
+        for entry_tag in tags:
+            commands.append([b"SADD", self._tag_key(entry_tag), entry_key])
+            commands.append([b"EXPIRE", self._tag_key(entry_tag), _TAG_TTL])
+        self._pipeline(*commands)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        tag_keys = [self._tag_key(entry_tag) for entry_tag in tags]
+        if not tag_keys:
+            return
+        members = self._pipeline(*([b"SMEMBERS", tag_key] for tag_key in tag_keys))
+        keys = {key for keys in members for key in keys}
+        self._pipeline([b"DEL", *keys, *tag_keys])
+
+    def clear(self) -> None:
+        cursor = b"0"
+        while True:
+            ((cursor, keys),) = self._pipeline(
+                [b"SCAN", cursor, b"MATCH", f"{self.prefix}*", b"COUNT", 1000]
+            )
+            if keys:
+                self._pipeline([b"DEL", *keys])
+            if cursor == b"0":
+                return
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _tag_key(self, entry_tag: str) -> str:
+        return f"{self.prefix}tag:{entry_tag}"
+
+    def _connect(self) -> tuple[socket.socket, Any]:
+        conn = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        stream = conn.makefile("rb")
+        self._local.conn, self._local.stream = conn, stream
+        setup = []
+        if self.password:
+            setup.append([b"AUTH", self.password])
+        if self.db:
+            setup.append([b"SELECT", self.db])
+        if setup:
+            self._pipeline(*setup)
+        return conn, stream
+
+    def _pipeline(self, *commands: list[Any]) -> list[Any]:
+        conn = getattr(self._local, "conn", None)
+        try:
+            if conn is None:
+                conn, _ = self._connect()
+            conn.sendall(b"".join(_encode(command) for command in commands))
+            replies = [_read_reply(self._local.stream) for _ in commands]
+        except OSError as e:
+            self._local.conn = None
+            if conn is not None:
+                conn.close()
+            raise CacheBackendError(str(e)) from e
+        for reply in replies:
+            if isinstance(reply, CacheBackendError):
+                raise reply
+        return replies
+
+
+def _encode(command: list[Any]) -> bytes:
+    parts = [b"*%d\r\n" % len(command)]
+    for arg in command:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+def _read_reply(stream: Any) -> Any:
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("Connection closed by cache server")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload
+    if kind == b"-":
+        return CacheBackendError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(payload)
+        return None if length < 0 else [_read_reply(stream) for _ in range(length)]
+    raise ConnectionError(f"Unexpected reply from cache server: {line!r}")
+
+
+class ResponseCache:
+    """
+    Caches serialized list responses keyed by route, normalized query and the caller's
+    access scope. Backend failures are logged and treated as misses.
+    """
+
+    def __init__(self, backend: CacheBackend, ttls: dict[str, int]) -> None:
+        self.backend = backend
+        self.ttls = ttls
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+
+    def key(self, route: str, request: Request, *scope: Any) -> str:
+        query = sorted(request.query_params.multi_items())
+        digest = hashlib.blake2b(repr((query, scope)).encode(), digest_size=16).hexdigest()
+        return f"{route}:{digest}"
+
+    def get(self, route: str, key: str) -> Optional[bytes]:
+        try:
+            value = self.backend.get(key)
+        except CacheBackendError:
+            logger.warning("Response cache unavailable, serving %s uncached", route, exc_info=True)
+            value = None
+        if value is None:
+            self.misses[route] += 1
+        else:
+            self.hits[route] += 1
+        record_cache_lookup("response", route, value is not None)
+        return value
+
+    def set(self, route: str, key: str, value: bytes, *, tags: Iterable[str]) -> None:
+        ttl = self.ttls.get(route, 0)
+        if ttl <= 0:
+            return
+        try:
+            self.backend.set(key, value, ttl=min(ttl, _TAG_TTL), tags=tags)
+        except CacheBackendError:
+            logger.warning("Response cache unavailable, not caching %s", route, exc_info=True)
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        try:
+            self.backend.invalidate_tags(tags)
+        except CacheBackendError:
+            logger.warning("Response cache unavailable, could not invalidate %s", tags, exc_info=True)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        result = {}
+        for route in sorted(set(self.hits) | set(self.misses)):
+            hits, misses = self.hits[route], self.misses[route]
+            result[route] = {"hits": hits, "misses": misses, "hit_ratio": hits / (hits + misses)}
+        return result
+
+
+def _make_backend() -> CacheBackend:
+    if settings.RESPONSE_CACHE_URL:
+        return RedisBackend(settings.RESPONSE_CACHE_URL)
+    return MemoryBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+response_cache = ResponseCache(_make_backend(), settings.RESPONSE_CACHE_TTLS)
+
+
+def mark_stale(session: Session, *tags: str) -> None:
+    """
+    Invalidate cached responses carrying any of `tags` after a write in `session`, now
+    and again when the transaction ends (see template_cache.mark_stale).
+    """
+    response_cache.invalidate(tags)
+    session.info.setdefault(_STALE_KEY, set()).update(tags)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_at_transaction_end(session: Session) -> None:
+    tags = session.info.pop(_STALE_KEY, None)
+    if tags:
+        response_cache.invalidate(tags)
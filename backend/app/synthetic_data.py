@@ -0,0 +1,375 @@
+import argparse
+import json
+import logging
+import random
+import time
+import uuid
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, fields, replace
+from datetime import date, datetime, timedelta
+from typing import Any, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, SQLModel
+
+from app.audit_types import get_audit_type_definition
+from app.core.db import engine
+from app.core.security import get_password_hash
+from app.models import (
+    AuditAssignmentStatus,
+    AuditPeriodicity,
+    AuditResponseStatus,
+    QuestionType,
+    UserRole,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Every generated user can log in with this password
+SYNTHETIC_PASSWORD = "synthetic-password"
+SYNTHETIC_EMAIL_DOMAIN = "synthetic.example.com"
+
+# Columns written per table, in COPY order. Everything is given explicitly so rows do
+# not depend on server defaults.
+COLUMNS: dict[str, tuple[str, ...]] = {
+    "company": ("id", "name", "details", "is_demo", "created_at", "updated_at"),
+    "area": ("id", "company_id", "name", "description", "created_at", "updated_at"),
+    "user": (
+        "id", "email", "is_active", "is_superuser", "full_name", "role", "is_verified",
+        "company_id", "hashed_password", "created_at", "updated_at",
+    ),
+    "user_area_assignment_link": ("user_id", "area_id", "assigned_at"),
+    "audit_template": (
+        "id", "name", "description", "audit_type_definition_key", "created_by_id", "created_at", "updated_at",
+    ),
+    "question_template": (
+        "id", "audit_template_id", "text", "question_type", "options", "order", "is_mandatory",
+        "section_id", "scoring_weight", "created_at", "updated_at",
+    ),
+    "audit_assignment": (
+        "id", "audit_template_id", "company_id", "area_id", "created_by_id", "recurrence_source_id",
+        "title", "description", "due_date", "status", "periodicity", "next_due_date", "is_public",
+        "created_at", "updated_at",
+    ),
+    "assigned_question": (
+        "id", "audit_assignment_id", "original_question_template_id", "text", "question_type", "options",
+        "order", "is_mandatory", "section_id", "scoring_weight", "created_at", "updated_at",
+    ),
+    "audit_response": (
+        "id", "audit_assignment_id", "auditor_id", "overall_comments", "photo_urls", "status", "score",
+        "submission_date", "updated_at",
+    ),
+    "answer": (
+        "id", "audit_response_id", "assigned_question_id", "answer_value", "comments", "photo_urls",
+        "created_at", "updated_at",
+    ),
+}
+
+_COMMENTS = [
+    "Looks good.",
+    "Needs follow-up next visit.",
+    "Labels are missing on two shelves.",
+    "Spill near the loading dock.",
+    "Fixed during the audit.",
+]
+
+
+@dataclass(frozen=True)
+class Scale:
+    companies: int = 10
+    areas_per_company: int = 20
+    auditors_per_company: int = 25
+    areas_per_auditor: int = 3
+    templates: int = 20
+    questions_per_template: int = 20
+    assignments_per_company: int = 500
+    # Given to every assignment that is not PENDING
+    responses_per_assignment: int = 1
+    seed: int = 0
+
+
+PRESETS: dict[str, Scale] = {
+    "small": Scale(companies=2, areas_per_company=5, auditors_per_company=5, templates=4, assignments_per_company=50),
+    "medium": Scale(),
+    # About 10M answers
+    "large": Scale(
+        companies=100,
+        areas_per_company=50,
+        auditors_per_company=100,
+        templates=50,
+        assignments_per_company=3000,
+        responses_per_assignment=2,
+    ),
+}
+
+
+# Kinds of generated ids, see _id()
+_COMPANY, _AREA, _USER, _TEMPLATE, _QUESTION, _ASSIGNMENT, _ASSIGNED, _RESPONSE, _ANSWER = range(1, 10)
+# Any odd multiplier is a bijection modulo 2**128; this one scatters sequential ids
+# across the keyspace like uuid4s would
+_SCATTER = 0x9E3779B97F4A7C15F39CC0605CEDC835
+
+
+def _id(seed: int, kind: int, index: int) -> uuid.UUID:
+    """A random-looking id that is unique per (seed, kind, index) and costs no hashing."""
+    n = ((seed & 0xFFFFFFFF) << 96) | (kind << 88) | index
+    return uuid.UUID(int=(n * _SCATTER) & ((1 << 128) - 1))
+
+
+def _template_questions(scale: Scale, t: int) -> tuple[str, list[dict[str, Any]]]:
+    key = "FIVE_S_AUDIT" if t % 2 == 0 else "SECURITY_CHECKLIST_AUDIT"
+    definition = get_audit_type_definition(key)
+    assert definition is not None
+    defaults = definition.get_default_questions()
+    questions = []
+    for q in range(scale.questions_per_template):
+        base = defaults[q % len(defaults)]
+        round_ = q // len(defaults)
+        questions.append({
+            **base,
+            "text": base["text"] if round_ == 0 else f"{base['text']} ({round_ + 1})",
+            "question_type": base["question_type"].value,
+            "order": q + 1,
+            "scoring_weight": base.get("scoring_weight"),
+            "section_id": base.get("section_id"),
+        })
+    return key, questions
+
+
+def _answer_value(rng: random.Random, question: dict[str, Any]) -> Any:
+    question_type = question["question_type"]
+    if question_type == QuestionType.RATING_SCALE.value:
+        return rng.randint(1, 5)
+    if question_type == QuestionType.YES_NO.value:
+        return rng.random() < 0.8
+    return rng.choice(_COMMENTS) if rng.random() < 0.2 else None
+
+
+def _score(questions: list[dict[str, Any]], values: list[Any]) -> Optional[float]:
+    """Weighted percentage, as the audit type definitions score a response."""
+    achieved = possible = 0.0
+    for question, value in zip(questions, values, strict=True):
+        weight = question["scoring_weight"]
+        if not weight:
+            continue
+        if question["question_type"] == QuestionType.RATING_SCALE.value:
+            possible += 5 * weight
+            achieved += (value or 0) * weight
+        elif question["question_type"] == QuestionType.YES_NO.value:
+            possible += weight
+            achieved += weight if value is True else 0
+    return achieved / possible * 100 if possible else None
+
+
+def generate(scale: Scale, *, as_of: date, batch_assignments: int = 1000) -> Iterator[tuple[str, list[tuple[Any, ...]]]]:
+    """
+    Yield (table, rows) chunks in foreign key order. The output depends only on `scale`
+    and `as_of`, and memory stays bounded by `batch_assignments` whatever the scale.
+    """
+    seed = scale.seed
+    now = datetime.combine(as_of, datetime.min.time())
+    hashed_password = get_password_hash(SYNTHETIC_PASSWORD)
+
+    companies = [_id(seed, _COMPANY, c) for c in range(scale.companies)]
+    yield "company", [
+        (company_id, f"Synthetic {seed}-{c}", "Generated for load testing", False, now, now)
+        for c, company_id in enumerate(companies)
+    ]
+
+    # Index 0 of each company's users is its admin, the rest are auditors
+    users_per_company = 1 + scale.auditors_per_company
+    for c, company_id in enumerate(companies):
+        areas = [_id(seed, _AREA, c * scale.areas_per_company + a) for a in range(scale.areas_per_company)]
+        yield "area", [(area_id, company_id, f"Area {a}", None, now, now) for a, area_id in enumerate(areas)]
+        users = []
+        links = []
+        for u in range(users_per_company):
+            user_id = _id(seed, _USER, c * users_per_company + u)
+            role, name = (UserRole.ADMIN, f"admin.c{c}") if u == 0 else (UserRole.AUDITOR, f"auditor{u}.c{c}")
+            email = f"{name}.s{seed}@{SYNTHETIC_EMAIL_DOMAIN}"
+            users.append(
+                (user_id, email, True, False, name, role.value, True, company_id, hashed_password, now, now)
+            )
+            if u and areas:
+                for j in range(min(scale.areas_per_auditor, len(areas))):
+                    links.append((user_id, areas[(u * scale.areas_per_auditor + j) % len(areas)], now))
+        yield "user", users
+        yield "user_area_assignment_link", links
+
+    templates = []
+    for t in range(scale.templates):
+        template_id = _id(seed, _TEMPLATE, t)
+        key, questions = _template_questions(scale, t)
+        for q, question in enumerate(questions):
+            question["id"] = _id(seed, _QUESTION, t * scale.questions_per_template + q)
+        creator_id = _id(seed, _USER, (t % scale.companies) * users_per_company)
+        templates.append((template_id, key, questions))
+        yield "audit_template", [(template_id, f"Synthetic {seed}-{t}", None, key, creator_id, now, now)]
+        yield "question_template", [
+            (
+                question["id"], template_id, question["text"], question["question_type"], question["options"],
+                question["order"], question["is_mandatory"], question["section_id"], question["scoring_weight"],
+                now, now,
+            )
+            for question in questions
+        ]
+
+    # Auditors see assignments in their linked areas, so responses to an area's
+    # assignments come from those auditors (the links follow the same pattern in every company)
+    all_auditors = list(range(1, users_per_company))
+    area_auditors: list[list[int]] = [[] for _ in range(scale.areas_per_company)]
+    for u in all_auditors:
+        for area in {(u * scale.areas_per_auditor + j) % scale.areas_per_company
+                     for j in range(min(scale.areas_per_auditor, scale.areas_per_company))}:
+            area_auditors[area].append(u)
+
+    questions_per = scale.questions_per_template
+    for c, company_id in enumerate(companies):
+        rng = random.Random(f"{seed}-{c}")
+        admin_id = _id(seed, _USER, c * users_per_company)
+        for start in range(0, scale.assignments_per_company, batch_assignments):
+            chunk: dict[str, list[tuple[Any, ...]]] = {
+                "audit_assignment": [], "assigned_question": [], "audit_response": [], "answer": [],
+            }
+            for a in range(start, min(start + batch_assignments, scale.assignments_per_company)):
+                g = c * scale.assignments_per_company + a
+                assignment_id = _id(seed, _ASSIGNMENT, g)
+                template_id, key, questions = templates[rng.randrange(len(templates))]
+                area = rng.randrange(scale.areas_per_company) if scale.areas_per_company and rng.random() < 0.7 else None
+                area_id = None if area is None else _id(seed, _AREA, c * scale.areas_per_company + area)
+                is_public = rng.random() < 0.1
+                due = now + timedelta(days=rng.randint(-120, 60), hours=rng.randint(8, 17))
+                created = due - timedelta(days=rng.randint(7, 30))
+                periodicity = next_due_date = None
+                if rng.random() < 0.05:
+                    periodicity = rng.choice([AuditPeriodicity.WEEKLY, AuditPeriodicity.MONTHLY]).value
+                    next_due_date, due = due.date(), None
+                    status = AuditAssignmentStatus.PENDING
+                elif due >= now:
+                    status = rng.choice([AuditAssignmentStatus.PENDING, AuditAssignmentStatus.IN_PROGRESS])
+                else:
+                    status = AuditAssignmentStatus.COMPLETED if rng.random() < 0.85 else AuditAssignmentStatus.OVERDUE
+                updated = min(due or now, now)
+                chunk["audit_assignment"].append((
+                    assignment_id, template_id, company_id, area_id, admin_id, None,
+                    f"{key.replace('_', ' ').title()} #{g}", None, due, status.value, periodicity,
+                    next_due_date, is_public, created, updated,
+                ))
+                assigned = [_id(seed, _ASSIGNED, g * questions_per + q) for q in range(questions_per)]
+                chunk["assigned_question"].extend(
+                    (
+                        assigned[q], assignment_id, question["id"], question["text"], question["question_type"],
+                        question["options"], question["order"], question["is_mandatory"], question["section_id"],
+                        question["scoring_weight"], created, created,
+                    )
+                    for q, question in enumerate(questions)
+                )
+                responders = all_auditors if area is None or is_public else area_auditors[area]
+                if status == AuditAssignmentStatus.PENDING or not responders:
+                    continue
+                for k in range(scale.responses_per_assignment):
+                    r = g * scale.responses_per_assignment + k
+                    response_id = _id(seed, _RESPONSE, r)
+                    auditor_id = _id(seed, _USER, c * users_per_company + rng.choice(responders))
+                    submitted = status == AuditAssignmentStatus.COMPLETED
+                    # Drafts stop partway through the questionnaire
+                    answered = questions_per if submitted else rng.randint(0, questions_per)
+                    values = [_answer_value(rng, question) for question in questions[:answered]]
+                    answered_at = min(created + timedelta(days=rng.randint(0, 7)), now)
+                    chunk["audit_response"].append((
+                        response_id, assignment_id, auditor_id,
+                        rng.choice(_COMMENTS) if rng.random() < 0.3 else None, None,
+                        (AuditResponseStatus.SUBMITTED if submitted else AuditResponseStatus.DRAFT).value,
+                        _score(questions, values) if submitted else None,
+                        answered_at if submitted else None, answered_at,
+                    ))
+                    chunk["answer"].extend(
+                        (
+                            _id(seed, _ANSWER, r * questions_per + q), response_id, assigned[q], value,
+                            rng.choice(_COMMENTS) if rng.random() < 0.05 else None, None, answered_at, answered_at,
+                        )
+                        for q, value in enumerate(values)
+                    )
+            yield from chunk.items()
+
+
+def _json_columns(table: sa.Table, columns: tuple[str, ...]) -> list[int]:
+    return [i for i, name in enumerate(columns) if isinstance(table.c[name].type, postgresql.JSONB)]
+
+
+def copy_rows(session: Session, table_name: str, rows: list[tuple[Any, ...]]) -> None:
+    """Write rows with COPY on Postgres, or a plain executemany INSERT on other dialects."""
+    if not rows:
+        return
+    table = SQLModel.metadata.tables[table_name]
+    columns = COLUMNS[table_name]
+    connection = session.connection()
+    if connection.dialect.name != "postgresql":
+        connection.execute(sa.insert(table), [dict(zip(columns, row, strict=True)) for row in rows])
+        return
+    quote = connection.dialect.identifier_preparer.quote
+    json_columns = _json_columns(table, columns)
+    statement = f"COPY {quote(table_name)} ({', '.join(quote(name) for name in columns)}) FROM STDIN"
+    with connection.connection.driver_connection.cursor() as cursor:  # type: ignore[union-attr]
+        with cursor.copy(statement) as copy:
+            for row in rows:
+                if json_columns:
+                    row = list(row)  # type: ignore[assignment]
+                    for i in json_columns:
+                        if row[i] is not None:
+                            row[i] = json.dumps(row[i])  # type: ignore[index]
+                copy.write_row(row)
+
+
+def load(session: Session, chunks: Iterable[tuple[str, list[tuple[Any, ...]]]]) -> Counter[str]:
+    """Write every chunk in one transaction and return the row count per table."""
+    if session.get_bind().dialect.name == "postgresql":
+        # Nothing is lost by not waiting for WAL flushes on a generated dataset
+        session.execute(sa.text("SET LOCAL synchronous_commit TO OFF"))
+    counts: Counter[str] = Counter()
+    for table_name, rows in chunks:
+        copy_rows(session, table_name, rows)
+        counts[table_name] += len(rows)
+    session.commit()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Generate a synthetic dataset for load testing. Output is deterministic for a given "
+            "preset, overrides, --seed and --as-of; load each seed into a database only once."
+        )
+    )
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="medium")
+    for field in fields(Scale):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=int, default=None, help="Override the preset.")
+    parser.add_argument(
+        "--as-of",
+        type=date.fromisoformat,
+        default=None,
+        help="Due dates are spread around this day (YYYY-MM-DD). Defaults to today.",
+    )
+    args = parser.parse_args()
+    overrides = {field.name: getattr(args, field.name) for field in fields(Scale) if getattr(args, field.name) is not None}
+    scale = replace(PRESETS[args.preset], **overrides)
+    as_of = args.as_of or date.today()
+
+    logger.info(f"Generating {scale} around {as_of}")
+    started = time.perf_counter()
+    with Session(engine) as session:
+        counts = load(session, generate(scale, as_of=as_of))
+    elapsed = time.perf_counter() - started
+    for table_name, count in counts.items():
+        logger.info(f"{table_name}: {count} rows")
+    logger.info(
+        f"Wrote {sum(counts.values())} rows in {elapsed:.1f}s ({sum(counts.values()) / elapsed:.0f} rows/s). "
+        f"Users log in with password {SYNTHETIC_PASSWORD!r}."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.metrics import record_cache_lookup
+from app.core.tracing import traced
+from app.demo_companies import NOTIFY_CHANNEL as COMPANY_NOTIFY_CHANNEL
+from app.demo_companies import demo_company_ids
+from app.models import AuditTemplate, AuditTemplatePublic, QuestionTemplatePublic
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "audit_template_changed"
+_STALE_KEY = "stale_audit_templates"
+
+
+@dataclass(frozen=True)
+class CachedTemplate:
+    version: int
+    # crud.audit_template.get_version as read before loading the template
+    db_version: Optional[tuple[Any, ...]]
+    json: bytes
+    template: AuditTemplatePublic
+    questions: tuple[QuestionTemplatePublic, ...]
+    size: int
+
+
+class TemplateCache:
+    """
+    Process-local LRU of serialized audit templates, bounded by an estimate of memory use.
+
+    Every template id has a version counter that is bumped on invalidation. Loaders read
+    the version before going to the database and `put` drops the result if the version
+    moved in the meantime, so a slow reader can never resurrect a stale template.
+
+    Entries also keep the database version of the template they were loaded at, and
+    `get` only returns one whose version matches the caller's. Writes made by another
+    worker are seen on the next read even when nothing tells this worker about them.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[uuid.UUID, CachedTemplate] = OrderedDict()
+        self._versions: dict[uuid.UUID, int] = {}
+        self._epoch = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, template_id: uuid.UUID) -> int:
+        # Both counters only grow, so their sum changes whenever either one does
+        with self._lock:
+            return self._epoch + self._versions.get(template_id, 0)
+
+    def get(self, template_id: uuid.UUID, db_version: Optional[tuple[Any, ...]] = None) -> Optional[CachedTemplate]:
+        with self._lock:
+            entry = self._entries.get(template_id)
+            if entry is not None and entry.db_version != db_version:
+                # Changed in the database since; the reload replaces it
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(template_id)
+                self.hits += 1
+        record_cache_lookup("template", "", entry is not None)
+        return entry
+
+    def put(
+        self,
+        template_id: uuid.UUID,
+        version: int,
+        public: AuditTemplatePublic,
+        db_version: Optional[tuple[Any, ...]] = None,
+    ) -> CachedTemplate:
+        payload = public.model_dump_json().encode()
+        entry = CachedTemplate(
+            version=version,
+            db_version=db_version,
+            json=payload,
+            template=public,
+            questions=tuple(public.question_templates),
+            # The parsed models take roughly as much room again as their JSON
+            size=2 * len(payload),
+        )
+        with self._lock:
+            if version != self._epoch + self._versions.get(template_id, 0):
+                return entry
+            previous = self._entries.pop(template_id, None)
+            if previous is not None:
+                self._size -= previous.size
+            if entry.size > self.max_bytes:
+                return entry
+            self._entries[template_id] = entry
+            self._size += entry.size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+        return entry
+
+    def invalidate(self, template_id: uuid.UUID) -> None:
+        with self._lock:
+            self._versions[template_id] = self._versions.get(template_id, 0) + 1
+            entry = self._entries.pop(template_id, None)
+            if entry is not None:
+                self._size -= entry.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+template_cache = TemplateCache(settings.TEMPLATE_CACHE_MAX_BYTES)
+
+
+def get_many(
+    session: Session,
+    template_ids: Iterable[uuid.UUID],
+    db_versions: Optional[Mapping[uuid.UUID, tuple[Any, ...]]] = None,
+) -> dict[uuid.UUID, CachedTemplate]:
+    """
+    Return templates for `template_ids`, loading misses and entries that are out of date
+    with two queries. `db_versions` are the templates' crud.audit_template.get_version,
+    read with one more query when the caller does not have them; templates missing
+    from it do not exist.
+    """
+    template_ids = list(template_ids)
+    if db_versions is None:
+        from app.crud.audit_template import get_versions
+
+        db_versions = get_versions(session=session, template_ids=template_ids)
+    found: dict[uuid.UUID, CachedTemplate] = {}
+    missing: dict[uuid.UUID, int] = {}
+    for template_id in template_ids:
+        if template_id not in db_versions:
+            continue
+        entry = template_cache.get(template_id, db_versions[template_id])
+        if entry is not None:
+            found[template_id] = entry
+        else:
+            missing[template_id] = template_cache.version(template_id)
+    if missing:
+        statement = (
+            select(AuditTemplate)
+            .where(AuditTemplate.id.in_(list(missing)))
+            .options(selectinload(AuditTemplate.question_templates))
+        )
+        for template in session.exec(statement):
+            public = AuditTemplatePublic.model_validate(template)
+            found[template.id] = template_cache.put(
+                template.id, missing[template.id], public, db_versions[template.id]
+            )
+    return found
+
+
+@traced(name="template_cache.get")
+def get(
+    session: Session, template_id: uuid.UUID, db_version: Optional[tuple[Any, ...]] = None
+) -> Optional[CachedTemplate]:
+    """One template, see get_many. Pass `db_version` if already read, e.g. for an ETag."""
+    db_versions = None if db_version is None else {template_id: db_version}
+    return get_many(session, [template_id], db_versions).get(template_id)
+
+
+def mark_stale(session: Session, template_id: uuid.UUID) -> None:
+    """
+    Drop a template that `session` has just written. The entry is dropped again when
+    the transaction ends, since another request may have cached the old committed row
+    (or this one the uncommitted row) in between.
+    """
+    template_cache.invalidate(template_id)
+    session.info.setdefault(_STALE_KEY, set()).add(template_id)
+    if settings.TEMPLATE_CACHE_NOTIFY and session.get_bind().dialect.name == "postgresql":
+        # Postgres only delivers the notification if the transaction commits
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": NOTIFY_CHANNEL, "payload": str(template_id)},
+        )
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_at_transaction_end(session: Session) -> None:
+    for template_id in session.info.pop(_STALE_KEY, ()):
+        template_cache.invalidate(template_id)
+
+
+def _listen(dsn: str, stop: threading.Event) -> None:
+    import psycopg
+
+    while not stop.is_set():
+        try:
+            with psycopg.connect(dsn, autocommit=True) as conn:
+                conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                conn.execute(f"LISTEN {COMPANY_NOTIFY_CHANNEL}")
+                # Anything may have changed while this worker was not listening
+                template_cache.clear()
+                demo_company_ids.invalidate()
+                for notify in conn.notifies():
+                    if notify.channel == COMPANY_NOTIFY_CHANNEL:
+                        demo_company_ids.invalidate()
+                    else:
+                        template_cache.invalidate(uuid.UUID(notify.payload))
+                    if stop.is_set():
+                        break
+        except Exception:
+            logger.exception("Template cache listener lost its connection, retrying")
+            stop.wait(5)
+
+
+def start_invalidation_listener() -> threading.Event:
+    """
+    Keep this worker's cache, and its demo company ids, coherent with writes made by
+    other workers. Returns an event that stops the listener once the next
+    notification arrives.
+    """
+    from app.core.db import engine
+
+    dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    stop = threading.Event()
+    threading.Thread(target=_listen, args=(dsn, stop), name="template-cache-listener", daemon=True).start()
+    return stop
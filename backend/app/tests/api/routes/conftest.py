@@ -0,0 +1,77 @@
+from collections.abc import Callable, Generator, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from typing import Optional
+
+import pytest
+from starlette.routing import Match
+from starlette.types import Scope
+
+from app.core import query_stats
+from app.core.query_stats import QueryStats
+from app.main import app as main_app
+from app.tests.utils.query_budget import ROUTE_BUDGETS, QueryBudget, budget_violation
+
+RouteCalls = list[tuple[str, QueryStats]]
+
+
+def _endpoint_name(scope: Scope) -> str:
+    # Matched again rather than read from the scope, since middlewares that rewrite
+    # the request (msgpack bodies) route a copy of it
+    for route in main_app.router.routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return str(child_scope["endpoint"].__name__)
+    return f"{scope['method']} {scope['path']}"
+
+
+@pytest.fixture(autouse=True)
+def route_calls(monkeypatch: pytest.MonkeyPatch) -> Generator[RouteCalls, None, None]:
+    """
+    Statements run by every request made during the test, checked against
+    ROUTE_BUDGETS once it finishes. The app runs in the test client's own thread,
+    so the stats are picked up where the middleware logs them.
+    """
+    calls: RouteCalls = []
+    log_request = query_stats._log_request
+
+    def record(scope: Scope, status: int, stats: QueryStats, threshold: int) -> None:
+        calls.append((_endpoint_name(scope), stats))
+        log_request(scope, status, stats, threshold)
+
+    monkeypatch.setattr(query_stats, "_log_request", record)
+    yield calls
+
+    problems = []
+    for endpoint, stats in calls:
+        budget = ROUTE_BUDGETS.get(endpoint)
+        if budget is None:
+            problems.append(f"{endpoint} has no query budget, add one to ROUTE_BUDGETS")
+        elif violation := budget_violation(endpoint, stats, budget):
+            problems.append(violation)
+    if problems:
+        pytest.fail("\n".join(dict.fromkeys(problems)), pytrace=False)
+
+
+@pytest.fixture
+def query_budget(route_calls: RouteCalls) -> Callable[..., AbstractContextManager[RouteCalls]]:
+    """
+    Tighter budget for the requests made inside the block, for tests that load a
+    route with enough rows to show an N+1, optionally with a cap on DB time, which
+    ROUTE_BUDGETS leaves out as it depends on the machine:
+
+        with query_budget(max_queries=8, max_db_ms=100):
+            client.get(...)
+    """
+
+    @contextmanager
+    def check(*, max_queries: int, max_db_ms: Optional[float] = None) -> Iterator[RouteCalls]:
+        start = len(route_calls)
+        calls: RouteCalls = []
+        yield calls
+        calls.extend(route_calls[start:])
+        assert calls, "No requests were made inside the query budget"
+        for endpoint, stats in calls:
+            violation = budget_violation(endpoint, stats, QueryBudget(max_queries, max_db_ms))
+            assert violation is None, violation
+
+    return check
@@ -291,3 +291,25 @@ def test_delete_area_with_assigned_users(
     )
     assert response.status_code == 400
     assert "Cannot delete area with associated audit assignments or user assignments" in response.json()["detail"]
+
+
+def test_create_area_from_msgpack_body(client: TestClient, db: Session) -> None:
+    msgpack = pytest.importorskip("msgpack")
+    from app.tests.conftest import get_auth_headers
+    from app.tests.utils.factories import create_random_company, create_random_user
+
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    db.commit()
+    headers = {**get_auth_headers(admin), "Content-Type": "application/msgpack", "Accept": "application/msgpack"}
+    url = f"/api/v1/companies/{company.id}/areas/"
+
+    response = client.post(url, headers=headers, content=msgpack.packb({"name": "Packed area"}))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    content = msgpack.unpackb(response.content)
+    assert content["name"] == "Packed area"
+    assert content["company_id"] == str(company.id)
+
+    malformed = client.post(url, headers=headers, content=b"\xc1")
+    assert malformed.status_code == 400
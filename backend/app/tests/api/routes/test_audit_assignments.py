@@ -1,4 +1,7 @@
+import json
 import uuid
+from datetime import date, datetime
+from typing import Any
 
 import pytest
 from fastapi.testclient import TestClient
@@ -8,6 +11,7 @@ from app import crud
 from app.models import (
     AuditAssignment,
     AuditAssignmentCreate,
+    AuditPeriodicity,
     AuditTemplate,
     Company,
     CompanyCreate,
@@ -19,6 +23,14 @@ from app.models import (
     AreaCreate,
     UserAreaAssignmentLink,
 )
+from app.tests.conftest import get_auth_headers
+from app.tests.utils.factories import (
+    create_random_area,
+    create_random_audit_assignment,
+    create_random_audit_template,
+    create_random_company,
+    create_random_user,
+)
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -161,6 +173,36 @@ def test_read_my_audit_assignments_as_auditor(
     assert any(a["id"] == str(test_audit_assignment.id) for a in content["data"])
 
 
+def test_read_my_audit_assignments_queries_do_not_grow_with_rows(
+    client: TestClient,
+    db: Session,
+    query_budget: Any,
+) -> None:
+    company = create_random_company(db)
+    area = create_random_area(db, company_id=company.id)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    auditor = create_random_user(db, role=UserRole.AUDITOR, company_id=company.id)
+    template = create_random_audit_template(db, creator_id=admin.id)
+    db.add(UserAreaAssignmentLink(user_id=auditor.id, area_id=area.id))
+    db.commit()
+    for n in range(100):
+        create_random_audit_assignment(
+            db,
+            audit_template_id=template.id,
+            company_id=company.id,
+            creator_id=admin.id,
+            area_id=area.id if n % 2 else None,
+        )
+
+    # User, area links, collection version, page, its questions and template, count
+    with query_budget(max_queries=8):
+        response = client.get("/api/v1/audit-assignments/my-assignments", headers=get_auth_headers(auditor))
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 100
+    assert all(a["assigned_questions"] and a["audit_template"] for a in content["data"])
+
+
 def test_read_audit_assignments_for_company(
     client: TestClient,
     superuser_token_headers: dict[str, str],
@@ -238,3 +280,192 @@ def test_delete_audit_assignment(
 
     assignment_in_db = db.get(AuditAssignment, assignment_id)
     assert assignment_in_db is None
+
+
+def test_read_audit_calendar_merges_projected_and_materialized(
+    client: TestClient,
+    db: Session,
+) -> None:
+    from app.tests.conftest import get_auth_headers
+    from app.tests.utils.factories import (
+        create_random_audit_assignment,
+        create_random_audit_template,
+        create_random_company,
+        create_random_user,
+    )
+
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    template = create_random_audit_template(db, creator_id=admin.id)
+    series = create_random_audit_assignment(
+        db, audit_template_id=template.id, company_id=company.id, creator_id=admin.id
+    )
+    series.periodicity = AuditPeriodicity.WEEKLY
+    series.next_due_date = date(2024, 3, 4)
+    one_off = create_random_audit_assignment(
+        db, audit_template_id=template.id, company_id=company.id, creator_id=admin.id
+    )
+    one_off.due_date = datetime(2024, 3, 6, 9, 30)
+    db.add(series)
+    db.add(one_off)
+    # The body is streamed from its own session, after the request session is closed
+    db.commit()
+
+    response = client.get(
+        "/api/v1/audit-assignments/calendar",
+        headers=get_auth_headers(admin),
+        params={"from": "2024-03-01", "to": "2024-03-17"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    entries = [json.loads(line) for line in response.text.splitlines()]
+    assert [(e["due_on"], e["assignment_id"], e["is_materialized"]) for e in entries] == [
+        ("2024-03-04", str(series.id), False),
+        ("2024-03-06", str(one_off.id), True),
+        ("2024-03-11", str(series.id), False),
+    ]
+
+
+def test_read_audit_calendar_rejects_oversized_window(
+    client: TestClient,
+    db: Session,
+) -> None:
+    from app.tests.conftest import get_auth_headers
+    from app.tests.utils.factories import create_random_company, create_random_user
+
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    response = client.get(
+        "/api/v1/audit-assignments/calendar",
+        headers=get_auth_headers(admin),
+        params={"from": "2024-01-01", "to": "2025-06-01"},
+    )
+    assert response.status_code == 400
+
+
+def test_read_audit_assignment_honours_if_none_match(
+    client: TestClient,
+    db: Session,
+) -> None:
+    from app.tests.conftest import get_auth_headers
+    from app.tests.utils.factories import (
+        create_random_audit_assignment,
+        create_random_audit_template,
+        create_random_company,
+        create_random_user,
+    )
+
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    template = create_random_audit_template(db, creator_id=admin.id)
+    assignment = create_random_audit_assignment(
+        db, audit_template_id=template.id, company_id=company.id, creator_id=admin.id
+    )
+    db.commit()
+    headers = get_auth_headers(admin)
+
+    url = f"/api/v1/audit-assignments/{assignment.id}"
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+
+    cached = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    list_url = f"/api/v1/audit-assignments/company/{company.id}"
+    list_etag = client.get(list_url, headers=headers).headers["etag"]
+    assert client.get(list_url, headers={**headers, "If-None-Match": list_etag}).status_code == 304
+    # Paging is part of the representation
+    assert client.get(
+        list_url, headers={**headers, "If-None-Match": list_etag}, params={"limit": 1}
+    ).status_code == 200
+
+    create_random_audit_assignment(
+        db, audit_template_id=template.id, company_id=company.id, creator_id=admin.id
+    )
+    db.commit()
+    changed = client.get(list_url, headers={**headers, "If-None-Match": list_etag})
+    assert changed.status_code == 200
+    assert changed.json()["count"] == 2
+
+
+def test_fast_json_responses_match_response_model_output(
+    client: TestClient,
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from app.core.config import settings
+    from app.tests.conftest import get_auth_headers
+    from app.tests.utils.factories import (
+        create_random_audit_assignment,
+        create_random_audit_template,
+        create_random_company,
+        create_random_user,
+    )
+
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    template = create_random_audit_template(db, creator_id=admin.id)
+    for _ in range(3):
+        create_random_audit_assignment(
+            db, audit_template_id=template.id, company_id=company.id, creator_id=admin.id
+        )
+    db.commit()
+    headers = get_auth_headers(admin)
+    url = f"/api/v1/audit-assignments/company/{company.id}"
+
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", False)
+    expected = client.get(url, headers=headers)
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+    fast = client.get(url, headers=headers)
+
+    assert fast.status_code == expected.status_code == 200
+    assert fast.json() == expected.json()
+    assert fast.json()["count"] == 3
+    assert fast.headers["etag"] == expected.headers["etag"]
+
+
+def test_read_audit_assignments_as_msgpack(
+    client: TestClient,
+    db: Session,
+) -> None:
+    msgpack = pytest.importorskip("msgpack")
+    from app.tests.conftest import get_auth_headers
+    from app.tests.utils.factories import (
+        create_random_audit_assignment,
+        create_random_audit_template,
+        create_random_company,
+        create_random_user,
+    )
+
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    template = create_random_audit_template(db, creator_id=admin.id)
+    assignment = create_random_audit_assignment(
+        db, audit_template_id=template.id, company_id=company.id, creator_id=admin.id
+    )
+    db.commit()
+    headers = get_auth_headers(admin)
+    msgpack_headers = {**headers, "Accept": "application/msgpack"}
+
+    for url in (
+        f"/api/v1/audit-assignments/{assignment.id}",
+        f"/api/v1/audit-assignments/company/{company.id}",
+        f"/api/v1/audit-templates/{template.id}",
+    ):
+        as_json = client.get(url, headers=headers)
+        as_msgpack = client.get(url, headers=msgpack_headers)
+        assert as_json.headers["content-type"] == "application/json"
+        assert as_msgpack.headers["content-type"] == "application/msgpack"
+        assert "Accept" in as_msgpack.headers["vary"]
+        assert msgpack.unpackb(as_msgpack.content) == as_json.json()
+
+    # JSON still wins when the client ranks it higher
+    preferred = client.get(
+        f"/api/v1/audit-assignments/{assignment.id}",
+        headers={**headers, "Accept": "application/json, application/msgpack;q=0.5"},
+    )
+    assert preferred.headers["content-type"] == "application/json"
@@ -388,3 +388,61 @@ def test_update_audit_response_submitted_by_admin_succeeds(
     assert response_in_db is not None
     assert response_in_db.overall_comments == "Updated by admin"
     assert response_in_db.score == 95.0
+
+
+def test_submit_audit_response_is_idempotent(client: TestClient, db: Session) -> None:
+    from app.models import Answer, AssignedQuestion, IdempotencyKey
+    from app.tests.conftest import get_auth_headers
+    from app.tests.utils.factories import (
+        create_random_audit_assignment,
+        create_random_audit_template,
+        create_random_company,
+        create_random_user,
+    )
+
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    auditor = create_random_user(db, role=UserRole.AUDITOR, company_id=company.id)
+    template = create_random_audit_template(db, creator_id=admin.id)
+    assignment = create_random_audit_assignment(
+        db, audit_template_id=template.id, company_id=company.id, creator_id=admin.id
+    )
+    db.add(
+        AssignedQuestion(
+            audit_assignment_id=assignment.id, text="Clean?", question_type=QuestionType.YES_NO, order=99, is_mandatory=True
+        )
+    )
+    db.commit()
+    questions = db.exec(select(AssignedQuestion).where(AssignedQuestion.audit_assignment_id == assignment.id)).all()
+
+    url = f"/api/v1/audit-assignments/{assignment.id}/responses/submit"
+    headers = {**get_auth_headers(auditor), "Idempotency-Key": "offline-1"}
+    payload = {
+        "status": "SUBMITTED",
+        "photo_urls": ["photos/overview.jpg"],
+        "answers": [{"assigned_question_id": str(q.id), "answer_value": True} for q in questions],
+    }
+
+    first = client.post(url, headers=headers, json=payload)
+    assert first.status_code == 200, first.text
+    assert len(first.json()["answers"]) == len(questions)
+    assert first.json()["submission_date"] is not None
+
+    retry = client.post(url, headers=headers, json=payload)
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    db.expire_all()
+    assert len(db.exec(select(AuditResponse).where(AuditResponse.audit_assignment_id == assignment.id)).all()) == 1
+    assert len(db.exec(select(Answer)).all()) == len(questions)
+
+    conflict = client.post(url, headers=headers, json={**payload, "overall_comments": "changed"})
+    assert conflict.status_code == 409
+
+    # A failed submission stores nothing, so fixing the payload and retrying works
+    incomplete = {**payload, "answers": payload["answers"][:1]}
+    headers["Idempotency-Key"] = "offline-2"
+    assert client.post(url, headers=headers, json=incomplete).status_code == 400
+    db.expire_all()
+    assert db.get(IdempotencyKey, (auditor.id, "offline-2")) is None
+    assert len(db.exec(select(Answer)).all()) == len(questions)
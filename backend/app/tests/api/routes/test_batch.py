@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.models import UserRole
+from app.tests.conftest import get_auth_headers
+from app.tests.utils.factories import (
+    create_random_audit_assignment,
+    create_random_audit_template,
+    create_random_company,
+    create_random_user,
+)
+
+
+def test_batch_runs_sub_requests_in_order(client: TestClient, db: Session) -> None:
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    template = create_random_audit_template(db, creator_id=admin.id)
+    assignment = create_random_audit_assignment(
+        db, audit_template_id=template.id, company_id=company.id, creator_id=admin.id
+    )
+    db.commit()
+    headers = get_auth_headers(admin)
+
+    single = client.get(f"/api/v1/audit-assignments/{assignment.id}", headers=headers)
+    requests = [
+        {"path": f"/audit-assignments/{assignment.id}"},
+        {"path": f"/audit-assignments/{assignment.id}/assigned-questions/"},
+        {"path": f"/audit-templates/{template.id}"},
+        {"path": f"/audit-assignments/{assignment.id}", "headers": {"If-None-Match": single.headers["etag"]}},
+        {"method": "POST", "path": f"/companies/{company.id}/areas/", "body": {"name": "Batched area"}},
+        {"path": f"/companies/{company.id}/areas/"},
+        {"path": "/audit-templates/00000000-0000-0000-0000-000000000000"},
+    ]
+    r = client.post("/api/v1/batch/", headers=headers, json={"requests": requests})
+    assert r.status_code == 200, r.text
+    responses = r.json()["responses"]
+
+    assert [item["status"] for item in responses] == [200, 200, 200, 304, 200, 200, 404]
+    assert responses[0]["body"] == single.json()
+    assert responses[0]["headers"]["etag"] == single.headers["etag"]
+    assert responses[2]["body"]["id"] == str(template.id)
+    assert responses[3]["body"] is None
+    # Reads after a write share its session and see the uncommitted area
+    assert "Batched area" in [area["name"] for area in responses[5]["body"]["data"]]
+
+
+def test_batch_requires_auth_and_rejects_nesting(client: TestClient, db: Session) -> None:
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    db.commit()
+
+    payload = {"requests": [{"path": "/utils/health-check/"}]}
+    assert client.post("/api/v1/batch/", json=payload).status_code == 401
+    nested = {"requests": [{"method": "POST", "path": "/batch/"}]}
+    assert client.post("/api/v1/batch/", headers=get_auth_headers(admin), json=nested).status_code == 400
+
+
+def test_failed_sub_request_does_not_leave_its_writes_behind(client: TestClient, db: Session) -> None:
+    company = create_random_company(db)
+    auditor = create_random_user(db, role=UserRole.AUDITOR, company_id=company.id)
+    db.commit()
+    # Claims the Idempotency-Key, then fails with 404 for the missing assignment
+    submit = {
+        "method": "POST",
+        "path": "/audit-assignments/00000000-0000-0000-0000-000000000000/responses/submit",
+        "headers": {"Idempotency-Key": "retry-me"},
+        "body": {"answers": []},
+    }
+    r = client.post("/api/v1/batch/", headers=get_auth_headers(auditor), json={"requests": [submit, submit]})
+    assert r.status_code == 200, r.text
+    # Without a savepoint the second try would find the first one's pending key (409)
+    assert [item["status"] for item in r.json()["responses"]] == [404, 404]
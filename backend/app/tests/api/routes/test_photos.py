@@ -0,0 +1,272 @@
+import hashlib
+import io
+from collections.abc import Generator
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app import crud
+from app.core.images import ThumbnailCache, get_thumbnails
+from app.core.storage import LocalStorage, get_storage
+from app.main import app as main_app
+from app.models import AuditResponseCreate, Photo, PhotoReference, PhotoUpload, User, UserRole
+from app.tests.conftest import get_auth_headers
+from app.tests.utils.factories import (
+    create_random_audit_assignment,
+    create_random_audit_template,
+    create_random_company,
+    create_random_user,
+)
+
+UPLOAD_HEADERS = {"Content-Type": "application/offset+octet-stream"}
+
+
+@pytest.fixture
+def storage(tmp_path: Path) -> Generator[LocalStorage, None, None]:
+    storage = LocalStorage(tmp_path)
+    main_app.dependency_overrides[get_storage] = lambda: storage
+    yield storage
+    main_app.dependency_overrides.pop(get_storage)
+
+
+def _user(db: Session) -> User:
+    company = create_random_company(db)
+    user = create_random_user(db, role=UserRole.AUDITOR, company_id=company.id)
+    db.commit()
+    return user
+
+
+def test_resumable_upload_is_stored_once(client: TestClient, db: Session, storage: LocalStorage) -> None:
+    headers = get_auth_headers(_user(db))
+    content = bytes(range(256)) * 400
+    digest = hashlib.sha256(content).hexdigest()
+
+    r = client.post(
+        "/api/v1/photos/uploads",
+        headers=headers,
+        json={"length": len(content), "content_type": "image/jpeg", "sha256": digest},
+    )
+    assert r.status_code == 201, r.text
+    upload = r.json()
+    assert r.headers["location"].endswith(f"/photos/uploads/{upload['id']}")
+    assert upload["offset"] == 0 and not upload["completed"]
+    upload_url = f"/api/v1/photos/uploads/{upload['id']}"
+
+    r = client.patch(upload_url, headers={**headers, **UPLOAD_HEADERS, "Upload-Offset": "0"}, content=content[:40_000])
+    assert r.status_code == 200, r.text
+    assert r.headers["upload-offset"] == "40000"
+    # A retry of a chunk that already landed is refused with the offset to resume from
+    r = client.patch(upload_url, headers={**headers, **UPLOAD_HEADERS, "Upload-Offset": "0"}, content=content[:40_000])
+    assert r.status_code == 409
+    assert client.get(upload_url, headers=headers).json()["offset"] == 40_000
+
+    r = client.patch(upload_url, headers={**headers, **UPLOAD_HEADERS, "Upload-Offset": "40000"}, content=content[40_000:])
+    assert r.status_code == 200, r.text
+    upload = r.json()
+    assert upload["completed"] and upload["sha256"] == digest
+    assert upload["photo_url"] == f"/api/v1/photos/{digest}"
+    assert storage.exists(digest)
+    assert list(storage.staging_dir.iterdir()) == []
+
+    # The same photo again is recognised by its digest and never re-sent
+    r = client.post(
+        "/api/v1/photos/uploads",
+        headers=headers,
+        json={"length": len(content), "content_type": "image/jpeg", "sha256": digest},
+    )
+    assert r.status_code == 201
+    assert r.json()["completed"] and r.json()["photo_url"] == upload["photo_url"]
+
+    r = client.get(upload["photo_url"], headers=headers)
+    assert r.status_code == 200
+    assert r.content == content
+    assert r.headers["content-type"] == "image/jpeg"
+    r = client.get(upload["photo_url"], headers={**headers, "If-None-Match": r.headers["etag"]})
+    assert r.status_code == 304
+
+    # Knowing the digest gets nobody else the photo, nor a completed upload of it
+    other_headers = get_auth_headers(_user(db))
+    assert client.get(upload["photo_url"], headers=other_headers).status_code == 404
+    r = client.post(
+        "/api/v1/photos/uploads",
+        headers=other_headers,
+        json={"length": len(content), "content_type": "image/jpeg", "sha256": digest},
+    )
+    assert r.status_code == 201
+    assert not r.json()["completed"] and r.json()["offset"] == 0
+
+
+def test_upload_rejects_checksum_mismatch(client: TestClient, db: Session, storage: LocalStorage) -> None:
+    headers = get_auth_headers(_user(db))
+    r = client.post(
+        "/api/v1/photos/uploads",
+        headers=headers,
+        json={"length": 4, "content_type": "image/png", "sha256": hashlib.sha256(b"good").hexdigest()},
+    )
+    upload_url = f"/api/v1/photos/uploads/{r.json()['id']}"
+    r = client.patch(upload_url, headers={**headers, **UPLOAD_HEADERS, "Upload-Offset": "0"}, content=b"evil")
+    assert r.status_code == 422
+    assert client.get(upload_url, headers=headers).json()["offset"] == 0
+    r = client.patch(upload_url, headers={**headers, **UPLOAD_HEADERS, "Upload-Offset": "0"}, content=b"good!")
+    assert r.status_code == 413
+
+
+def test_photo_references_are_counted(db: Session) -> None:
+    user = _user(db)
+    template = create_random_audit_template(db, creator_id=user.id)
+    assignment = create_random_audit_assignment(
+        db, audit_template_id=template.id, company_id=user.company_id, creator_id=user.id
+    )
+    first, second = (Photo(sha256=hashlib.sha256(name).hexdigest(), size=1, content_type="image/jpeg") for name in (b"a", b"b"))
+    db.add_all([first, second])
+    # Only photos the auditor may read can be attached
+    db.add_all(
+        PhotoUpload(user_id=user.id, length=1, content_type="image/jpeg", sha256=photo.sha256, completed=True, expires_at=datetime.utcnow())
+        for photo in (first, second)
+    )
+    db.commit()
+    first_url, second_url = crud.photo.photo_url(first.sha256), crud.photo.photo_url(second.sha256)
+
+    audit_response = crud.audit_response.create(
+        session=db,
+        response_in=AuditResponseCreate(
+            audit_assignment_id=assignment.id,
+            photo_urls=[first_url, first_url, "https://elsewhere.example.com/c.jpg"],
+        ),
+        auditor_id=user.id,
+    )
+    db.commit()
+    db.refresh(first)
+    assert first.ref_count == 1
+    reference = db.get(PhotoReference, (first.sha256, assignment.id))
+    assert reference is not None and reference.ref_count == 1
+
+    # The commit expired the response, so the old photo_urls are read back from the row
+    audit_response.photo_urls = [second_url]
+    db.commit()
+    db.refresh(first)
+    db.refresh(second)
+    assert (first.ref_count, second.ref_count) == (0, 1)
+    db.refresh(reference)
+    assert reference.ref_count == 0
+
+    db.delete(audit_response)
+    db.commit()
+    db.refresh(second)
+    assert second.ref_count == 0
+
+    digests = sorted([first.sha256, second.sha256])
+    purged = crud.photo.purge_unreferenced(session=db, before=datetime.utcnow() + timedelta(seconds=1))
+    db.commit()
+    assert sorted(purged) == digests
+
+
+def test_photos_are_read_through_assignments(client: TestClient, db: Session, storage: LocalStorage, tmp_path: Path) -> None:
+    uploader = _user(db)
+    template = create_random_audit_template(db, creator_id=uploader.id)
+    assignment = create_random_audit_assignment(
+        db, audit_template_id=template.id, company_id=uploader.company_id, creator_id=uploader.id
+    )
+    colleague = create_random_user(db, role=UserRole.USER, company_id=uploader.company_id)
+    outsider = _user(db)
+    db.commit()
+    digest = _store(db, storage, tmp_path, b"photo", "image/jpeg", uploader)
+    url = crud.photo.photo_url(digest)
+
+    # Not attachable by someone who never had the bytes
+    with pytest.raises(HTTPException) as excinfo:
+        crud.audit_response.create(
+            session=db, response_in=AuditResponseCreate(audit_assignment_id=assignment.id, photo_urls=[url]), auditor_id=outsider.id
+        )
+    assert excinfo.value.status_code == 403
+    db.rollback()
+
+    assert client.get(url, headers=get_auth_headers(colleague)).status_code == 404
+    crud.audit_response.create(
+        session=db, response_in=AuditResponseCreate(audit_assignment_id=assignment.id, photo_urls=[url]), auditor_id=uploader.id
+    )
+    db.commit()
+    assert client.get(url, headers=get_auth_headers(colleague)).status_code == 200
+    assert client.get(url, headers=get_auth_headers(outsider)).status_code == 404
+
+
+def _store(db: Session, storage: LocalStorage, tmp_path: Path, content: bytes, content_type: str, user: User) -> str:
+    """Store a photo as uploaded by `user`, who may then read it."""
+    digest = hashlib.sha256(content).hexdigest()
+    source = tmp_path / "source"
+    source.write_bytes(content)
+    storage.put(digest, source)
+    db.add(Photo(sha256=digest, size=len(content), content_type=content_type))
+    db.add(
+        PhotoUpload(
+            user_id=user.id,
+            length=len(content),
+            content_type=content_type,
+            sha256=digest,
+            completed=True,
+            expires_at=datetime.utcnow(),
+        )
+    )
+    db.commit()
+    return digest
+
+
+def test_photo_byte_ranges(client: TestClient, db: Session, storage: LocalStorage, tmp_path: Path) -> None:
+    user = _user(db)
+    headers = get_auth_headers(user)
+    content = bytes(range(256)) * 10
+    url = f"/api/v1/photos/{_store(db, storage, tmp_path, content, 'image/jpeg', user)}"
+
+    r = client.get(url, headers={**headers, "Range": "bytes=100-199"})
+    assert r.status_code == 206
+    assert r.content == content[100:200]
+    assert r.headers["content-range"] == f"bytes 100-199/{len(content)}"
+    r = client.get(url, headers={**headers, "Range": "bytes=-10"})
+    assert r.status_code == 206 and r.content == content[-10:]
+    r = client.get(url, headers={**headers, "Range": "bytes=2000-"})
+    assert r.status_code == 206 and r.content == content[2000:]
+    # A stale If-Range gets the whole photo
+    r = client.get(url, headers={**headers, "Range": "bytes=0-9", "If-Range": '"other"'})
+    assert r.status_code == 200 and r.content == content
+    r = client.get(url, headers={**headers, "Range": f"bytes={len(content)}-"})
+    assert r.status_code == 416
+    assert r.headers["content-range"] == f"bytes */{len(content)}"
+
+
+def test_thumbnails_are_rendered_once_without_exif(
+    client: TestClient, db: Session, storage: LocalStorage, tmp_path: Path
+) -> None:
+    Image = pytest.importorskip("PIL.Image")
+    thumbnails = ThumbnailCache(tmp_path / "thumbnails", workers=1, quality=80)
+    main_app.dependency_overrides[get_thumbnails] = lambda: thumbnails
+    try:
+        # A landscape shot the camera tagged as rotated, with a GPS position
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x8825] = {1: "N"}
+        original = io.BytesIO()
+        Image.new("RGB", (2000, 1000), "red").save(original, "JPEG", exif=exif)
+        user = _user(db)
+        digest = _store(db, storage, tmp_path, original.getvalue(), "image/jpeg", user)
+        headers = get_auth_headers(user)
+
+        r = client.get(f"/api/v1/photos/{digest}/thumbnails/small", headers=headers)
+        assert r.status_code == 200, r.text
+        assert r.headers["content-type"] == "image/jpeg"
+        thumbnail = Image.open(io.BytesIO(r.content))
+        assert thumbnail.size == (80, 160)
+        assert not thumbnail.getexif()
+
+        rendered = thumbnails.path(digest, 160)
+        assert rendered.exists()
+        mtime = rendered.stat().st_mtime_ns
+        r = client.get(f"/api/v1/photos/{digest}/thumbnails/small", headers=headers)
+        assert r.status_code == 200 and rendered.stat().st_mtime_ns == mtime
+        assert client.get(f"/api/v1/photos/{digest}/thumbnails/huge", headers=headers).status_code == 404
+    finally:
+        thumbnails.shutdown()
+        main_app.dependency_overrides.pop(get_thumbnails)
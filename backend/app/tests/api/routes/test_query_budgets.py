@@ -0,0 +1,10 @@
+from fastapi.routing import APIRoute
+
+from app.main import app
+from app.tests.utils.query_budget import ROUTE_BUDGETS
+
+
+def test_every_route_has_a_query_budget() -> None:
+    endpoints = {route.endpoint.__name__ for route in app.routes if isinstance(route, APIRoute)}
+    assert sorted(endpoints - ROUTE_BUDGETS.keys()) == []
+    assert sorted(ROUTE_BUDGETS.keys() - endpoints) == []
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+from sqlmodel import Session, select
+
+from app import crud
+from app.crud.sync import encode_token
+from app.models import (
+    AssignedQuestion,
+    AssignedQuestionUpdate,
+    AuditAssignment,
+    QuestionType,
+    SyncTombstone,
+    UserAreaAssignmentLink,
+    UserRole,
+)
+from app.tests.conftest import engine, get_auth_headers
+from app.tests.utils.factories import (
+    create_random_area,
+    create_random_audit_assignment,
+    create_random_audit_template,
+    create_random_company,
+    create_random_user,
+)
+
+# Old enough to predate anything a test writes, recent enough to be within tombstone retention
+LONG_AGO = datetime.utcnow() - timedelta(days=1)
+
+
+def _setup(db: Session) -> dict[str, object]:
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    auditor = create_random_user(db, role=UserRole.AUDITOR, company_id=company.id)
+    area, other_area = create_random_area(db, company_id=company.id), create_random_area(db, company_id=company.id)
+    db.add(UserAreaAssignmentLink(user_id=auditor.id, area_id=area.id))
+    template = create_random_audit_template(db, creator_id=admin.id)
+    visible = create_random_audit_assignment(
+        db, audit_template_id=template.id, company_id=company.id, creator_id=admin.id, area_id=area.id
+    )
+    hidden = create_random_audit_assignment(
+        db, audit_template_id=template.id, company_id=company.id, creator_id=admin.id, area_id=other_area.id
+    )
+    questions = [
+        AssignedQuestion(
+            audit_assignment_id=visible.id, text=f"Question {n}", question_type=QuestionType.YES_NO, order=n, is_mandatory=True
+        )
+        for n in range(3)
+    ]
+    db.add_all(questions)
+    db.commit()
+    # Plus the ones copied from the template
+    questions = list(db.exec(select(AssignedQuestion).where(AssignedQuestion.audit_assignment_id == visible.id)))
+    return {"auditor": auditor, "area": area, "visible": visible, "hidden": hidden, "questions": questions}
+
+
+def _backdate(db: Session) -> str:
+    """Age every row so changes made next are the only ones past the returned token."""
+    for model in (AuditAssignment, AssignedQuestion):
+        db.exec(update(model).values(updated_at=LONG_AGO))  # type: ignore[call-overload]
+    db.exec(update(UserAreaAssignmentLink).values(assigned_at=LONG_AGO))  # type: ignore[call-overload]
+    db.commit()
+    return encode_token(LONG_AGO + timedelta(minutes=1))
+
+
+def _sync(client: TestClient, headers: dict[str, str], token: str | None = None) -> dict:  # type: ignore[type-arg]
+    params = {"since": token} if token else {}
+    response = client.get("/api/v1/sync/", headers=headers, params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _ops(content: dict) -> set[tuple[str, str, str]]:  # type: ignore[type-arg]
+    return {(change["op"], change["type"], change["id"]) for change in content["changes"]}
+
+
+def test_sync_snapshot_is_scoped_to_the_auditors_areas(client: TestClient, db: Session) -> None:
+    data = _setup(db)
+    content = _sync(client, get_auth_headers(data["auditor"]))  # type: ignore[arg-type]
+
+    assert content["reset"] is True
+    assert _ops(content) == {
+        ("upsert", "assignment", str(data["visible"].id)),  # type: ignore[attr-defined]
+        *(("upsert", "question", str(q.id)) for q in data["questions"]),  # type: ignore[attr-defined]
+    }
+    assignment = next(c for c in content["changes"] if c["type"] == "assignment")
+    assert "id" not in assignment["data"]
+    assert "audit_template" not in assignment["data"]
+
+
+def test_sync_noop_is_a_single_query(client: TestClient, db: Session) -> None:
+    data = _setup(db)
+    token = _backdate(db)
+    headers = get_auth_headers(data["auditor"])  # type: ignore[arg-type]
+
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, *args):  # type: ignore[no-untyped-def]
+        if "sync_tombstone" in statement or "audit_assignment" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        content = _sync(client, headers, token)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert content == {"token": token, "reset": False, "changes": []}
+    assert len(statements) == 1
+
+
+def test_sync_delta_and_tombstones(client: TestClient, db: Session) -> None:
+    data = _setup(db)
+    token = _backdate(db)
+    headers = get_auth_headers(data["auditor"])  # type: ignore[arg-type]
+    edited, removed = data["questions"][:2]  # type: ignore[index]
+    visible = data["visible"]
+
+    crud.assigned_question.update(session=db, db_question=edited, question_in=AssignedQuestionUpdate(text="Edited"))
+    crud.assigned_question.remove(session=db, question_id=removed.id, assignment_id=visible.id)  # type: ignore[attr-defined]
+    db.commit()
+
+    content = _sync(client, headers, token)
+    assert content["reset"] is False
+    assert content["token"] != token
+    assert _ops(content) == {("upsert", "question", str(edited.id)), ("delete", "question", str(removed.id))}
+    # Deletes come first so applying the stream in order converges
+    assert content["changes"][0]["op"] == "delete"
+
+    # Losing the area link drops the area on the device, and only for that auditor
+    link = db.get(UserAreaAssignmentLink, (data["auditor"].id, data["area"].id))  # type: ignore[attr-defined]
+    db.delete(link)
+    db.commit()
+    area_id = str(data["area"].id)  # type: ignore[attr-defined]
+    assert ("delete", "area", area_id) in _ops(_sync(client, headers, token))
+    other_auditor = create_random_user(db, role=UserRole.AUDITOR, company_id=visible.company_id)  # type: ignore[attr-defined]
+    db.commit()
+    assert ("delete", "area", area_id) not in _ops(_sync(client, get_auth_headers(other_auditor), token))
+
+    # Deleting the assignment needs no tombstones for its questions
+    crud.audit_assignment.remove(session=db, assignment_id=visible.id)  # type: ignore[attr-defined]
+    db.commit()
+    tombstones = db.exec(select(SyncTombstone.entity_type).where(SyncTombstone.deleted_at > LONG_AGO)).all()
+    assert sorted(tombstones) == ["area", "assignment", "question"]
+
+
+def test_sync_old_or_invalid_token(client: TestClient, db: Session) -> None:
+    data = _setup(db)
+    headers = get_auth_headers(data["auditor"])  # type: ignore[arg-type]
+    assert _sync(client, headers, encode_token(datetime(2000, 1, 1)))["reset"] is True
+    assert client.get("/api/v1/sync/", headers=headers, params={"since": "nope"}).status_code == 400
@@ -8,7 +8,7 @@ from sqlmodel import Session, select
 from app import crud
 from app.core.config import settings
 from app.core.security import verify_password
-from app.models import Company, CompanyCreate, User, UserCreate, UserRole, UserAreaAssignmentLink, Area, AreaCreate
+from app.models import Company, CompanyCreate, User, UserCreate, UserRole, UserAreaAssignmentLink, Area, AreaCreate, UsersPublic
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -618,3 +618,64 @@ def test_remove_user_from_area_not_assigned(
     )
     assert response.status_code == 404
     assert response.json()["detail"] == "User is not assigned to this area."
+
+
+def _copy_based_obfuscation(user: User, viewer: User) -> dict:
+    # What the removed copy-based obfuscate_data_for_demo_company rendered
+    from app.models import UserPublic
+
+    public = UserPublic.model_validate(user).model_dump(mode="json")
+    if viewer.is_superuser or viewer.role == UserRole.ADMIN:
+        return public
+    if user.company and user.company.is_demo:
+        public.update(email="hidden", full_name="Demo User")
+    return public
+
+
+def test_demo_obfuscation_matches_copy_based_behaviour(db: Session) -> None:
+    import json
+
+    from app.api.deps import get_demo_context
+    from app.api.serialization import dump_public
+    from app.models import UserPublic
+    from app.tests.utils.factories import create_random_company, create_random_user
+
+    demo = create_random_company(db, is_demo=True)
+    regular = create_random_company(db)
+    viewers = [
+        create_random_user(db, role=UserRole.ADMIN, company_id=regular.id),
+        create_random_user(db, role=UserRole.AUDITOR, company_id=demo.id),
+        create_random_user(db, role=UserRole.USER, company_id=regular.id),
+    ]
+    users = [
+        create_random_user(db, role=UserRole.AUDITOR, company_id=demo.id),
+        create_random_user(db, role=UserRole.USER, company_id=regular.id),
+        create_random_user(db, role=UserRole.ADMIN),
+    ]
+
+    for viewer in viewers:
+        context = get_demo_context(db, viewer)
+        for user in users:
+            expected = _copy_based_obfuscation(user, viewer)
+            assert json.loads(dump_public(UserPublic, user, context=context)) == expected
+        expected_list = [_copy_based_obfuscation(user, viewer) for user in users]
+        listed = json.loads(dump_public(UsersPublic, {"data": users, "count": len(users)}, context=context))
+        assert listed["data"] == expected_list
+
+    # Serializing must not have touched (or copied) the rows
+    assert users[0].email != "hidden"
+
+
+def test_read_user_me_hides_demo_identity(client: TestClient, db: Session) -> None:
+    from app.tests.conftest import get_auth_headers
+    from app.tests.utils.factories import create_random_company, create_random_user
+
+    demo = create_random_company(db, is_demo=True)
+    auditor = create_random_user(db, role=UserRole.AUDITOR, company_id=demo.id)
+    db.commit()
+
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=get_auth_headers(auditor))
+    assert r.status_code == 200
+    assert r.json()["email"] == "hidden"
+    assert r.json()["full_name"] == "Demo User"
+    assert r.json()["id"] == str(auditor.id)
@@ -0,0 +1,28 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.models import UserRole
+from app.tests.conftest import get_auth_headers
+from app.tests.utils.factories import create_random_user
+
+
+def test_memory_endpoints_are_for_superusers_only(client: TestClient, db: Session) -> None:
+    admin = create_random_user(db, role=UserRole.ADMIN)
+    superuser = create_random_user(db, role=UserRole.ADMIN, is_superuser=True)
+    db.commit()
+
+    # Snapshots show whatever the traced code held in memory, secrets included
+    assert client.get("/api/v1/utils/memory/", headers=get_auth_headers(admin)).status_code == 403
+    assert client.post("/api/v1/utils/memory/start/", headers=get_auth_headers(admin)).status_code == 403
+    r = client.get("/api/v1/utils/memory/", headers=get_auth_headers(superuser))
+    assert r.status_code == 200, r.text
+
+
+def test_slow_queries_are_for_superusers_only(client: TestClient, db: Session) -> None:
+    admin = create_random_user(db, role=UserRole.ADMIN)
+    superuser = create_random_user(db, role=UserRole.ADMIN, is_superuser=True)
+    db.commit()
+
+    assert client.get("/api/v1/utils/slow-queries/", headers=get_auth_headers(admin)).status_code == 403
+    r = client.get("/api/v1/utils/slow-queries/", headers=get_auth_headers(superuser))
+    assert r.status_code == 200, r.text
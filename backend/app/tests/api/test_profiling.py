@@ -0,0 +1,65 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.api.deps import get_db
+from app.api.profiling import ProfilingMiddleware
+from app.models import User, UserRole
+from app.tests.conftest import get_auth_headers, override_get_db
+from app.tests.utils.factories import create_random_company, create_random_user
+
+
+def busy_endpoint() -> dict[str, int]:
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    with next(override_get_db()) as session:
+        return {"users": len(session.exec(select(User.id)).all())}
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.dependency_overrides[get_db] = override_get_db
+    app.add_api_route("/busy", busy_endpoint)
+    app.add_middleware(ProfilingMiddleware)
+    return TestClient(app)
+
+
+def _user(db: Session, *, is_superuser: bool) -> User:
+    company = create_random_company(db)
+    user = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    user.is_superuser = is_superuser
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_superuser_gets_a_speedscope_profile_of_threadpool_work(db: Session) -> None:
+    headers = {**get_auth_headers(_user(db, is_superuser=True)), "X-Profile": "1"}
+    response = _client().get("/busy", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["x-profiled-status"] == "200"
+    assert "speedscope.json" in response.headers["content-disposition"]
+    document = response.json()
+    names = [frame["name"] for frame in document["shared"]["frames"]]
+    # The sync endpoint runs in the threadpool, not on the event loop
+    (worker,) = [
+        profile
+        for profile in document["profiles"]
+        if any(names[frame] == "busy_endpoint" for sample in profile["samples"] for frame in sample)
+    ]
+    assert worker["name"] != "event loop"
+    assert sum(worker["weights"]) >= 40
+    sql = document["profiles"][-1]
+    assert sql["name"] == "SQL: 1 queries"
+    assert any(names[sample[-1]].startswith("SELECT user.id") for sample in sql["samples"])
+
+
+def test_flag_is_ignored_for_other_users(db: Session) -> None:
+    client = _client()
+    headers = get_auth_headers(_user(db, is_superuser=False))
+    assert client.get("/busy", params={"profile": "1"}, headers=headers).json() == {"users": 1}
+    assert client.get("/busy", params={"profile": "1"}).json() == {"users": 1}
@@ -99,3 +99,8 @@ def normal_user(db: Session, test_company: Company) -> User:
 @pytest.fixture
 def normal_user_token_headers(normal_user: User) -> dict[str, str]:
     return get_auth_headers(normal_user)
+
+@pytest.fixture
+def strict_n_plus_one(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Fail requests that repeat a statement shape QUERY_N_PLUS_ONE_THRESHOLD times."""
+    monkeypatch.setattr(settings, "QUERY_N_PLUS_ONE_STRICT", True)
@@ -0,0 +1,95 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, CompressionStats, negotiate
+
+BODY = "audit " * 1000
+
+
+def _client(stats: CompressionStats, **options: int) -> TestClient:
+    async def text(request):  # type: ignore[no-untyped-def]
+        return PlainTextResponse(BODY)
+
+    async def small(request):  # type: ignore[no-untyped-def]
+        return PlainTextResponse("ok")
+
+    async def image(request):  # type: ignore[no-untyped-def]
+        return Response(BODY.encode(), media_type="image/jpeg")
+
+    async def stream(request):  # type: ignore[no-untyped-def]
+        return StreamingResponse(iter([BODY, BODY]), media_type="text/plain")
+
+    app = Starlette(
+        routes=[Route(f"/{f.__name__}", f) for f in (text, small, image, stream)]
+    )
+    app.add_middleware(CompressionMiddleware, stats=stats, **options)
+    return TestClient(app)
+
+
+def test_negotiate() -> None:
+    assert negotiate("gzip, deflate", ["br", "gzip"]) == "gzip"
+    assert negotiate("gzip;q=0.5, br", ["br", "gzip"]) == "br"
+    assert negotiate("br;q=0.5, gzip", ["br", "gzip"]) == "gzip"
+    assert negotiate("*", ["br", "gzip"]) == "br"
+    assert negotiate("gzip;q=0, *", ["gzip"]) is None
+    assert negotiate("", ["gzip"]) is None
+
+
+def test_compresses_large_bodies_and_records_savings() -> None:
+    stats = CompressionStats()
+    r = _client(stats).get("/text", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert r.text == BODY
+    gzip_stats = stats.as_dict()["encodings"]["gzip"]
+    assert gzip_stats["responses"] == 1
+    assert gzip_stats["bytes_in"] == len(BODY)
+    assert gzip_stats["bytes_saved"] > 0
+
+
+def test_compresses_in_a_thread_above_threshold() -> None:
+    stats = CompressionStats()
+    client = _client(stats, thread_threshold=1)
+    r = client.get("/text", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.text == BODY
+
+
+@pytest.mark.parametrize("path", ["/small", "/image", "/stream"])
+def test_skips_small_precompressed_and_streaming_bodies(path: str) -> None:
+    stats = CompressionStats()
+    r = _client(stats).get(path, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert stats.skipped == 1
+    assert stats.as_dict()["encodings"] == {}
+
+
+def test_identity_when_client_accepts_nothing() -> None:
+    stats = CompressionStats()
+    r = _client(stats).get("/text", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+    assert r.text == BODY
+
+
+def test_gzip_output_is_deterministic() -> None:
+    encoders = compression.make_encoders(gzip_level=6, brotli_quality=4, zstd_level=3)
+    assert encoders["gzip"](BODY.encode()) == encoders["gzip"](BODY.encode())
+    assert gzip.decompress(encoders["gzip"](BODY.encode())) == BODY.encode()
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli not installed")
+def test_prefers_brotli_when_available() -> None:
+    r = _client(CompressionStats()).get("/text", headers={"Accept-Encoding": "gzip, br"})
+    assert r.headers["content-encoding"] == "br"
+
+
+@pytest.mark.skipif(compression.zstandard is None, reason="zstandard not installed")
+def test_zstd_when_requested() -> None:
+    encoders = compression.make_encoders(gzip_level=6, brotli_quality=4, zstd_level=3)
+    assert "zstd" in encoders
@@ -0,0 +1,101 @@
+import os
+import time
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core.config import settings
+from app.core.memory import (
+    MemoryControl,
+    MemoryMiddleware,
+    SnapshotNotFound,
+    SnapshotOnAnotherWorker,
+    memory_profiler,
+    route_memory,
+)
+
+_retained: list[bytes] = []
+
+
+def _allocate(request):  # type: ignore[no-untyped-def]
+    scratch = [bytes(1024) for _ in range(1024)]
+    _retained.append(bytes(64 * 1024))
+    return PlainTextResponse(str(len(scratch)))
+
+
+@pytest.fixture
+def tracing() -> Generator[None, None, None]:
+    memory_profiler.start(5)
+    route_memory.clear()
+    yield
+    memory_profiler.stop()
+    route_memory.clear()
+    _retained.clear()
+
+
+def test_snapshot_diff_points_at_the_allocation_site(tracing: None) -> None:
+    before = memory_profiler.take_snapshot()
+    kept = [bytearray(1000) for _ in range(200)]
+    after = memory_profiler.take_snapshot()
+
+    growth = memory_profiler.diff(after["id"], before["id"], limit=5, group_by="lineno")
+    assert any("test_memory.py" in entry["site"][0] and entry["size_diff"] >= 200_000 for entry in growth)
+    assert memory_profiler.top(after["id"], limit=3, group_by="filename")
+    assert [s["id"] for s in memory_profiler.status()["snapshots"]] == [before["id"], after["id"]]
+    assert before["id"].startswith(f"{os.getpid()}-")
+    with pytest.raises(SnapshotNotFound):
+        memory_profiler.top(f"{os.getpid()}-0", limit=1, group_by="lineno")
+    with pytest.raises(SnapshotOnAnotherWorker):
+        memory_profiler.top(f"{os.getpid() + 1}-1", limit=1, group_by="lineno")
+    del kept
+
+
+def test_middleware_records_peak_allocation_per_route(tracing: None, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "MEMORY_ROUTE_SAMPLE_RATIO", 1.0)
+    app = Starlette(routes=[Route("/reports/{report_id}", _allocate)])
+    app.add_middleware(MemoryMiddleware)
+    assert TestClient(app).get("/reports/1").status_code == 200
+
+    stats = route_memory.as_dict()["GET /reports/{report_id}"]
+    assert stats["samples"] == 1
+    assert stats["max_peak_bytes"] >= 1024 * 1024
+    assert stats["mean_retained_bytes"] >= 64 * 1024
+
+
+def test_middleware_does_nothing_while_not_tracing() -> None:
+    app = Starlette(routes=[Route("/reports/{report_id}", _allocate)])
+    app.add_middleware(MemoryMiddleware)
+    assert TestClient(app).get("/reports/1").status_code == 200
+    assert route_memory.as_dict() == {}
+    _retained.clear()
+
+
+def test_workers_follow_the_control_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "MEMORY_CONTROL_FILE", str(tmp_path / "memory-control.json"))
+    monkeypatch.setattr(settings, "MEMORY_CONTROL_POLL_SECONDS", 0.0)
+    app = Starlette(routes=[Route("/reports/{report_id}", _allocate)])
+    app.add_middleware(MemoryMiddleware)
+    client = TestClient(app)
+    # Another worker, which served the request to /utils/memory/
+    elsewhere = MemoryControl()
+    try:
+        elsewhere.publish(tracing=True, frames=3)
+        client.get("/reports/1")
+        assert memory_profiler.status()["frames"] == 3
+
+        elsewhere.publish(tracing=True, frames=3, snapshot_at=time.time())
+        client.get("/reports/1")
+        client.get("/reports/1")
+        assert len(memory_profiler.status()["snapshots"]) == 1
+
+        elsewhere.publish(tracing=False)
+        client.get("/reports/1")
+        assert memory_profiler.status()["tracing"] is False
+    finally:
+        memory_profiler.stop()
+        _retained.clear()
@@ -0,0 +1,76 @@
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core.config import settings
+from app.core.metrics import InstrumentedQueuePool, MetricsMiddleware, metrics_endpoint, track_job
+
+
+def _sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _client() -> TestClient:
+    app = Starlette(
+        routes=[
+            Route("/items/{item_id}", lambda request: PlainTextResponse(request.path_params["item_id"])),
+            Route("/metrics", metrics_endpoint),
+        ]
+    )
+    app.add_middleware(MetricsMiddleware)
+    return TestClient(app)
+
+
+def test_latency_is_recorded_per_route_template() -> None:
+    client = _client()
+    labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    before = _sample("http_request_duration_seconds_count", **labels)
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/items/2").status_code == 200
+    assert client.get("/nothing").status_code == 404
+
+    assert _sample("http_request_duration_seconds_count", **labels) == before + 2
+    assert _sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+    assert _sample("http_requests_in_progress") == 0
+    assert _sample("threadpool_threads_capacity") > 0
+
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/items/{item_id}",status="200"}' in body
+
+
+def test_metrics_token_is_required_when_set(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-me")
+    client = _client()
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-me"}).status_code == 200
+
+
+def test_pool_reports_checkouts_and_overflow() -> None:
+    engine = create_engine("sqlite://", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=1)
+    checkouts = _sample("db_pool_checkouts_total")
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text("SELECT 1"))
+        second.execute(text("SELECT 1"))
+        assert _sample("db_pool_connections_checked_out") == 2
+        assert _sample("db_pool_overflow_connections") == 1
+    assert _sample("db_pool_checkouts_total") == checkouts + 2
+    assert _sample("db_pool_connections_checked_out") == 0
+    engine.dispose()
+
+
+def test_track_job_records_outcome_and_items() -> None:
+    succeeded = _sample("background_job_runs_total", job="test_job", outcome="succeeded")
+    items = _sample("background_job_items_total", job="test_job")
+    with track_job("test_job") as job:
+        job.items = 3
+    with pytest.raises(RuntimeError), track_job("test_job"):
+        raise RuntimeError("boom")
+
+    assert _sample("background_job_runs_total", job="test_job", outcome="succeeded") == succeeded + 1
+    assert _sample("background_job_runs_total", job="test_job", outcome="failed") >= 1
+    assert _sample("background_job_items_total", job="test_job") == items + 3
+    assert _sample("background_job_last_success_timestamp_seconds", job="test_job") > 0
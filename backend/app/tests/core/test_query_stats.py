@@ -0,0 +1,69 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, col, select
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core.config import settings
+from app.core.query_stats import NPlusOneError, QueryStatsMiddleware, statement_shape, track_queries
+from app.models import User
+from app.tests.conftest import engine
+
+
+def _lookup_each_user(request):  # type: ignore[no-untyped-def]
+    with Session(engine) as session:
+        ids = session.exec(select(User.id)).all()
+        for user_id in ids:
+            session.exec(select(User).where(User.id == user_id)).one()
+    return PlainTextResponse(str(len(ids)))
+
+
+def _client() -> TestClient:
+    app = Starlette(routes=[Route("/users", _lookup_each_user)])
+    app.add_middleware(QueryStatsMiddleware)
+    return TestClient(app)
+
+
+def test_statement_shape_ignores_in_list_length() -> None:
+    assert statement_shape("SELECT 1 WHERE id IN (?, ?, ?)") == statement_shape("SELECT 1 WHERE id IN (?)")
+    assert statement_shape("SELECT 1\n  WHERE id IN (%(id_1)s, %(id_2)s)") == "SELECT 1 WHERE id IN (?)"
+
+
+def test_track_queries_counts_and_flags_repeated_shapes(db: Session) -> None:
+    with track_queries() as outer:
+        db.exec(select(User).where(col(User.email).in_(["a@example.com", "b@example.com"]))).all()
+        with track_queries() as inner:
+            for n in range(3):
+                db.exec(select(User).where(User.email == f"{n}@example.com")).all()
+    assert inner.count == 3
+    assert outer.count == 4
+    assert list(outer.repeated(3).values()) == [3]
+    assert outer.slowest_statement is not None
+
+
+def test_middleware_reports_server_timing(admin_user_token_headers: dict[str, str], client: TestClient, db: Session) -> None:
+    db.commit()
+    response = client.get(f"{settings.API_V1_STR}/users/me", headers=admin_user_token_headers)
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    # /users/me is a sync route, so this also covers queries run in the threadpool
+    assert timing.startswith("db;dur=") and 'desc="0 queries"' not in timing
+
+
+def test_strict_mode_fails_n_plus_one_loops(db: Session, strict_n_plus_one: None) -> None:
+    for n in range(settings.QUERY_N_PLUS_ONE_THRESHOLD):
+        db.add(User(email=f"n{n}@example.com", hashed_password="x"))
+    db.commit()
+    with pytest.raises(NPlusOneError):
+        _client().get("/users")
+
+
+def test_n_plus_one_is_logged(db: Session, caplog: pytest.LogCaptureFixture) -> None:
+    for n in range(settings.QUERY_N_PLUS_ONE_THRESHOLD):
+        db.add(User(email=f"n{n}@example.com", hashed_password="x"))
+    db.commit()
+    response = _client().get("/users")
+    assert response.status_code == 200
+    assert f'desc="{settings.QUERY_N_PLUS_ONE_THRESHOLD + 1} queries"' in response.headers["server-timing"]
+    assert any("n_plus_one" in record.getMessage() for record in caplog.records)
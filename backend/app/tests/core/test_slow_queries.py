@@ -0,0 +1,97 @@
+import json
+import os
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core import slow_queries
+from app.core.config import settings
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.slow_queries import parameters_shape, redact_plan, slow_query_log
+
+
+@pytest.fixture
+def slow_engine(monkeypatch: pytest.MonkeyPatch) -> Generator[Engine, None, None]:
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0.0)
+    # The route runs in the threadpool, so one connection shared across threads
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    slow_queries.install(engine)
+    slow_query_log.clear()
+    yield engine
+    engine.dispose()
+    slow_query_log.clear()
+
+
+def test_parameters_shape_keeps_types_not_values() -> None:
+    assert parameters_shape({"email_1": "a@example.com", "limit_1": 10}) == {"email_1": "str", "limit_1": "int"}
+    assert parameters_shape(("x", None)) == ["str", "NoneType"]
+    assert parameters_shape([{"id": 1}, {"id": 2}]) == {"rows": 2, "row": {"id": "int"}}
+
+
+def test_redacted_plan_keeps_its_shape_not_the_parameters() -> None:
+    plan = "\n".join(
+        [
+            "Index Scan using ix_user_email on \"user\"  (cost=0.28..8.29 rows=1 width=72) (actual time=0.02..0.02 rows=1 loops=1)",
+            "  Index Cond: ((email)::text = 'a@example.com'::text)",
+            "  Filter: ((failed_logins > 3) AND (company_id = ANY ('{7,8}'::integer[])))",
+            "  Rows Removed by Filter: 12",
+            "Planning Time: 0.10 ms",
+        ]
+    )
+    assert redact_plan(plan).splitlines() == [
+        "Index Scan using ix_user_email on \"user\"  (cost=0.28..8.29 rows=1 width=72) (actual time=0.02..0.02 rows=1 loops=1)",
+        "  Index Cond: ((email)::text = '?'::text)",
+        "  Filter: ((failed_logins > ?) AND (company_id = ANY ('?'::integer[])))",
+        "  Rows Removed by Filter: 12",
+        "Planning Time: 0.10 ms",
+    ]
+
+
+def test_slow_statements_are_ranked_by_total_time_with_their_route(slow_engine: Engine) -> None:
+    def read_items(request):  # type: ignore[no-untyped-def]
+        with slow_engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT :n"), {"n": 1}).all()
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/items/{item_id}", read_items)])
+    app.add_middleware(QueryStatsMiddleware)
+    assert TestClient(app).get("/items/1").status_code == 200
+    with slow_engine.connect() as conn:
+        conn.execute(text("SELECT 2")).all()
+
+    top = slow_query_log.top(10)
+    by_statement = {entry["statement"]: entry for entry in top}
+    assert by_statement["SELECT ?"]["count"] == 3
+    assert by_statement["SELECT ?"]["routes"] == {"GET /items/{item_id}": 3}
+    assert by_statement["SELECT 2"]["routes"] == {"-": 1}
+    assert by_statement["SELECT ?"]["plan"] is None
+    totals = [entry["total_ms"] for entry in top]
+    assert totals == sorted(totals, reverse=True)
+    assert len(slow_query_log.top(1)) == 1
+
+
+def test_totals_of_all_workers_are_added_up(slow_engine: Engine, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "SLOW_QUERY_STATS_DIR", str(tmp_path))
+    other_worker = {"SELECT ?": {"count": 2, "total_seconds": 5.0, "max_seconds": 4.0, "routes": {"GET /a": 2}, "plan": "Seq Scan"}}
+    (tmp_path / "slow-queries.1.json").write_text(json.dumps(other_worker))
+    (tmp_path / "slow-queries.2.json").write_text('{"SELECT')
+
+    with slow_engine.connect() as conn:
+        conn.execute(text("SELECT :n"), {"n": 1}).all()
+    [entry] = [entry for entry in slow_query_log.top(10) if entry["statement"] == "SELECT ?"]
+    assert entry["count"] == 3
+    assert entry["routes"] == {"GET /a": 2, "-": 1}
+    assert entry["max_ms"] == 4000 and entry["plan"] == "Seq Scan"
+
+    slow_query_log.flush()
+    written = json.loads((tmp_path / f"slow-queries.{os.getpid()}.json").read_text())
+    assert written["SELECT ?"]["count"] == 1
@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core import tracing
+from app.core.config import settings
+from app.models import User
+from app.tests.conftest import engine
+
+pytest.importorskip("opentelemetry.sdk")
+
+
+def _count_users() -> int:
+    with Session(engine) as session:
+        return len(session.exec(select(User.id)).all())
+
+
+def test_traced_is_a_no_op_when_tracing_is_off() -> None:
+    assert settings.TRACING_EXPORTER == "none"
+    assert tracing.traced(_count_users) is _count_users
+
+
+def test_spans_nest_route_function_and_sql(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "TRACING_EXPORTER", "file")
+    monkeypatch.setattr(settings, "TRACING_FILE", str(path))
+    count_users = tracing.traced(_count_users, name="count_users")
+
+    app = Starlette(routes=[Route("/items/{item_id}", lambda request: PlainTextResponse(str(count_users())))])
+    app.add_middleware(tracing.TracingMiddleware)
+    tracing.setup_tracing("test")
+    try:
+        response = TestClient(app).get("/items/1")
+    finally:
+        tracing.shutdown_tracing()
+    assert response.status_code == 200
+
+    spans = {span["name"]: span for span in map(json.loads, path.read_text().splitlines())}
+    server, function, query = spans["GET /items/{item_id}"], spans["count_users"], spans["SELECT"]
+    assert server["attributes"]["http.response.status_code"] == 200
+    assert function["parent_id"] == server["context"]["span_id"]
+    assert query["parent_id"] == function["context"]["span_id"]
+    assert query["attributes"]["db.statement"].startswith("SELECT user.id")
+    assert len({span["context"]["trace_id"] for span in spans.values()}) == 1
@@ -0,0 +1,92 @@
+from datetime import date, datetime
+
+from sqlmodel import Session, select
+
+from app import crud
+from app.models import AuditAssignment, AuditPeriodicity, Company, User
+from app.recurrence import add_months, advance_due_date, iter_occurrences
+from app.tests.utils.factories import create_random_audit_assignment, create_random_audit_template
+
+
+def test_add_months_clamps_to_month_end() -> None:
+    assert add_months(date(2024, 1, 31), 1) == date(2024, 2, 29)
+    assert add_months(date(2023, 1, 31), 1) == date(2023, 2, 28)
+    assert add_months(date(2024, 11, 15), 3) == date(2025, 2, 15)
+
+
+def test_advance_due_date_rules() -> None:
+    start = date(2024, 2, 29)
+    assert advance_due_date(start, AuditPeriodicity.DAILY) == date(2024, 3, 1)
+    assert advance_due_date(start, AuditPeriodicity.WEEKLY) == date(2024, 3, 7)
+    assert advance_due_date(start, AuditPeriodicity.MONTHLY) == date(2024, 3, 29)
+    assert advance_due_date(start, AuditPeriodicity.QUARTERLY) == date(2024, 5, 29)
+    assert advance_due_date(start, AuditPeriodicity.ANNUALLY) == date(2025, 2, 28)
+
+
+def test_advance_due_date_rejects_one_time() -> None:
+    try:
+        advance_due_date(date(2024, 1, 1), AuditPeriodicity.ONE_TIME)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("ONE_TIME must not recur")
+
+
+def test_iter_occurrences_only_yields_window() -> None:
+    occurrences = list(
+        iter_occurrences(
+            date(2024, 1, 1),
+            AuditPeriodicity.WEEKLY,
+            window_from=date(2024, 3, 1),
+            window_to=date(2024, 3, 31),
+        )
+    )
+    assert occurrences == [date(2024, 3, 4), date(2024, 3, 11), date(2024, 3, 18), date(2024, 3, 25)]
+
+
+def test_iter_occurrences_matches_stepwise_advance() -> None:
+    current = date(2024, 1, 31)
+    stepped = []
+    while current <= date(2025, 1, 31):
+        stepped.append(current)
+        current = advance_due_date(current, AuditPeriodicity.MONTHLY)
+    lazily = list(
+        iter_occurrences(
+            date(2024, 1, 31),
+            AuditPeriodicity.MONTHLY,
+            window_from=date(2024, 1, 1),
+            window_to=date(2025, 1, 31),
+        )
+    )
+    assert lazily == stepped
+
+
+def test_materialize_due_recurring(db: Session, admin_user: User, test_company: Company) -> None:
+    template = create_random_audit_template(db, creator_id=admin_user.id)
+    series = create_random_audit_assignment(
+        db, audit_template_id=template.id, company_id=test_company.id, creator_id=admin_user.id
+    )
+    series.periodicity = AuditPeriodicity.DAILY
+    series.next_due_date = date(2024, 1, 1)
+    db.add(series)
+    db.flush()
+
+    created = crud.audit_assignment.materialize_due_recurring(session=db, as_of=date(2024, 1, 3))
+    assert created == 3
+
+    db.refresh(series)
+    assert series.next_due_date == date(2024, 1, 4)
+    occurrences = db.exec(
+        select(AuditAssignment).where(AuditAssignment.recurrence_source_id == series.id)
+    ).all()
+    assert sorted(o.due_date for o in occurrences) == [
+        datetime(2024, 1, 1),
+        datetime(2024, 1, 2),
+        datetime(2024, 1, 3),
+    ]
+    for occurrence in occurrences:
+        assert occurrence.periodicity is None
+        assert len(occurrence.assigned_questions) == len(series.assigned_questions)
+
+    # Re-running for the same day is a no-op
+    assert crud.audit_assignment.materialize_due_recurring(session=db, as_of=date(2024, 1, 3)) == 0
@@ -0,0 +1,84 @@
+import uuid
+from datetime import datetime
+
+from sqlmodel import Session, update
+
+from app import crud, template_cache
+from app.models import AuditTemplate, AuditTemplatePublic, QuestionTemplateUpdate, User
+from app.template_cache import TemplateCache
+from app.tests.utils.factories import create_random_audit_template
+
+
+def _public(name: str) -> AuditTemplatePublic:
+    return AuditTemplatePublic(
+        id=uuid.uuid4(),
+        name=name,
+        audit_type_definition_key="FIVE_S_AUDIT",
+        created_by_id=uuid.uuid4(),
+        created_at=datetime(2024, 1, 1),
+        updated_at=datetime(2024, 1, 1),
+    )
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    first, second, third = _public("a" * 200), _public("b" * 200), _public("c" * 200)
+    entry_size = 2 * len(first.model_dump_json())
+    cache = TemplateCache(max_bytes=2 * entry_size)
+    for template in (first, second):
+        cache.put(template.id, cache.version(template.id), template)
+    assert cache.get(first.id) is not None
+
+    cache.put(third.id, cache.version(third.id), third)
+    assert cache.get(second.id) is None
+    assert cache.get(first.id) is not None
+    assert cache.get(third.id) is not None
+    assert cache.size <= cache.max_bytes
+
+
+def test_cache_rejects_put_from_before_invalidation() -> None:
+    template = _public("stale")
+    cache = TemplateCache(max_bytes=1024 * 1024)
+    version = cache.version(template.id)
+    cache.invalidate(template.id)
+    cache.put(template.id, version, template)
+    assert cache.get(template.id) is None
+
+    cache.clear()
+    cache.put(template.id, version, template)
+    assert cache.get(template.id) is None
+
+
+def test_question_write_invalidates_cached_template(db: Session, admin_user: User) -> None:
+    template = create_random_audit_template(db, creator_id=admin_user.id)
+    cached = template_cache.get(db, template.id)
+    assert cached is not None
+    assert cached.template == AuditTemplatePublic.model_validate(template)
+    assert template_cache.get(db, template.id) is cached
+
+    question = cached.questions[0]
+    db_question = crud.question_template.get(session=db, question_id=question.id)
+    assert db_question is not None
+    crud.question_template.update(
+        session=db, db_question=db_question, question_in=QuestionTemplateUpdate(text="Is the floor clear?")
+    )
+
+    refreshed = template_cache.get(db, template.id)
+    assert refreshed is not None and refreshed is not cached
+    assert any(q.text == "Is the floor clear?" for q in refreshed.questions)
+
+
+def test_write_from_another_worker_is_not_served_stale(db: Session, admin_user: User) -> None:
+    template = create_random_audit_template(db, creator_id=admin_user.id)
+    cached = template_cache.get(db, template.id)
+    assert cached is not None
+
+    # As another worker would, without invalidating this worker's cache
+    db.execute(
+        update(AuditTemplate)
+        .where(AuditTemplate.id == template.id)  # type: ignore[arg-type]
+        .values(name="Renamed elsewhere", updated_at=datetime.utcnow())
+    )
+    db.commit()
+
+    refreshed = template_cache.get(db, template.id)
+    assert refreshed is not None and refreshed.template.name == "Renamed elsewhere"
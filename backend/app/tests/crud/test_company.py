@@ -93,3 +93,31 @@ def test_delete_company(db: Session, test_superuser: UserCreate) -> None:
 
     fetched_company = crud.company.get(session=db, company_id=company.id)
     assert fetched_company is None
+
+
+def test_demo_company_ids_are_cached_until_a_company_is_written(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    from app.demo_companies import demo_company_ids
+    from app.tests.utils.factories import create_random_company
+
+    demo = create_random_company(db, is_demo=True)
+    assert demo.id in demo_company_ids.get(db)
+    # Not written through crud, so the cached ids do not know about it yet
+    unseen = Company(name=random_lower_string(), is_demo=True)
+    db.add(unseen)
+    db.flush()
+    assert unseen.id not in demo_company_ids.get(db)
+
+    crud.company.update(session=db, db_company=demo, company_in=CompanyUpdate(is_demo=False))
+    assert demo_company_ids.get(db) >= {unseen.id}
+    assert demo.id not in demo_company_ids.get(db)
+
+    # A write no notification told this worker about is seen once the ttl has passed
+    crud.company.update(session=db, db_company=demo, company_in=CompanyUpdate(is_demo=True))
+    db.commit()
+    demo_company_ids.get(db)
+    unseen.is_demo = False
+    db.add(unseen)
+    db.commit()
+    assert unseen.id in demo_company_ids.get(db)
+    monkeypatch.setattr(demo_company_ids, "ttl", 0.0)
+    assert unseen.id not in demo_company_ids.get(db)
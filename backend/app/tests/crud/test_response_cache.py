@@ -0,0 +1,91 @@
+from collections.abc import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app import crud
+from app.models import Area, AreaUpdate, UserRole
+from app.response_cache import CacheBackend, MemoryBackend, RedisBackend, ResponseCache, response_cache
+from app.tests.conftest import get_auth_headers
+from app.tests.utils.factories import create_random_area, create_random_company, create_random_user
+from app.tests.utils.resp_server import resp_server
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request: pytest.FixtureRequest) -> Generator[CacheBackend, None, None]:
+    if request.param == "memory":
+        yield MemoryBackend(max_entries=100)
+    else:
+        with resp_server() as url:
+            yield RedisBackend(url)
+
+
+def test_backend_invalidates_by_tag(backend: CacheBackend) -> None:
+    backend.set("a", b"first", ttl=60, tags=["company:1", "area:1"])
+    backend.set("b", b"second", ttl=60, tags=["company:1"])
+    backend.set("c", b"third", ttl=60, tags=["company:2"])
+    assert backend.get("a") == b"first"
+
+    backend.invalidate_tags(["area:1"])
+    assert backend.get("a") is None
+    assert backend.get("b") == b"second"
+
+    backend.invalidate_tags(["company:1"])
+    assert backend.get("b") is None
+    assert backend.get("c") == b"third"
+
+    backend.clear()
+    assert backend.get("c") is None
+
+
+def test_memory_backend_evicts_least_recently_used() -> None:
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", b"1", ttl=60, tags=["t"])
+    backend.set("b", b"2", ttl=60, tags=["t"])
+    backend.get("a")
+    backend.set("c", b"3", ttl=60, tags=["t"])
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1"
+
+
+def test_unreachable_backend_degrades_to_misses() -> None:
+    cache = ResponseCache(RedisBackend("redis://127.0.0.1:1/0"), {"areas": 60})
+    cache.set("areas", "k", b"body", tags=["areas"])
+    assert cache.get("areas", "k") is None
+    assert cache.stats() == {"areas": {"hits": 0, "misses": 1, "hit_ratio": 0.0}}
+
+
+def test_read_areas_is_cached_until_an_area_changes(client: TestClient, db: Session) -> None:
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    area = create_random_area(db, company_id=company.id)
+    db.commit()
+    headers = get_auth_headers(admin)
+    url = f"/api/v1/companies/{company.id}/areas/"
+    hits = response_cache.hits["areas"]
+
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    assert client.get(url, headers=headers).json() == first.json()
+    assert response_cache.hits["areas"] == hits + 1
+
+    crud.area.update(session=db, db_area=area, area_in=AreaUpdate(name="Renamed area"))
+    db.commit()
+    refreshed = client.get(url, headers=headers).json()
+    assert [a["name"] for a in refreshed["data"]] == ["Renamed area"]
+
+
+def test_read_areas_misses_after_a_write_another_worker_made(client: TestClient, db: Session) -> None:
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    create_random_area(db, company_id=company.id)
+    db.commit()
+    headers = get_auth_headers(admin)
+    url = f"/api/v1/companies/{company.id}/areas/"
+    assert client.get(url, headers=headers).json()["count"] == 1
+
+    # Written without mark_stale, as a write served by another worker looks from here
+    db.add(Area(name="Added elsewhere", company_id=company.id))
+    db.commit()
+    assert client.get(url, headers=headers).json()["count"] == 2
@@ -0,0 +1,106 @@
+import socket
+from collections.abc import Generator
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.email_outbox import OutboxSender, SMTPPool, run_batch
+from app.models import EmailStatus
+from app.utils import render_email_template
+
+controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class RecordingHandler:
+    """Accepts every message except those to refused@example.com, noting the SMTP session each came on."""
+
+    def __init__(self) -> None:
+        self.messages: list[tuple[int, str, bytes]] = []
+
+    async def handle_RCPT(self, server: Any, session: Any, envelope: Any, address: str, rcpt_options: Any) -> str:
+        if address == "refused@example.com":
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server: Any, session: Any, envelope: Any) -> str:
+        for recipient in envelope.rcpt_tos:
+            self.messages.append((id(session), recipient, envelope.content))
+        return "250 Message accepted"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+@pytest.fixture
+def smtp_server(monkeypatch: pytest.MonkeyPatch) -> Generator[RecordingHandler, None, None]:
+    handler = RecordingHandler()
+    server = controller.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    server.start()
+    monkeypatch.setattr(settings, "SMTP_HOST", server.hostname)
+    monkeypatch.setattr(settings, "SMTP_PORT", server.port)
+    monkeypatch.setattr(settings, "SMTP_TLS", False)
+    monkeypatch.setattr(settings, "SMTP_USER", None)
+    monkeypatch.setattr(settings, "EMAILS_FROM_EMAIL", "noreply@example.com")
+    try:
+        yield handler
+    finally:
+        server.stop()
+
+
+def test_outbox_is_sent_in_batches_over_reused_connections(db: Session, smtp_server: RecordingHandler) -> None:
+    html = render_email_template(template_name="test_email.html", context={"project_name": "Audits", "email": "x"})
+    for n in range(5):
+        crud.email_outbox.enqueue(session=db, email_to=f"user{n}@example.com", subject="Hello", html_content=html)
+    refused = crud.email_outbox.enqueue(session=db, email_to="refused@example.com", subject="Hello", html_content=html)
+    db.commit()
+
+    sender = OutboxSender(SMTPPool(2))
+    try:
+        assert run_batch(db, sender) == 6
+        crud.email_outbox.enqueue(session=db, email_to="late@example.com", subject="Hello", html_content=html)
+        db.commit()
+        assert run_batch(db, sender) == 1
+        assert run_batch(db, sender) == 0
+    finally:
+        sender.close()
+
+    recipients = sorted(recipient for _, recipient, _ in smtp_server.messages)
+    assert recipients == sorted([f"user{n}@example.com" for n in range(5)] + ["late@example.com"])
+    # Both batches went over at most one connection per sending thread
+    assert len({session for session, _, _ in smtp_server.messages}) <= 2
+    assert b"Subject: Hello" in smtp_server.messages[0][2]
+    db.refresh(refused)
+    assert refused.status == EmailStatus.FAILED
+    assert "550" in (refused.last_error or "")
+
+
+def test_outbox_retries_with_backoff_when_smtp_is_down(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", _free_port())
+    monkeypatch.setattr(settings, "SMTP_TLS", False)
+    message = crud.email_outbox.enqueue(session=db, email_to="user@example.com", subject="Hi", html_content="<p>Hi</p>")
+    db.commit()
+
+    now = datetime.utcnow()
+    sender = OutboxSender(SMTPPool(1))
+    try:
+        assert run_batch(db, sender, now=now) == 1
+        db.refresh(message)
+        assert (message.status, message.attempts) == (EmailStatus.PENDING, 1)
+        assert message.next_attempt_at >= now + timedelta(seconds=settings.EMAIL_RETRY_BASE_SECONDS)
+        # Not due again until then
+        assert run_batch(db, sender, now=now + timedelta(seconds=1)) == 0
+        assert run_batch(db, sender, now=message.next_attempt_at) == 1
+        db.refresh(message)
+        assert message.attempts == 2
+        assert message.next_attempt_at >= now + timedelta(seconds=2 * settings.EMAIL_RETRY_BASE_SECONDS)
+    finally:
+        sender.close()
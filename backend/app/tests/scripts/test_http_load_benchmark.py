@@ -0,0 +1,24 @@
+from benchmarks.http_load import Sample, compare, percentile, summarize
+
+
+def _result(p95: float, rps: float, queries: float | None) -> dict:
+    return {"scenarios": {"auditor_inbox": {"requests": 100, "p50_ms": 1, "p95_ms": p95, "p99_ms": p95, "rps": rps, "queries_per_request": queries}}}
+
+
+def test_summary_reports_percentiles_and_queries_per_request() -> None:
+    samples = [Sample("GET a", 200, n / 1000) for n in range(1, 101)] + [Sample("GET b", 500, 0.5)]
+    summary = summarize(samples, elapsed=2.0, queries=303)
+    assert (summary["requests"], summary["errors"], summary["rps"]) == (101, 1, 50.5)
+    assert summary["queries_per_request"] == 3.0
+    assert summary["steps"]["GET a"]["p50_ms"] == 50
+    assert summary["steps"]["GET a"]["p99_ms"] == 99
+    assert percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+
+
+def test_compare_flags_latency_throughput_and_query_regressions() -> None:
+    base = _result(p95=10, rps=100, queries=4)
+    assert compare(base, _result(p95=10.5, rps=97, queries=4), threshold=0.1)[0] == []
+    regressions, _ = compare(base, _result(p95=12, rps=80, queries=5), threshold=0.1)
+    assert len(regressions) == 3
+    # Missing query counts are not compared
+    assert compare(_result(10, 100, None), _result(10, 100, 9), threshold=0.1)[0] == []
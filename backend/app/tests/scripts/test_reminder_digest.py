@@ -0,0 +1,94 @@
+from datetime import date, datetime, timedelta
+
+from sqlmodel import Session, col, select
+
+from app.models import (
+    AuditAssignmentStatus,
+    AuditPeriodicity,
+    EmailOutbox,
+    UserAreaAssignmentLink,
+    UserRole,
+)
+from app.reminder_digest import dedupe_key, run
+from app.tests.utils.factories import (
+    create_random_area,
+    create_random_audit_assignment,
+    create_random_audit_template,
+    create_random_company,
+    create_random_user,
+)
+
+TODAY = date(2031, 3, 10)
+
+
+def test_digest_lists_each_auditors_visible_assignments_once(db: Session) -> None:
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    linked = create_random_user(db, role=UserRole.AUDITOR, company_id=company.id)
+    unlinked = create_random_user(db, role=UserRole.AUDITOR, company_id=company.id)
+    area = create_random_area(db, company_id=company.id)
+    db.add(UserAreaAssignmentLink(user_id=linked.id, area_id=area.id))
+    template = create_random_audit_template(db, creator_id=admin.id)
+
+    def assignment(due: datetime | None, **fields: object):
+        a = create_random_audit_assignment(
+            db, audit_template_id=template.id, company_id=company.id, creator_id=admin.id,
+            area_id=fields.pop("area_id", None),
+        )
+        a.due_date = due
+        for name, value in fields.items():
+            setattr(a, name, value)
+        db.add(a)
+        return a
+
+    noon = datetime.combine(TODAY, datetime.min.time()) + timedelta(hours=12)
+    in_area = assignment(noon + timedelta(days=2), area_id=area.id)
+    open_to_all = assignment(noon + timedelta(days=1))
+    series = assignment(None, periodicity=AuditPeriodicity.WEEKLY, next_due_date=TODAY + timedelta(days=5))
+    completed = assignment(noon + timedelta(days=3), status=AuditAssignmentStatus.COMPLETED)
+    later = assignment(noon + timedelta(days=30))
+    db.commit()
+
+    dry = run(db, as_of=TODAY, days_ahead=7, dry_run=True)
+    assert dry.emails >= 2
+    assert db.exec(select(EmailOutbox).where(col(EmailOutbox.email_to).in_([linked.email, unlinked.email]))).all() == []
+
+    stats = run(db, as_of=TODAY, days_ahead=7)
+    assert stats.emails == dry.emails and stats.assignments == dry.assignments
+    digests = {
+        m.email_to: m.html_content
+        for m in db.exec(select(EmailOutbox).where(col(EmailOutbox.email_to).in_([linked.email, unlinked.email, admin.email])))
+    }
+    assert set(digests) == {linked.email, unlinked.email}
+    linked_html = digests[linked.email]
+    # Sorted by due date, and only what the auditor can see
+    positions = [linked_html.index(a.title) for a in (open_to_all, in_area, series)]
+    assert positions == sorted(positions)
+    assert (TODAY + timedelta(days=5)).isoformat() in linked_html
+    assert in_area.title not in digests[unlinked.email]
+    assert open_to_all.title in digests[unlinked.email]
+    assert completed.title not in linked_html and later.title not in linked_html
+
+
+def test_rerun_on_the_same_day_skips_auditors_already_queued(db: Session) -> None:
+    company = create_random_company(db)
+    admin = create_random_user(db, role=UserRole.ADMIN, company_id=company.id)
+    auditor = create_random_user(db, role=UserRole.AUDITOR, company_id=company.id)
+    template = create_random_audit_template(db, creator_id=admin.id)
+    assignment = create_random_audit_assignment(
+        db, audit_template_id=template.id, company_id=company.id, creator_id=admin.id
+    )
+    assignment.due_date = datetime.combine(TODAY, datetime.min.time()) + timedelta(days=1)
+    db.add(assignment)
+    db.commit()
+
+    def queued_for(day: date) -> int:
+        return len(db.exec(select(EmailOutbox).where(EmailOutbox.dedupe_key == dedupe_key(day, auditor.id))).all())
+
+    first = run(db, as_of=TODAY, days_ahead=7)
+    again = run(db, as_of=TODAY, days_ahead=7)
+    assert queued_for(TODAY) == 1
+    assert again.emails == 0 and again.already_queued == first.already_queued + first.emails
+    # The next day is a new digest
+    run(db, as_of=TODAY + timedelta(days=1), days_ahead=7)
+    assert queued_for(TODAY + timedelta(days=1)) == 1
@@ -0,0 +1,54 @@
+from datetime import date
+
+from sqlmodel import Session, func, select
+
+from app import crud
+from app.models import Answer, AssignedQuestion, AuditResponse, UserRole
+from app.synthetic_data import SYNTHETIC_EMAIL_DOMAIN, SYNTHETIC_PASSWORD, Scale, generate, load
+
+SCALE = Scale(
+    companies=2,
+    areas_per_company=3,
+    auditors_per_company=2,
+    templates=3,
+    questions_per_template=7,
+    assignments_per_company=12,
+    responses_per_assignment=2,
+    seed=41,
+)
+
+
+def test_generation_is_deterministic() -> None:
+    first = list(generate(SCALE, as_of=date(2030, 1, 1), batch_assignments=5))
+    second = list(generate(SCALE, as_of=date(2030, 1, 1), batch_assignments=5))
+    # Password hashes are salted, everything else must match
+    strip = lambda chunks: [(t, rows) for t, rows in chunks if t != "user"]  # noqa: E731
+    assert strip(first) == strip(second)
+    assert [row[1] for t, rows in first if t == "user" for row in rows] == [
+        row[1] for t, rows in second if t == "user" for row in rows
+    ]
+    other_seed = list(generate(Scale(**{**SCALE.__dict__, "seed": 42}), as_of=date(2030, 1, 1)))
+    assert {row[0] for _, rows in first for row in rows}.isdisjoint(row[0] for _, rows in other_seed for row in rows)
+
+
+def test_generated_rows_load_and_hang_together(db: Session) -> None:
+    counts = load(db, generate(SCALE, as_of=date(2030, 1, 1), batch_assignments=5))
+    assert counts["company"] == 2
+    assert counts["user"] == 2 * 3
+    assert counts["assigned_question"] == 2 * 12 * 7
+    assert counts["answer"] > 0
+
+    # Every answer points at a question of the assignment its response belongs to
+    mismatched = db.exec(
+        select(func.count(Answer.id))
+        .join(AuditResponse, AuditResponse.id == Answer.audit_response_id)
+        .join(AssignedQuestion, AssignedQuestion.id == Answer.assigned_question_id)
+        .where(AssignedQuestion.audit_assignment_id != AuditResponse.audit_assignment_id)
+    ).one()
+    assert mismatched == 0
+
+    auditor = crud.user.authenticate(
+        session=db, email=f"auditor1.c0.s41@{SYNTHETIC_EMAIL_DOMAIN}", password=SYNTHETIC_PASSWORD
+    )
+    assert auditor is not None and auditor.role == UserRole.AUDITOR
+    assert len(auditor.area_links) == 3
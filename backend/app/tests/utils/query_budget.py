@@ -0,0 +1,106 @@
+from typing import NamedTuple, Optional
+
+from app.core.query_stats import QueryStats
+
+
+class QueryBudget(NamedTuple):
+    queries: int
+    # DB time varies with the machine running the tests, so only checked when asked for
+    db_ms: Optional[float] = None
+
+
+# Most statements one call to each route may take in the route tests,
+# keyed by endpoint function name. Counts must not grow with the number of rows
+# returned; a route that needs more after a change should say why in its commit.
+ROUTE_BUDGETS: dict[str, QueryBudget] = {
+    # login
+    "login_access_token": QueryBudget(1),
+    "test_token": QueryBudget(1),
+    "recover_password": QueryBudget(2),
+    "reset_password": QueryBudget(3),
+    "recover_password_html_content": QueryBudget(2),
+    # users
+    "read_users": QueryBudget(3),
+    "create_user": QueryBudget(5),
+    "update_user_me": QueryBudget(3),
+    "update_password_me": QueryBudget(2),
+    "read_user_me": QueryBudget(2),
+    "delete_user_me": QueryBudget(7),
+    "register_new_user": QueryBudget(3),
+    "read_user_by_id": QueryBudget(2),
+    "update_user": QueryBudget(4),
+    "delete_user": QueryBudget(7),
+    "assign_user_to_areas": QueryBudget(10),
+    "remove_user_from_area": QueryBudget(4),
+    # utils
+    "test_email": QueryBudget(2),
+    "cache_stats": QueryBudget(1),
+    "compression_stats_view": QueryBudget(1),
+    "slow_queries_view": QueryBudget(1),
+    "memory_status": QueryBudget(1),
+    "start_memory_tracing": QueryBudget(1),
+    "stop_memory_tracing": QueryBudget(1),
+    "take_memory_snapshot": QueryBudget(1),
+    "read_memory_snapshot": QueryBudget(1),
+    "health_check": QueryBudget(0),
+    # companies and areas
+    "read_companies": QueryBudget(3),
+    "create_company": QueryBudget(3),
+    "read_company_by_id": QueryBudget(2),
+    "update_company": QueryBudget(4),
+    "delete_company": QueryBudget(5),
+    "read_areas": QueryBudget(4),
+    "create_area": QueryBudget(5),
+    "read_area_by_id": QueryBudget(2),
+    "update_area": QueryBudget(5),
+    "delete_area": QueryBudget(4),
+    # audit templates
+    "read_audit_templates": QueryBudget(6),
+    "get_audit_template_types": QueryBudget(0),
+    "create_audit_template": QueryBudget(6),
+    "read_audit_template": QueryBudget(2),
+    "update_audit_template": QueryBudget(5),
+    "read_question_templates_for_audit_template": QueryBudget(4),
+    "create_question_template": QueryBudget(3),
+    "read_question_template_by_id": QueryBudget(1),
+    "update_question_template": QueryBudget(4),
+    "delete_question_template": QueryBudget(2),
+    # audit assignments
+    "read_all_audit_assignments": QueryBudget(7),
+    "read_my_audit_assignments": QueryBudget(8),
+    "read_audit_calendar": QueryBudget(3),
+    "read_audit_assignments_for_company": QueryBudget(9),
+    "create_audit_assignment": QueryBudget(10),
+    "read_audit_assignment_by_id": QueryBudget(4),
+    "update_audit_assignment": QueryBudget(6),
+    "delete_audit_assignment": QueryBudget(15),
+    # audit responses and assigned questions
+    "create_audit_response": QueryBudget(7),
+    "submit_audit_response": QueryBudget(10),
+    "read_audit_responses_for_assignment": QueryBudget(4),
+    "read_audit_response_by_id": QueryBudget(7),
+    "update_audit_response": QueryBudget(4),
+    "read_assigned_questions_for_assignment": QueryBudget(5),
+    "read_assigned_question_by_id": QueryBudget(3),
+    "update_assigned_question": QueryBudget(5),
+    "delete_assigned_question": QueryBudget(6),
+    # sync, batch and photos
+    "read_sync_changes": QueryBudget(7),
+    # Counts every sub-request as well, and a SAVEPOINT and its release per shared-session one
+    "run_batch": QueryBudget(27),
+    "create_upload": QueryBudget(7),
+    "read_upload": QueryBudget(2),
+    "append_upload": QueryBudget(11),
+    "read_photo": QueryBudget(4),
+    "read_thumbnail": QueryBudget(4),
+}
+
+
+def budget_violation(endpoint: str, stats: QueryStats, budget: QueryBudget) -> Optional[str]:
+    """Why a call that ran `stats` is over `budget`, or None if it is within it."""
+    db_ms = stats.seconds * 1000
+    if stats.count <= budget.queries and (budget.db_ms is None or db_ms <= budget.db_ms):
+        return None
+    repeated = "".join(f"\n  {n}x {shape[:200]}" for shape, n in stats.repeated(2).items())
+    limit = f"{budget.queries} queries" + ("" if budget.db_ms is None else f" in {budget.db_ms:.0f}ms")
+    return f"{endpoint} ran {stats.count} queries in {db_ms:.1f}ms, budget is {limit}{repeated}"
@@ -0,0 +1,102 @@
+import fnmatch
+import socketserver
+import threading
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from typing import Any
+
+
+class _Store:
+    def __init__(self) -> None:
+        self.values: dict[bytes, Any] = {}
+        self.expires: dict[bytes, float] = {}
+        self.lock = threading.Lock()
+
+    def live(self, key: bytes) -> Any:
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return self.values.get(key)
+
+
+def _reply(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_reply(item) for item in value)
+    return b"+%s\r\n" % str(value).encode()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def handle(self) -> None:
+        while line := self.rfile.readline():
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            with self.server.store.lock:
+                self.wfile.write(self._execute(args[0].upper(), args[1:]))
+
+    def _execute(self, command: bytes, args: list[bytes]) -> bytes:
+        store = self.server.store
+        if command in (b"PING", b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if command == b"GET":
+            return _reply(store.live(args[0]))
+        if command == b"SET":
+            store.values[args[0]] = args[1]
+            store.expires.pop(args[0], None)
+            if len(args) > 3 and args[2].upper() == b"EX":
+                store.expires[args[0]] = time.monotonic() + int(args[3])
+            return b"+OK\r\n"
+        if command == b"DEL":
+            removed = 0
+            for key in args:
+                removed += store.values.pop(key, None) is not None
+                store.expires.pop(key, None)
+            return _reply(removed)
+        if command == b"SADD":
+            members = store.live(args[0]) or set()
+            store.values[args[0]] = members | set(args[1:])
+            return _reply(len(args) - 1)
+        if command == b"SMEMBERS":
+            return _reply(sorted(store.live(args[0]) or ()))
+        if command == b"EXPIRE":
+            store.expires[args[0]] = time.monotonic() + int(args[1])
+            return _reply(1)
+        if command == b"SCAN":
+            pattern = args[args.index(b"MATCH") + 1].decode()
+            keys = [key for key in list(store.values) if fnmatch.fnmatchcase(key.decode(), pattern)]
+            return _reply([b"0", keys])
+        return b"-ERR unknown command '%s'\r\n" % command
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.store = _Store()
+
+
+@contextmanager
+def resp_server() -> Generator[str, None, None]:
+    """Run a tiny in-process stand-in for Redis (just the commands the app uses) and yield its URL."""
+    server = _Server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        yield f"redis://{host}:{port}/0"
+    finally:
+        server.shutdown()
+        server.server_close()
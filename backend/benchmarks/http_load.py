@@ -0,0 +1,521 @@
+"""
+Latency and throughput of the hot HTTP endpoints under concurrent load, measured
+against a running app backed by a dataset from app.synthetic_data.
+
+    cd backend && python -m app.synthetic_data --preset medium --seed 0
+    cd backend && python -m benchmarks.http_load run --concurrency 32 --duration 20 --out head.json
+    cd backend && python -m benchmarks.http_load compare base.json head.json
+    cd backend && python -m benchmarks.http_load revs origin/master HEAD
+
+`run` boots uvicorn from --app-dir (this checkout by default) with the usual POSTGRES_*
+settings, unless --base-url points at a server that is already up. Each scenario runs
+as its own phase, so queries per request can be read off pg_stat_statements when that
+extension is installed (null otherwise; other clients of the database add noise).
+The submit scenario writes new responses, so benchmark a disposable dataset.
+
+`revs` checks out both revisions into temporary git worktrees, runs each against its
+own fresh copy of the seeded database and compares them; the exit status is 1 when a
+regression is flagged. Copies are made with CREATE DATABASE ... TEMPLATE, which needs
+the CREATEDB privilege and nothing else connected to the seeded database meanwhile.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+API = "/api/v1"
+
+
+@dataclass
+class VirtualUser:
+    client: httpx.AsyncClient
+    assignment_ids: list[str] = field(default_factory=list)
+    questions: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+    # (assignment id, response id) of the draft the autosave scenario keeps patching
+    draft: Optional[tuple[str, str]] = None
+
+
+@dataclass
+class Sample:
+    step: str
+    status: int
+    seconds: float
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.samples: list[Sample] = []
+
+    async def request(self, user: VirtualUser, step: str, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await user.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.samples.append(Sample(step, 0, time.perf_counter() - started))
+            raise
+        self.samples.append(Sample(step, response.status_code, time.perf_counter() - started))
+        return response
+
+
+async def _login(base_url: str, email: str, password: str, limits: httpx.Limits) -> VirtualUser:
+    client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60)
+    response = await client.post(f"{API}/login/access-token", data={"username": email, "password": password})
+    response.raise_for_status()
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    return VirtualUser(client)
+
+
+async def _questions(user: VirtualUser, assignment_id: str) -> list[dict[str, Any]]:
+    if assignment_id not in user.questions:
+        response = await user.client.get(f"{API}/audit-assignments/{assignment_id}")
+        response.raise_for_status()
+        user.questions[assignment_id] = response.json()["assigned_questions"]
+    return user.questions[assignment_id]
+
+
+def _answer(question: dict[str, Any]) -> Any:
+    return {"RATING_SCALE": 4, "YES_NO": True}.get(question["question_type"], "Checked during load test")
+
+
+async def prepare_auditor(user: VirtualUser) -> None:
+    response = await user.client.get(f"{API}/audit-assignments/my-assignments", params={"limit": 100})
+    response.raise_for_status()
+    user.assignment_ids = [a["id"] for a in response.json()["data"]]
+    me = (await user.client.get(f"{API}/users/me")).json()["id"]
+    # Autosave keeps patching one of the auditor's own drafts from the dataset, found
+    # through the same sync snapshot the mobile app starts from
+    response = await user.client.get(f"{API}/sync/")
+    if response.status_code == 404:
+        await _find_draft(user, me)
+        return
+    response.raise_for_status()
+    for change in response.json()["changes"]:
+        data = change.get("data") or {}
+        if change["type"] == "response" and data.get("auditor_id") == me and data.get("status") == "DRAFT":
+            user.draft = (data["audit_assignment_id"], change["id"])
+            return
+
+
+async def _find_draft(user: VirtualUser, me: str) -> None:
+    """The auditor's first draft, looked for assignment by assignment on revisions without /sync/."""
+    for assignment_id in user.assignment_ids:
+        response = await user.client.get(f"{API}/audit-assignments/{assignment_id}/responses/")
+        response.raise_for_status()
+        for data in response.json()["data"]:
+            if data["auditor_id"] == me and data["status"] == "DRAFT":
+                user.draft = (assignment_id, data["id"])
+                return
+
+
+async def auditor_inbox(recorder: Recorder, user: VirtualUser) -> None:
+    await recorder.request(user, "GET my-assignments", "GET", f"{API}/audit-assignments/my-assignments")
+
+
+async def open_assignment(recorder: Recorder, user: VirtualUser) -> None:
+    assignment_id = random.choice(user.assignment_ids)
+    await recorder.request(user, "GET assignment", "GET", f"{API}/audit-assignments/{assignment_id}")
+    await recorder.request(user, "GET responses", "GET", f"{API}/audit-assignments/{assignment_id}/responses/")
+
+
+async def autosave(recorder: Recorder, user: VirtualUser) -> None:
+    assert user.draft is not None
+    assignment_id, response_id = user.draft
+    await recorder.request(
+        user,
+        "PATCH draft response",
+        "PATCH",
+        f"{API}/audit-assignments/{assignment_id}/responses/{response_id}",
+        json={"overall_comments": f"Autosaved at {time.time():.3f}"},
+    )
+
+
+async def submit(recorder: Recorder, user: VirtualUser) -> None:
+    assignment_id = random.choice(user.assignment_ids)
+    questions = await _questions(user, assignment_id)
+    await recorder.request(
+        user,
+        "POST submit",
+        "POST",
+        f"{API}/audit-assignments/{assignment_id}/responses/submit",
+        headers={"Idempotency-Key": str(uuid.uuid4())},
+        json={
+            "status": "SUBMITTED",
+            "answers": [{"assigned_question_id": q["id"], "answer_value": _answer(q)} for q in questions],
+        },
+    )
+
+
+async def admin_lists(recorder: Recorder, user: VirtualUser) -> None:
+    await recorder.request(user, "GET assignments", "GET", f"{API}/audit-assignments/", params={"limit": 100})
+    await recorder.request(user, "GET users", "GET", f"{API}/users/", params={"limit": 100})
+    await recorder.request(user, "GET templates", "GET", f"{API}/audit-templates/", params={"limit": 100})
+
+
+Scenario = Callable[[Recorder, VirtualUser], Awaitable[None]]
+# name -> (scenario, who runs it)
+SCENARIOS: dict[str, tuple[Scenario, str]] = {
+    "auditor_inbox": (auditor_inbox, "auditor"),
+    "open_assignment": (open_assignment, "auditor"),
+    "autosave": (autosave, "auditor"),
+    "submit": (submit, "auditor"),
+    "admin_lists": (admin_lists, "admin"),
+}
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile of unsorted values."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p * len(ordered)) - 1, 0)]
+
+
+def summarize(samples: list[Sample], elapsed: float, queries: Optional[int]) -> dict[str, Any]:
+    def stats(group: list[Sample]) -> dict[str, Any]:
+        latencies = [s.seconds * 1000 for s in group]
+        return {
+            "requests": len(group),
+            "errors": sum(1 for s in group if not 200 <= s.status < 400),
+            "rps": round(len(group) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+        }
+
+    if not samples:
+        return {"requests": 0}
+    by_step: dict[str, list[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_step[sample.step].append(sample)
+    return {
+        **stats(samples),
+        "queries_per_request": None if queries is None else round(queries / len(samples), 2),
+        "steps": {step: stats(group) for step, group in by_step.items()},
+    }
+
+
+class QueryCounter:
+    """Total statements executed on the database, from pg_stat_statements."""
+
+    def __init__(self) -> None:
+        from sqlalchemy import create_engine, text
+
+        from app.core.config import settings
+
+        # The extension counts statements across all databases, copies included
+        self._engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), pool_size=1)
+        self._query = text("SELECT coalesce(sum(calls), 0) FROM pg_stat_statements")
+        self.available = True
+        try:
+            self.total()
+        except Exception:
+            self.available = False
+
+    def total(self) -> Optional[int]:
+        if not self.available:
+            return None
+        with self._engine.connect() as connection:
+            return int(connection.execute(self._query).scalar_one())
+
+
+async def run_phase(
+    scenario: Scenario, users: list[VirtualUser], *, concurrency: int, duration: float, counter: QueryCounter
+) -> dict[str, Any]:
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    async def worker(n: int) -> None:
+        user = users[n % len(users)]
+        while time.perf_counter() < deadline:
+            try:
+                await scenario(recorder, user)
+            except httpx.HTTPError:
+                pass
+
+    before = await asyncio.to_thread(counter.total)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    after = await asyncio.to_thread(counter.total)
+    # The reading taken before the phase is itself counted in the one after it
+    queries = None if before is None or after is None else after - before - 1
+    return summarize(recorder.samples, elapsed, queries)
+
+
+async def run_benchmark(
+    base_url: str,
+    *,
+    scenarios: list[str],
+    concurrency: int,
+    duration: float,
+    auditors: int,
+    preset: str,
+    seed: int,
+    counter: QueryCounter,
+) -> dict[str, Any]:
+    from app.synthetic_data import PRESETS, SYNTHETIC_EMAIL_DOMAIN, SYNTHETIC_PASSWORD
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    # Spread auditors over the companies of the dataset, filling one before the next
+    scale = PRESETS[preset]
+    emails = [
+        f"auditor{u % scale.auditors_per_company + 1}.c{u // scale.auditors_per_company % scale.companies}"
+        f".s{seed}@{SYNTHETIC_EMAIL_DOMAIN}"
+        for u in range(min(auditors, scale.auditors_per_company * scale.companies))
+    ]
+    auditor_users = await asyncio.gather(*(_login(base_url, email, SYNTHETIC_PASSWORD, limits) for email in emails))
+    admin = await _login(base_url, f"admin.c0.s{seed}@{SYNTHETIC_EMAIL_DOMAIN}", SYNTHETIC_PASSWORD, limits)
+    await asyncio.gather(*(prepare_auditor(user) for user in auditor_users))
+    auditor_users = [user for user in auditor_users if user.assignment_ids]
+    if not auditor_users:
+        raise SystemExit("None of the synthetic auditors can see any assignment; load a dataset first")
+
+    results = {}
+    try:
+        for name in scenarios:
+            scenario, role = SCENARIOS[name]
+            users = [admin] if role == "admin" else auditor_users
+            if scenario is autosave:
+                users = [user for user in users if user.draft]
+                if not users:
+                    print(f"{name}: skipped, no auditor has a draft response", file=sys.stderr)
+                    continue
+            results[name] = await run_phase(
+                scenario, users, concurrency=concurrency, duration=duration, counter=counter
+            )
+            print(f"{name}: {json.dumps({k: v for k, v in results[name].items() if k != 'steps'})}", file=sys.stderr)
+    finally:
+        await asyncio.gather(*(user.client.aclose() for user in [*auditor_users, admin]))
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+def start_server(app_dir: Path, workers: int, database: Optional[str] = None) -> tuple[subprocess.Popen[bytes], str]:
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=app_dir,
+        env={**os.environ, "POSTGRES_DB": database} if database else None,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server in {app_dir} exited with {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}{API}/utils/health-check/", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise SystemExit(f"Server in {app_dir} did not become healthy within 60s")
+
+
+def _postgres(*statements: Any) -> None:
+    """Run statements such as CREATE DATABASE, which cannot run in a transaction."""
+    import psycopg
+
+    from app.core.config import settings
+
+    with psycopg.connect(
+        host=settings.POSTGRES_SERVER,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        dbname="postgres",
+        autocommit=True,
+    ) as conn:
+        for statement in statements:
+            conn.execute(statement)
+
+
+def copy_database(source: str, target: str) -> None:
+    """Replace `target` with a copy of `source`."""
+    from psycopg import sql
+
+    try:
+        _postgres(
+            sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(target)),
+            sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(sql.Identifier(target), sql.Identifier(source)),
+        )
+    except Exception as e:
+        raise SystemExit(f"Could not copy database {source} to {target}, is anything still connected to it? {e}")
+
+
+def drop_database(name: str) -> None:
+    from psycopg import sql
+
+    _postgres(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(name)))
+
+
+def _git(*args: str, cwd: Path = BACKEND_DIR) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def run(args: argparse.Namespace, app_dir: Path, database: Optional[str] = None) -> dict[str, Any]:
+    process = None
+    base_url = args.base_url
+    if base_url is None:
+        process, base_url = start_server(app_dir, args.workers, database)
+    try:
+        results = asyncio.run(
+            run_benchmark(
+                base_url,
+                scenarios=args.scenarios,
+                concurrency=args.concurrency,
+                duration=args.duration,
+                auditors=args.auditors,
+                preset=args.preset,
+                seed=args.seed,
+                counter=QueryCounter(),
+            )
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    return {
+        "meta": {
+            "revision": _git("rev-parse", "HEAD", cwd=app_dir) if args.base_url is None else None,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "workers": args.workers,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(base: dict[str, Any], head: dict[str, Any], threshold: float) -> tuple[list[str], list[dict[str, Any]]]:
+    """
+    Flag scenarios whose p95 latency grew, or whose throughput dropped, by more than
+    `threshold` (a fraction), and any that now issue more queries per request.
+    """
+    regressions = []
+    rows = []
+    for name, new in head["scenarios"].items():
+        old = base["scenarios"].get(name)
+        if not old or not old.get("requests") or not new.get("requests"):
+            continue
+        row = {"scenario": name}
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "rps", "queries_per_request"):
+            row[metric] = [old.get(metric), new.get(metric)]
+        rows.append(row)
+        if new["p95_ms"] > old["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {old['p95_ms']}ms -> {new['p95_ms']}ms")
+        if new["rps"] < old["rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {old['rps']} -> {new['rps']} req/s")
+        old_queries, new_queries = old.get("queries_per_request"), new.get("queries_per_request")
+        # Query counts do not jitter like timings do, so any whole extra query counts
+        if old_queries is not None and new_queries is not None and new_queries >= old_queries + 0.5:
+            regressions.append(f"{name}: queries per request {old_queries} -> {new_queries}")
+    return regressions, rows
+
+
+def report_comparison(base: dict[str, Any], head: dict[str, Any], threshold: float) -> int:
+    regressions, rows = compare(base, head, threshold)
+    print(json.dumps({"comparison": rows, "regressions": regressions}, indent=2))
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_run_options(command: argparse.ArgumentParser) -> None:
+        command.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+        command.add_argument("--concurrency", type=int, default=16)
+        command.add_argument("--duration", type=float, default=20.0, help="Seconds per scenario.")
+        command.add_argument("--auditors", type=int, default=50, help="Distinct synthetic auditors to log in as.")
+        command.add_argument("--preset", default="medium", help="Preset the dataset was generated with.")
+        command.add_argument("--seed", type=int, default=0, help="Seed the dataset was generated with.")
+        command.add_argument("--workers", type=int, default=1, help="Uvicorn workers for a booted server.")
+
+    run_command = commands.add_parser("run", help="Benchmark one checkout.")
+    add_run_options(run_command)
+    run_command.add_argument("--base-url", default=None, help="Benchmark this running server instead of booting one.")
+    run_command.add_argument("--app-dir", type=Path, default=BACKEND_DIR)
+    run_command.add_argument("--out", type=Path, default=None)
+
+    compare_command = commands.add_parser("compare", help="Compare two result files.")
+    compare_command.add_argument("base", type=Path)
+    compare_command.add_argument("head", type=Path)
+    compare_command.add_argument("--threshold", type=float, default=0.10)
+
+    revs_command = commands.add_parser("revs", help="Benchmark two git revisions and compare them.")
+    add_run_options(revs_command)
+    revs_command.add_argument("base_rev")
+    revs_command.add_argument("head_rev")
+    revs_command.add_argument("--threshold", type=float, default=0.10)
+    revs_command.add_argument("--out-dir", type=Path, default=None)
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        sys.exit(report_comparison(json.loads(args.base.read_text()), json.loads(args.head.read_text()), args.threshold))
+    if args.command == "run":
+        result = run(args, args.app_dir)
+        output = json.dumps(result, indent=2)
+        if args.out:
+            args.out.write_text(output)
+        print(output)
+        return
+
+    from app.core.config import settings
+
+    args.base_url = None
+    # submit and autosave write to the database, so each revision gets a copy of the
+    # dataset as seeded rather than what the previous revision left behind
+    seeded, database = f"{settings.POSTGRES_DB}_bench_seed", f"{settings.POSTGRES_DB}_bench"
+    copy_database(settings.POSTGRES_DB, seeded)
+    results = []
+    try:
+        for rev in (args.base_rev, args.head_rev):
+            copy_database(seeded, database)
+            with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+                worktree = Path(tmp) / "tree"
+                _git("worktree", "add", "--detach", str(worktree), rev)
+                # Settings read ../.env relative to the backend directory, and it is not tracked
+                if (BACKEND_DIR.parent / ".env").exists():
+                    shutil.copy(BACKEND_DIR.parent / ".env", worktree / ".env")
+                try:
+                    results.append(run(args, worktree / "backend", database))
+                finally:
+                    _git("worktree", "remove", "--force", str(worktree))
+            if args.out_dir:
+                args.out_dir.mkdir(parents=True, exist_ok=True)
+                (args.out_dir / f"{_git('rev-parse', '--short', rev)}.json").write_text(json.dumps(results[-1], indent=2))
+    finally:
+        drop_database(database)
+        drop_database(seeded)
+    sys.exit(report_comparison(results[0], results[1], args.threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+CPU cost of rendering one page of 100 audit assignments (each with its template,
+10 template questions and 10 assigned questions), comparing FastAPI's response_model
+path with the precompiled serializers in app.api.serialization.
+
+    cd backend && python -m benchmarks.json_serialization --rounds 200
+
+Rows are built in memory, so no database is needed; only the app settings must load.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from collections.abc import Callable
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.api.serialization import FastJSONResponse, dump_public
+from app.models import (
+    AssignedQuestion,
+    AuditAssignment,
+    AuditAssignmentsPublic,
+    AuditAssignmentStatus,
+    AuditTemplate,
+    QuestionTemplate,
+    QuestionType,
+)
+
+
+def build_page(size: int = 100, questions: int = 10) -> list[AuditAssignment]:
+    now = datetime(2024, 1, 1, 9, 0)
+    creator_id, company_id = uuid.uuid4(), uuid.uuid4()
+    template = AuditTemplate(
+        id=uuid.uuid4(),
+        name="5S walk",
+        audit_type_definition_key="FIVE_S_AUDIT",
+        created_by_id=creator_id,
+        created_at=now,
+        updated_at=now,
+    )
+    template.question_templates = [
+        QuestionTemplate(
+            id=uuid.uuid4(),
+            audit_template_id=template.id,
+            text=f"Template question {n}",
+            question_type=QuestionType.YES_NO,
+            order=n,
+            is_mandatory=True,
+            created_at=now,
+            updated_at=now,
+        )
+        for n in range(questions)
+    ]
+    page = []
+    for i in range(size):
+        assignment = AuditAssignment(
+            id=uuid.uuid4(),
+            title=f"Assignment {i}",
+            audit_template_id=template.id,
+            company_id=company_id,
+            created_by_id=creator_id,
+            status=AuditAssignmentStatus.PENDING,
+            due_date=now,
+            created_at=now,
+            updated_at=now,
+        )
+        assignment.audit_template = template
+        assignment.assigned_questions = [
+            AssignedQuestion(
+                id=uuid.uuid4(),
+                audit_assignment_id=assignment.id,
+                text=f"Question {n}",
+                question_type=QuestionType.YES_NO,
+                order=n,
+                is_mandatory=True,
+                created_at=now,
+                updated_at=now,
+            )
+            for n in range(questions)
+        ]
+        page.append(assignment)
+    return page
+
+
+_FIELD = create_model_field(name="Response_read_all_audit_assignments", type_=AuditAssignmentsPublic)
+_LOOP = asyncio.new_event_loop()
+
+
+def response_model_path(page: list[AuditAssignment]) -> bytes:
+    # What a route returning AuditAssignmentsPublic(...) costs today: the route builds
+    # the model, FastAPI validates it again against response_model, dumps it to Python
+    # objects and JSONResponse runs json.dumps over them
+    content = _LOOP.run_until_complete(
+        serialize_response(field=_FIELD, response_content=AuditAssignmentsPublic(data=page, count=len(page)))
+    )
+    return JSONResponse(content).body
+
+
+def fast_path(page: list[AuditAssignment]) -> bytes:
+    return dump_public(AuditAssignmentsPublic, {"data": page, "count": len(page)})
+
+
+def measure(render: Callable[[list[AuditAssignment]], bytes], page: list[AuditAssignment], rounds: int) -> list[float]:
+    render(page)  # warm-up
+    timings = []
+    for _ in range(rounds):
+        started = time.process_time()
+        render(page)
+        timings.append((time.process_time() - started) * 1000)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--size", type=int, default=100)
+    args = parser.parse_args()
+
+    page = build_page(args.size)
+    assert json.loads(response_model_path(page)) == json.loads(fast_path(page))
+
+    results = {}
+    for name, render in (("response_model", response_model_path), ("fast", fast_path)):
+        timings = measure(render, page, args.rounds)
+        results[name] = {
+            "cpu_ms_mean": round(statistics.mean(timings), 3),
+            "cpu_ms_p95": round(sorted(timings)[int(len(timings) * 0.95) - 1], 3),
+        }
+    results["speedup"] = round(results["response_model"]["cpu_ms_mean"] / results["fast"]["cpu_ms_mean"], 2)
+    results["orjson_default_response_class"] = FastJSONResponse is not JSONResponse
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Payload size and encode time of MessagePack against JSON for the documents the mobile
+app downloads: one AuditAssignmentPublic (template, 10 template questions, 10 assigned
+questions) and one AuditResponsePublic with an answer per question.
+
+    cd backend && python -m benchmarks.msgpack_serialization --rounds 2000
+
+Both formats go through the same precompiled serializers in app.api.serialization.
+Requires the optional msgpack package; rows are built in memory, so no database is
+needed.
+"""
+import argparse
+import gzip
+import json
+import statistics
+import time
+import uuid
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+from sqlmodel import SQLModel
+
+from app.api.content_negotiation import msgpack
+from app.api.serialization import dump_public, dump_public_msgpack
+from app.models import (
+    Answer,
+    AuditAssignmentPublic,
+    AuditResponse,
+    AuditResponsePublic,
+    AuditResponseStatus,
+)
+from benchmarks.json_serialization import build_page, measure
+
+
+def build_response(questions: int = 10) -> AuditResponse:
+    (assignment,) = build_page(size=1, questions=questions)
+    response = AuditResponse(
+        id=uuid.uuid4(),
+        audit_assignment_id=assignment.id,
+        auditor_id=uuid.uuid4(),
+        overall_comments="Walked the whole line, two findings.",
+        photo_urls=[f"https://files.example.com/{uuid.uuid4()}.jpg" for _ in range(3)],
+        status=AuditResponseStatus.SUBMITTED,
+        score=87.5,
+        submission_date=datetime(2024, 1, 1, 11, 30),
+    )
+    response.answers = [
+        Answer(
+            id=uuid.uuid4(),
+            audit_response_id=response.id,
+            assigned_question_id=question.id,
+            answer_value={"value": n % 3 != 0, "scale": n},
+            comments=None if n % 2 else "Needs follow-up",
+            photo_urls=[],
+        )
+        for n, question in enumerate(assignment.assigned_questions)
+    ]
+    return response
+
+
+def compare(model: type[SQLModel], content: Any, rounds: int) -> dict[str, Any]:
+    json_body = dump_public(model, content)
+    msgpack_body = dump_public_msgpack(model, content)
+    assert msgpack.unpackb(msgpack_body) == json.loads(json_body)
+
+    result: dict[str, Any] = {}
+    render: Callable[[Any], bytes]
+    for name, render, body in (
+        ("json", lambda rows: dump_public(model, rows), json_body),
+        ("msgpack", lambda rows: dump_public_msgpack(model, rows), msgpack_body),
+    ):
+        timings = measure(render, content, rounds)
+        result[name] = {
+            "bytes": len(body),
+            "gzip_bytes": len(gzip.compress(body, mtime=0)),
+            "encode_us_mean": round(statistics.mean(timings) * 1000, 1),
+        }
+    result["size_ratio"] = round(result["msgpack"]["bytes"] / result["json"]["bytes"], 3)
+    return result
+
+
+def decode_time(body: bytes, loads: Callable[[bytes], Any], rounds: int) -> float:
+    started = time.process_time()
+    for _ in range(rounds):
+        loads(body)
+    return round((time.process_time() - started) / rounds * 1_000_000, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=10)
+    args = parser.parse_args()
+    if msgpack is None:
+        parser.exit(1, "msgpack is not installed\n")
+
+    (assignment,) = build_page(size=1, questions=args.questions)
+    audit_response = build_response(args.questions)
+    results = {
+        "AuditAssignmentPublic": compare(AuditAssignmentPublic, assignment, args.rounds),
+        "AuditResponsePublic": compare(AuditResponsePublic, audit_response, args.rounds),
+    }
+    # What the phone pays to parse the assignment document (measured here with the C
+    # decoders, so only indicative of the relative cost)
+    json_body = dump_public(AuditAssignmentPublic, assignment)
+    msgpack_body = dump_public_msgpack(AuditAssignmentPublic, assignment)
+    results["AuditAssignmentPublic"]["decode_us"] = {
+        "json": decode_time(json_body, json.loads, args.rounds),
+        "msgpack": decode_time(msgpack_body, msgpack.unpackb, args.rounds),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
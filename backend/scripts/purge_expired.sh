@@ -0,0 +1,12 @@
+#! /usr/bin/env bash
+
+set -e
+
+# Purge expired sync tombstones, idempotency keys, photo uploads, unreferenced photos
+# and old outbox mail every PURGE_EXPIRED_INTERVAL seconds, starting right away.
+interval="${PURGE_EXPIRED_INTERVAL:-3600}"
+
+while true; do
+    python -m app.purge_expired || echo "Purge run failed" >&2
+    sleep "$interval"
+done
@@ -0,0 +1,18 @@
+#! /usr/bin/env bash
+
+set -e
+
+# Materialize the recurring audit assignments due each day at RECURRING_ASSIGNMENTS_AT
+# (HH:MM, container time). A run that finds the time already past today catches up
+# straight away; occurrences that already exist are never created twice.
+at="${RECURRING_ASSIGNMENTS_AT:-00:05}"
+
+while true; do
+    if [ "$(date +%s)" -ge "$(date -d "today $at" +%s)" ]; then
+        python -m app.recurring_assignments || echo "Recurring assignments run failed" >&2
+        next="tomorrow $at"
+    else
+        next="today $at"
+    fi
+    sleep $(( $(date -d "$next" +%s) - $(date +%s) ))
+done
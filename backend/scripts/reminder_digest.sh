@@ -0,0 +1,18 @@
+#! /usr/bin/env bash
+
+set -e
+
+# Queue the due-date reminder digests once a day at REMINDER_DIGEST_AT (HH:MM, container
+# time). A run that finds the time already past today catches up straight away; auditors
+# already queued for the day are skipped, so restarts never email anyone twice.
+at="${REMINDER_DIGEST_AT:-07:00}"
+
+while true; do
+    if [ "$(date +%s)" -ge "$(date -d "today $at" +%s)" ]; then
+        python -m app.reminder_digest || echo "Reminder digest run failed" >&2
+        next="tomorrow $at"
+    else
+        next="today $at"
+    fi
+    sleep $(( $(date -d "$next" +%s) - $(date +%s) ))
+done
@@ -0,0 +1,23 @@
+#! /usr/bin/env bash
+
+set -e
+
+# Worker processes share their Prometheus samples through files here; leftovers from
+# the previous run would be added to the new totals
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
+# Tracing asked for before a restart should not start again with the new workers
+if [ -n "$MEMORY_CONTROL_FILE" ]; then
+    rm -f "$MEMORY_CONTROL_FILE"
+fi
+
+# Slow query totals start over with the workers, as they do with a single worker
+if [ -n "$SLOW_QUERY_STATS_DIR" ]; then
+    rm -rf "$SLOW_QUERY_STATS_DIR"
+    mkdir -p "$SLOW_QUERY_STATS_DIR"
+fi
+
+exec fastapi run --workers 4 app/main.py